@@ -0,0 +1,141 @@
+"""Plan which days of the rate and price history still need fetching.
+
+The stored dates of each series (a symbol, or a currency pair) are compared
+with the days it is expected to have: every weekday in the requested range,
+less the market holidays. Holidays are not listed anywhere; they are read off
+the neighbouring data instead. A weekday is a holiday of a group of series
+(the symbols quoted in one currency, or the Bank of Canada pairs) when at
+least ``min_series`` of them have data before and after it and none has a
+value on it. A group with fewer series, e.g. the one symbol quoted in some
+currency, borrows a calendar instead: the one passed as fallback_holidays,
+or the holidays read off every series together. What is left is returned as date ranges to fetch. The ranges
+of a series that lie close together are merged, so a few scattered missing
+days cost one request rather than one each.
+
+plan_after() is the cheap daily variant. It only looks past each series'
+last stored date and needs no coverage scan.
+"""
+import bisect
+
+import numpy as np
+
+
+# gaps between two missing ranges up to this many days are fetched with them
+MERGE_GAP_DAYS = 7
+
+
+def _days(dates):
+    return np.unique(np.asarray(dates, dtype="datetime64[D]"))
+
+
+def _strings(days):
+    return np.datetime_as_string(np.asarray(days, dtype="datetime64[D]")).tolist()
+
+
+def weekdays(start, end):
+    """Every weekday from start to end, both included, as datetime64[D]."""
+    start, end = np.datetime64(start, "D"), np.datetime64(end, "D")
+    if end < start:
+        return np.array([], dtype="datetime64[D]")
+    days = np.arange(start, end + 1, dtype="datetime64[D]")
+    return days[np.is_busday(days)]
+
+
+def market_holidays(coverage, keys=None, min_series=2):
+    """Weekdays that every series of keys spanning them is missing, if at least min_series span them."""
+    series = [_days(coverage[key]) for key in (coverage if keys is None else keys) if key in coverage]
+    series = [days for days in series if len(days)]
+    if len(series) < min_series:
+        return np.array([], dtype="datetime64[D]")
+
+    days = weekdays(min(s[0] for s in series), max(s[-1] for s in series))
+    spanning = np.zeros(len(days), dtype=np.int32)
+    present = np.zeros(len(days), dtype=np.int32)
+    for stored in series:
+        spanning[np.searchsorted(days, stored[0]):np.searchsorted(days, stored[-1], side="right")] += 1
+        positions = np.searchsorted(days, stored)
+        found = positions < len(days)
+        found[found] = days[positions[found]] == stored[found]
+        present[positions[found]] += 1
+    return days[(spanning >= min_series) & (present == 0)]
+
+
+def missing_ranges(stored, start, end, holidays=()):
+    """[(first, last)] runs of expected days missing from stored; a run may span weekends and holidays."""
+    expected = weekdays(start, end)
+    if len(holidays):
+        expected = expected[~np.isin(expected, _days(holidays))]
+    positions = np.flatnonzero(~np.isin(expected, _days(stored)))
+    if not len(positions):
+        return []
+    runs = np.split(positions, np.flatnonzero(np.diff(positions) != 1) + 1)
+    return [(expected[run[0]], expected[run[-1]]) for run in runs]
+
+
+def merge_ranges(ranges, max_gap=MERGE_GAP_DAYS):
+    """Sort ranges and join the ones at most max_gap days apart."""
+    merged = []
+    for first, last in sorted((np.datetime64(a, "D"), np.datetime64(b, "D")) for a, b in ranges):
+        if merged and (first - merged[-1][1]).astype(int) <= max_gap:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return [(a, b) for a, b in merged]
+
+
+def plan(coverage, keys, start, end, groups=None, max_gap=MERGE_GAP_DAYS, min_series=2, fallback_holidays=None):
+    """{key: [(first, last) date strings]} to fetch so every key covers start..end.
+
+    coverage maps a key to its stored dates, keys are the series wanted
+    (stored or not) and groups maps a key to its holiday calendar group;
+    keys without a group share one. Groups with fewer than min_series stored
+    series use fallback_holidays, by default the holidays of all of coverage.
+    """
+    groups = groups or {}
+    members = {}
+    for key in set(keys) | set(coverage):
+        members.setdefault(groups.get(key), []).append(key)
+    if fallback_holidays is None:
+        fallback_holidays = market_holidays(coverage, None, min_series)
+    holidays = {}
+    for group, group_keys in members.items():
+        stored = sum(1 for key in group_keys if len(coverage.get(key, ())))
+        holidays[group] = market_holidays(coverage, group_keys, min_series) if stored >= min_series else _days(fallback_holidays)
+
+    result = {}
+    for key in keys:
+        ranges = missing_ranges(coverage.get(key, ()), start, end, holidays[groups.get(key)])
+        if ranges:
+            result[key] = [tuple(_strings(pair)) for pair in merge_ranges(ranges, max_gap)]
+    return result
+
+
+def plan_after(last_dates, keys, end, default_start):
+    """{key: [(first, last)]} of the weekdays after each key's last stored date, up to end."""
+    result = {}
+    for key in keys:
+        last = last_dates.get(key)
+        start = np.datetime64(last, "D") + 1 if last else np.datetime64(default_start, "D")
+        days = weekdays(start, end)
+        if len(days):
+            result[key] = [tuple(_strings([days[0], days[-1]]))]
+    return result
+
+
+def combined(plans, max_gap=MERGE_GAP_DAYS):
+    """The ranges of several keys' plans merged into one list, for sources that fetch every key at once."""
+    return [tuple(_strings(pair)) for pair in merge_ranges([r for ranges in plans.values() for r in ranges], max_gap)]
+
+
+def in_ranges(date, ranges):
+    """Whether the date string lies in one of the sorted, disjoint (first, last) ranges."""
+    # bisect's key= needs Python 3.10
+    starts = [first for first, _ in ranges]
+    i = bisect.bisect_right(starts, date) - 1
+    return i >= 0 and ranges[i][0] <= date <= ranges[i][1]
+
+
+def summary(plans):
+    """(number of ranges, number of weekdays) a plan asks for."""
+    ranges = [r for key_ranges in plans.values() for r in key_ranges]
+    return len(ranges), int(sum(len(weekdays(first, last)) for first, last in ranges))
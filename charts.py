@@ -0,0 +1,325 @@
+"""Long-lived matplotlib charts that are updated in place.
+
+The view owns one Figure and canvas per chart for the lifetime of the window.
+These classes keep the artists of a chart and move, relabel or restyle them
+when new data arrives, then call draw_idle, instead of building a new figure
+and canvas widget on every redraw.
+"""
+import math
+
+import numpy as np
+import matplotlib.dates as mdates
+
+
+# pie layout, same as the Axes.pie defaults used before
+START_ANGLE = 90
+LABEL_DISTANCE = 1.1
+PCT_DISTANCE = 0.6
+
+# how close, in pixels, the mouse has to be to a point to show its annotation
+HOVER_RADIUS = 8
+
+# lines are downsampled to one point per this many pixels of axes width
+PIXELS_PER_POINT = 2
+
+
+def autopct_format(pct, allvals, currency):
+    absolute = int(round(pct/100.*sum(allvals)))
+    return f"{pct:.1f}%\n({currency} {absolute:,})"
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling; returns the indices of the kept points.
+
+    The first and last points are always kept. The points in between are
+    split into threshold - 2 buckets and from each bucket the point forming the
+    largest triangle with the previously kept point and the average of the
+    next bucket is kept, which preserves peaks and dips of the line.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # bucket edges over the points between the first and the last one
+    edges = np.arange(threshold - 1) * (n - 2) // (threshold - 2) + 1
+    averages_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+    averages_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+
+    # buckets hold a handful of points, plain floats beat per-bucket numpy calls here
+    xs, ys = x.tolist(), y.tolist()
+    next_x = averages_x[1:].tolist() + [xs[-1]]
+    next_y = averages_y[1:].tolist() + [ys[-1]]
+    edges = edges.tolist()
+
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        ax, ay = xs[a], ys[a]
+        dx, dy = ax - next_x[i], next_y[i] - ay
+        best = -1.0
+        for j in range(edges[i], edges[i + 1]):
+            area = abs(dx * (ys[j] - ay) - (ax - xs[j]) * dy)
+            if area > best:
+                best, a = area, j
+        kept.append(a)
+    kept.append(n - 1)
+    return np.array(kept)
+
+
+class PieChart:
+    """A pie of account balances with a title and a total line under it.
+
+    The wedges are only rebuilt when the set of accounts changes; otherwise
+    their angles and the label and percentage texts are updated in place.
+    """
+
+    def __init__(self, figure, title, txtColor, txtAlpha):
+        self.figure = figure
+        self.ax = figure.add_subplot()
+        self.ax.axis('equal')
+        self.ax.set_title(title, color=txtColor, alpha=txtAlpha)
+        self.txtColor = txtColor
+        self.txtAlpha = txtAlpha
+
+        self.balance_text = figure.text(
+            0.5, 0.01, "",
+            ha='center', va='bottom', fontsize=10, color=txtColor, alpha=txtAlpha
+        )
+
+        self._labels = None
+        self.wedges, self.label_texts, self.pct_texts = [], [], []
+
+    def update(self, balances, currency, total_balance):
+        """Show {account: positive balance} and the total line, then schedule a redraw."""
+        labels = list(balances.keys())
+        sizes = list(balances.values())
+
+        if labels != self._labels:
+            self._rebuild(labels, sizes, currency)
+        else:
+            self._move(sizes, currency)
+
+        self.balance_text.set_text(f"Balance: {currency} {total_balance:,.2f}")
+        self.figure.canvas.draw_idle()
+
+    def _rebuild(self, labels, sizes, currency):
+        for artist in self.wedges + self.label_texts + self.pct_texts:
+            artist.remove()
+
+        self.wedges, self.label_texts, self.pct_texts = self.ax.pie(
+            sizes, labels=labels, autopct=lambda pct: autopct_format(pct, sizes, currency), startangle=START_ANGLE
+        )
+        self.ax.axis('equal')
+        for text in self.label_texts + self.pct_texts:
+            text.set_color(self.txtColor)
+            text.set_alpha(self.txtAlpha)
+        self._labels = labels
+
+    def _move(self, sizes, currency):
+        total = sum(sizes)
+        theta1 = START_ANGLE / 360
+        for wedge, label, pct, size in zip(self.wedges, self.label_texts, self.pct_texts, sizes):
+            frac = size / total
+            theta2 = theta1 + frac
+            wedge.set_theta1(360. * theta1)
+            wedge.set_theta2(360. * theta2)
+
+            thetam = math.pi * (theta1 + theta2)
+            x, y = math.cos(thetam), math.sin(thetam)
+            label.set_position((LABEL_DISTANCE * x, LABEL_DISTANCE * y))
+            label.set_horizontalalignment('left' if x > 0 else 'right')
+            pct.set_position((PCT_DISTANCE * x, PCT_DISTANCE * y))
+            pct.set_text(autopct_format(100. * frac, sizes, currency))
+            theta1 = theta2
+
+
+class LineChart:
+    """The account balance lines, with a blitted hover annotation and click selection.
+
+    One Line2D is kept per account and reused while the account stays
+    selected. Lines only draw an LTTB sample sized to the axes width of the
+    visible range, re-sampled on zoom and resize, while hover and click
+    lookups use every original point. Hovering only redraws the annotation
+    on top of a cached background; clicking a point pins the annotation and
+    calls on_select("YYYY-MM-DD").
+    """
+
+    def __init__(self, figure, txtColor, txtAlpha, on_select=None):
+        self.figure = figure
+        self.canvas = figure.canvas
+        self.ax = figure.add_subplot()
+        self.txtColor = txtColor
+        self.txtAlpha = txtAlpha
+        self.on_select = on_select
+        self.currency = ""
+
+        self.lines = {}
+        # full resolution (date numbers, balances) per account
+        self.points = {}
+        self._resampling = False
+        self._sampled_for = None
+        self.change_text = figure.text(
+            0.01, 0.01, "",
+            ha='left', va='bottom', fontsize=10, color=txtColor, alpha=txtAlpha
+        )
+
+        self.ax.xaxis_date()
+        self.ax.tick_params(axis='x', colors="gray")
+        self.ax.tick_params(axis='y', colors="gray")
+        self.ax.xaxis.set_alpha(txtAlpha)
+        self.ax.yaxis.set_alpha(txtAlpha)
+
+        self.hover = self._annotation(animated=True)
+        self.selection = self._annotation(animated=False)
+
+        self._background = None
+        self._points = None
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.canvas.mpl_connect("motion_notify_event", self._on_motion)
+        self.canvas.mpl_connect("button_press_event", self._on_click)
+        self.canvas.mpl_connect("resize_event", lambda event: self._resample())
+        self.ax.callbacks.connect("xlim_changed", lambda ax: self._resample())
+
+    def _annotation(self, animated):
+        annotation = self.ax.annotate(
+            "", xy=(0, 0), xytext=(15, 15), textcoords="offset points",
+            bbox=dict(boxstyle="round", fc="black", alpha=0.8), color="white",
+            arrowprops=dict(arrowstyle="->", color="gray"), animated=animated
+        )
+        annotation.set_visible(False)
+        return annotation
+
+    def update(self, series, currency, title, ylabel, change_text=""):
+        """Show [(account, dates, balances)] in order, reusing the lines of accounts still shown."""
+        self.currency = currency
+        shown = {account for account, _, _ in series}
+        for account in list(self.lines):
+            if account not in shown:
+                self.lines.pop(account).remove()
+                del self.points[account]
+
+        self._resampling = True
+        handles = []
+        for i, (account, dates, balances) in enumerate(series):
+            x = np.asarray(mdates.date2num(dates), dtype=float)
+            y = np.asarray(balances, dtype=float)
+            self.points[account] = (x, y)
+            kept = lttb(x, y, self._threshold())
+
+            line = self.lines.get(account)
+            if line is None:
+                line, = self.ax.plot(x[kept], y[kept], marker='o', linestyle='-', label=account)
+                self.lines[account] = line
+            else:
+                line.set_data(x[kept], y[kept])
+            # same colors as a fresh plot of the selection would get
+            line.set_color(f"C{i % 10}")
+            handles.append(line)
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+        # get_xlim applies the pending autoscale, the samples above already cover it
+        self._sampled_for = (self.ax.get_xlim(), self._threshold())
+        self._resampling = False
+
+        self.ax.set_xlabel("Date", color=self.txtColor, alpha=self.txtAlpha)
+        self.ax.set_ylabel(ylabel, color=self.txtColor, alpha=self.txtAlpha)
+        self.ax.set_title(title, color=self.txtColor, alpha=self.txtAlpha)
+        self.ax.legend(handles=handles)
+        self.change_text.set_text(change_text)
+
+        self.hover.set_visible(False)
+        self.selection.set_visible(False)
+        self._points = None
+        self.canvas.draw_idle()
+
+    def _threshold(self):
+        return max(int(self.ax.bbox.width / PIXELS_PER_POINT), 3)
+
+    def max_points(self):
+        """How many points per line the axes can show at its current width."""
+        return self._threshold()
+
+    def _resample(self):
+        """Re-sample every line for the visible x range and the current axes width."""
+        if self._resampling or not self.lines:
+            return
+        xmin, xmax = self.ax.get_xlim()
+        threshold = self._threshold()
+        if self._sampled_for == ((xmin, xmax), threshold):
+            return
+        self._resampling = True
+        self._sampled_for = ((xmin, xmax), threshold)
+        for account, line in self.lines.items():
+            x, y = self.points[account]
+            # keep one point outside each side so the line still reaches the edges
+            start = max(np.searchsorted(x, xmin) - 1, 0)
+            end = min(np.searchsorted(x, xmax, side="right") + 1, len(x))
+            kept = start + lttb(x[start:end], y[start:end], threshold)
+            line.set_data(x[kept], y[kept])
+        self._resampling = False
+        self.canvas.draw_idle()
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._points = None
+
+    def _display_points(self):
+        """Screen positions of every original point, cached until the next full draw."""
+        if self._points is None:
+            self._points = []
+            for account, line in self.lines.items():
+                x, y = self.points[account]
+                if not len(x):
+                    continue
+                xy = np.column_stack([x, y])
+                self._points.append((line, xy, self.ax.transData.transform(xy)))
+        return self._points
+
+    def _nearest(self, event):
+        """Return (line, x, y) of the point closest to the mouse, or None when nothing is near."""
+        if event.inaxes is not self.ax or event.x is None:
+            return None
+
+        best = None
+        for line, xy, display in self._display_points():
+            distances = np.hypot(display[:, 0] - event.x, display[:, 1] - event.y)
+            i = int(np.argmin(distances))
+            if distances[i] <= HOVER_RADIUS and (best is None or distances[i] < best[0]):
+                best = (distances[i], line, xy[i, 0], xy[i, 1])
+        return None if best is None else best[1:]
+
+    def _describe(self, annotation, line, x, y):
+        annotation.xy = (x, y)
+        annotation.set_text(
+            f"{line.get_label()}\nDate: {mdates.num2date(x).strftime('%Y-%m-%d')}\nBalance: {self.currency} {y:,.2f}"
+        )
+        annotation.set_visible(True)
+
+    def _blit_hover(self):
+        if self._background is None:
+            return
+        self.canvas.restore_region(self._background)
+        if self.hover.get_visible():
+            self.ax.draw_artist(self.hover)
+        self.canvas.blit(self.figure.bbox)
+
+    def _on_motion(self, event):
+        point = self._nearest(event)
+        if point is None:
+            if self.hover.get_visible():
+                self.hover.set_visible(False)
+                self._blit_hover()
+            return
+        self._describe(self.hover, *point)
+        self._blit_hover()
+
+    def _on_click(self, event):
+        point = self._nearest(event)
+        if point is None:
+            return
+        self.hover.set_visible(False)
+        self._describe(self.selection, *point)
+        self.canvas.draw_idle()
+        if self.on_select is not None:
+            self.on_select(mdates.num2date(point[1]).strftime('%Y-%m-%d'))
@@ -1,32 +1,31 @@
 import pandas as pd
 import numpy as np
 from PyQt6.QtWidgets import QFileDialog, QMessageBox, QMainWindow
+from PyQt6.QtCore import QThreadPool, QTimer
 from datetime import datetime, timedelta
-import mplcursors  # Import for interactive tooltips
 from model import FinanceModel
+import series_engine
+import ods_reader
+from db_connection import connection_manager
+from instrumentation import recorder, traced
+from redraw import RedrawScheduler
 from view import FinanceView
-from functools import lru_cache
+from workers import Worker
 import time
 import logging
 
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 
 # Set up logging for performance monitoring
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def autopct_format(pct, allvals, currency):
-    absolute = int(round(pct/100.*sum(allvals)))
-    return f"{pct:.1f}%\n({currency} {absolute:,})"
-
-
 def performance_monitor(func):
-    """Decorator to monitor function performance."""
+    """Decorator to monitor function performance; the calls are also recorded as spans."""
     def wrapper(*args, **kwargs):
         start_time = time.time()
-        result = func(*args, **kwargs)
+        with recorder.span(func.__name__):
+            result = func(*args, **kwargs)
         end_time = time.time()
         logger.info(f"{func.__name__} took {end_time - start_time:.4f} seconds")
         return result
@@ -40,7 +39,16 @@ class FinanceController(QMainWindow):
 
         self._cached_account_data = None  # Cache for account data
         self._cached_plot_data = {}  # Cache for plot calculations
-        self.get_account_data()
+
+        # Import, load_data and FX/price resolution run on a pool thread
+        self.thread_pool = QThreadPool.globalInstance()
+        self._worker = None
+        self._worker_started = None
+        self._loading = False
+
+        # Checkbox and timeframe changes only mark the chart dirty, it is redrawn once per burst
+        self.redraws = RedrawScheduler()
+        self.redraws.register("net_worth", self.plot_net_worth)
 
         self.view = FinanceView(self)
 
@@ -49,83 +57,178 @@ class FinanceController(QMainWindow):
         self.txtColor = self.view.txtColor
         self.txtAlpha = self.view.txtAlpha
 
+        # The charts keep their figures and artists for the lifetime of the window.
+        # They are built on first use, so matplotlib loads after the window is shown.
+        self._net_worth_chart = None
+        self._pie_charts = {}
+        self.pie_titles = {
+            "summary": "Summary Distribution",
+            "operating": "Operating Accounts Distribution",
+            "investing": "Investment Accounts Distribution",
+            "crypto": "Crypto Accounts Distribution",
+            "equity": "Equity Accounts Distribution",
+        }
+        self._pending_pie_charts = []
+        self._pie_args = ()
+
         self.setCentralWidget(self.view)
         self.setWindowTitle("Net Worth Tracker")
 
-        self.update_checkboxes()
-        self.plot_net_worth()
+        # The window shows right away, the charts are drawn once the data arrives
+        self.view.display_graph_empty("Loading data...")
+        self.reload_data()
 
-        if self.model.investingList:
-            self.plot_investment_pie_chart()
+    def get_account_data(self):
+        """Return the current dataset; empty while a background load is still running."""
+        if self._cached_account_data is None:
+            if self._loading:
+                return {}
+            self._cached_account_data = self.model.load_data()
+        return self._cached_account_data
 
-        if self.model.operatingList:
-            self.plot_operating_pie_chart()
+    def _start_worker(self, fn, *args, on_finished):
+        """Cancel any running job and start fn on the thread pool."""
+        self.cancel_background_work()
+
+        worker = Worker(fn, *args)
+        worker.signals.progress.connect(lambda stage, percent, w=worker: self._on_worker_progress(w, stage, percent))
+        worker.signals.finished.connect(lambda result, w=worker: self._on_worker_finished(w, on_finished, result))
+        worker.signals.error.connect(lambda message, w=worker: self._on_worker_error(w, message))
+        worker.signals.cancelled.connect(lambda w=worker: self._on_worker_cancelled(w))
+
+        self._worker = worker
+        self._worker_started = time.time()
+        self._loading = True
+        self.view.show_progress("starting", 0)
+        self.thread_pool.start(worker)
+
+    def cancel_background_work(self):
+        """Ask the running import or reload to stop at its next checkpoint."""
+        if self._worker is not None:
+            self._worker.cancel()
+
+    def _on_worker_progress(self, worker, stage, percent):
+        if worker is self._worker:
+            self.view.show_progress(stage, percent)
+
+    def _finish_worker(self, worker):
+        """Clear the running job; returns False for superseded jobs whose results are dropped."""
+        if worker is not self._worker:
+            return False
+        self._worker = None
+        self._loading = False
+        self.view.hide_progress()
+        self.view.import_button.setEnabled(True)
+        return True
+
+    def _on_worker_finished(self, worker, on_finished, result):
+        if not self._finish_worker(worker):
+            return
+        on_finished(result)
+        logger.info(f"time to interactive {time.time() - self._worker_started:.4f} seconds")
 
-        if self.model.cryptoList:
-            self.plot_crypto_pie_chart()
+    def _on_worker_error(self, worker, message):
+        if not self._finish_worker(worker):
+            return
+        QMessageBox.critical(self, "Error", message)
+        if self._cached_account_data is None:
+            self.view.display_graph_empty("No financial data available to plot.")
 
-        if self.model.equityList:
-            self.plot_equity_pie_chart()
+    def _on_worker_cancelled(self, worker):
+        if not self._finish_worker(worker):
+            return
+        # keep showing the previous dataset, if there is one
+        if self._cached_account_data is not None:
+            self.refresh_charts()
+        else:
+            self.view.display_graph_empty("Loading cancelled.")
 
-        if self.model.summaryList:
-            self.plot_summary_pie_chart()
+    def reload_data(self):
+        """Recompute the dataset in the background and swap it in when done."""
+        self._start_worker(self.model.load_data, on_finished=self._apply_account_data)
 
     @performance_monitor
-    def get_account_data(self):
-        if self._cached_account_data is None:
-            self._cached_account_data = self.model.load_data()
-        return self._cached_account_data
-    
+    def _apply_account_data(self, account_data):
+        """Swap in a freshly computed dataset and redraw everything."""
+        self._cached_account_data = account_data
+        self._cached_plot_data.clear()
+
+        stats = connection_manager.stats()
+        logger.info(f"database usage: {stats['connections']} connections, {stats['queries']} queries")
+        for cache, counts in recorder.summary()["caches"].items():
+            logger.info(f"{cache}: {counts['hits']} hits, {counts['misses']} misses")
+        redraws = self.redraws.stats()
+        logger.info(f"redraws: {redraws['performed']} drawn, {redraws['avoided']} avoided of {redraws['requested']} requested")
+
+        self.update_checkboxes()
+        self.refresh_charts()
+
+    def refresh_charts(self, *args):
+        """Redraw the net worth line, then the pie charts one per event loop turn.
+
+        Drawing progressively keeps the window responsive and shows the first
+        chart as soon as it is ready instead of after all six.
+        """
+        self.plot_net_worth()
+
+        scheduled = bool(self._pending_pie_charts)
+        self._pending_pie_charts = self._pie_chart_plotters()
+        self._pie_args = args
+        if self._pending_pie_charts and not scheduled:
+            QTimer.singleShot(0, self._plot_next_pie_chart)
+
+    def _plot_next_pie_chart(self):
+        if not self._pending_pie_charts:
+            return
+        plot = self._pending_pie_charts.pop(0)
+        plot(*self._pie_args)
+        if self._pending_pie_charts:
+            QTimer.singleShot(0, self._plot_next_pie_chart)
+
+    def _pie_chart_plotters(self):
+        """The plot functions of the configured pie charts, in drawing order."""
+        if not self.get_account_data():
+            return []
+        return [plot for groupList, plot in [
+            (self.model.investingList, self.plot_investment_pie_chart),
+            (self.model.operatingList, self.plot_operating_pie_chart),
+            (self.model.cryptoList, self.plot_crypto_pie_chart),
+            (self.model.equityList, self.plot_equity_pie_chart),
+            (self.model.summaryList, self.plot_summary_pie_chart),
+        ] if groupList]
+
+    def plot_pie_charts(self, *args):
+        """Redraw the configured pie charts, for today or the given date."""
+        self._pending_pie_charts = []
+        for plot in self._pie_chart_plotters():
+            plot(*args)
+
+    def _get_net_worth_chart(self):
+        if self._net_worth_chart is None:
+            from charts import LineChart
+            self._net_worth_chart = LineChart(self.view.chart_figure("graph"), self.txtColor, self.txtAlpha, on_select=self.plot_pie_charts)
+        return self._net_worth_chart
+
+    def _get_pie_chart(self, name, groupList):
+        if name not in self._pie_charts:
+            from charts import PieChart
+            fig = self.view.chart_figure(name)
+            self._pie_charts[name] = PieChart(fig, self.pie_titles[name], self.txtColor, self.txtAlpha)
+            # Add event to run a function when the pie chart is clicked anywhere
+            fig.canvas.mpl_connect("button_press_event", lambda event: self.select_grouped_accounts(groupList))
+        return self._pie_charts[name]
+
     def set_main_currency(self, currency):
         self.model.main_currency = currency
-        self._cached_account_data = None  # Invalidate cache
-        self._cached_plot_data.clear()  # Clear plot cache
-        self.plot_net_worth()
-        self.plot_crypto_pie_chart()
-        self.plot_operating_pie_chart()
-        self.plot_investment_pie_chart()
-        self.plot_equity_pie_chart()
-        self.plot_summary_pie_chart()
-
-    @lru_cache(maxsize=128)
-    def _get_account_balance_at_date(self, account, date_str):
-        """Cached method to get account balance at a specific date."""
-        account_data = self.get_account_data()
-        if account not in account_data:
-            return 0
-        
-        date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        account_dates = account_data[account]
-        
-        if date in account_dates:
-            return account_dates[date]
-        
-        # Interpolate if date not found
-        dates = sorted(account_dates.keys())
-        if not dates:
-            return 0
-            
-        # Find closest dates for interpolation
-        for i in range(len(dates) - 1):
-            prev_date, next_date = dates[i].date(), dates[i + 1].date()
-            if prev_date <= date <= next_date:
-                prev_balance, next_balance = account_dates[dates[i]], account_dates[dates[i + 1]]
-                days_diff = (next_date - prev_date).days
-                if days_diff == 0:
-                    return prev_balance
-                balance_diff = next_balance - prev_balance
-                days_to_target = (date - prev_date).days
-                return prev_balance + (balance_diff / days_diff) * days_to_target
-        
-        # If date is before first date or after last date, return closest value
-        if dates:
-            if date < dates[0].date():
-                return account_dates[dates[0]]
-            elif date > dates[-1].date():
-                return account_dates[dates[-1]]
-        
-        return 0
+        self.reload_data()
 
+    def _balances_at(self, accounts, date):
+        """Return {account: balance} at date for the listed accounts with a non-zero balance."""
+        account_data = self.get_account_data()
+        if not account_data:
+            return {}
+        balances = account_data.balances_at(date, accounts)
+        return {account: balance for account, balance in zip(accounts, balances.tolist()) if balance != 0}
 
     def update_checkboxes(self):
         account_data = self.get_account_data()
@@ -137,88 +240,44 @@ class FinanceController(QMainWindow):
         if not ods_file:
             return  
 
-        try:
-            # Load all sheets from the ODS file
-            sheets = pd.read_excel(ods_file, sheet_name=None, engine="odf")
-
-            for sheet_name, df in sheets.items():
-                if df.empty:
-                    continue  # Skip empty sheets
-
-                # Ensure we use the first column for the account name
-                account_name = df.iloc[0, 0] if not df.empty else sheet_name  
-
-                # Ensure only first four columns are used
-                df = df.iloc[:, :5]
-
-                #print(df.head())  # Debugging: print the first few rows of the DataFrame
+        self.view.import_button.setEnabled(False)
+        self._start_worker(self._import_and_reload, ods_file, on_finished=self._on_import_finished)
 
-                #df.columns = ["account", "date", "balance", "currency", "ticker"]  # Rename columns
-                if df.shape[1] == 5:
-                    df.columns = ["account", "date", "balance", "currency", "ticker"]
-                elif df.shape[1] == 4:
-                    df.columns = ["account", "date", "balance", "currency"]
-                    df["ticker"] = ""  # Add empty ticker column
-                else:
-                    QMessageBox.warning(self, "Warning", f"Sheet '{sheet_name}' has unexpected number of columns ({df.shape[1]}). Skipping.")
-                    continue
+    def _import_and_reload(self, ods_file, progress=None, is_cancelled=None):
+        """Worker job: import the workbook, then compute the new dataset."""
+        progress("reading workbook", 0)
+        # Load all sheets from the ODS file, streamed from its XML rather than through odfpy
+        with recorder.profiled("read_workbook"):
+            sheets = ods_reader.read_sheets(ods_file)
 
+        # Validate and upsert the whole workbook in one transaction
+        with recorder.profiled("import_sheets"):
+            results = self.model.import_sheets(sheets, progress=progress, is_cancelled=is_cancelled)
+        return results, self.model.load_data(progress=progress, is_cancelled=is_cancelled)
 
-                for _, row in df.iterrows():
-                    #print(f"Processing row:{_} {row}")  # Debugging: print each row being processed
+    def _on_import_finished(self, result):
+        results, account_data = result
 
-                    try:
-                        # Skip row if 'date' or 'balance' is missing or invalid
-                        if pd.isna(row['date']) or pd.isna(row['balance']):
-                            continue
-                                
-                        date = str(row["date"].date()).strip()
-                        datetime.strptime(date, "%Y-%m-%d")  # Validate date format
-                        #print("date {}".format(date))
-
-                        currency = str(row["currency"]).strip()
-                        #print("currency: {}".format(currency))
-
-                        ticker = str(row["ticker"]).strip()
-                        #print("ticker:{}".format(ticker))
-                        if ticker == "NaN":
-                            ticker = ""
-                        if ticker == "nan":
-                            ticker = ""
-                        #print("ticker:{}".format(ticker))
-
-                        balance = str(row["balance"]).strip().replace("$", "").replace(",", "")
-                        if balance and currency:
-                            self.model.add_balance(account_name, date, float(balance), currency, ticker)
-
-
-                    except ValueError:
-                        print(f"Invalid date or balance in row: {row}")
-
-            QMessageBox.information(self, "Success", "Data successfully imported from ODS!")
+        for sheet_name, counts in results.items():
+            if "error" in counts:
+                QMessageBox.warning(self, "Warning", f"Sheet '{sheet_name}' has {counts['error']}. Skipping.")
+            else:
+                logger.info(f"Imported sheet '{sheet_name}': {counts['inserted']} inserted, {counts['updated']} updated, {counts['skipped']} skipped")
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error importing ODS: {e}")
+        self._apply_account_data(account_data)
 
-        # invalidate the cache
-        self._cached_account_data = None 
-        self._cached_plot_data.clear()
-        self._get_account_balance_at_date.cache_clear()
-
-        # Update checkboxes after importing data
-        self.update_checkboxes()
-        self.plot_net_worth()
-        self.plot_crypto_pie_chart()
-        self.plot_operating_pie_chart()
-        self.plot_investment_pie_chart()
-        self.plot_equity_pie_chart()
-        self.plot_summary_pie_chart()
+        inserted = sum(counts["inserted"] for counts in results.values())
+        updated = sum(counts["updated"] for counts in results.values())
+        skipped = sum(counts["skipped"] for counts in results.values())
+        QMessageBox.information(
+            self, "Success",
+            f"Data successfully imported from ODS!\n\n{inserted} rows inserted, {updated} updated, {skipped} skipped."
+        )
 
     def cleanup_memory(self):
         """Clean up memory by clearing caches and unused objects."""
         self._cached_account_data = None
         self._cached_plot_data.clear()
-        self._get_account_balance_at_date.cache_clear()
         
         # Force garbage collection
         import gc
@@ -227,9 +286,14 @@ class FinanceController(QMainWindow):
     def closeEvent(self, event):
         """Handle application closure and cleanup."""
         self.cleanup_memory()
+        connection_manager.close_all()
         super().closeEvent(event)
 
 
+    def schedule_net_worth(self, *args, delay_ms=None):
+        """Redraw the net worth chart once the current burst of changes is over."""
+        self.redraws.request("net_worth", delay_ms=delay_ms)
+
     def toggle_all_accounts(self):
         """Toggles all account checkboxes between checked and unchecked."""
         new_state = not all(var.isChecked() for var in self.view.account_check_vars.values())  
@@ -237,22 +301,7 @@ class FinanceController(QMainWindow):
             var.setChecked(new_state)
 
         # Refresh the graph after toggling checkboxes
-        self.plot_net_worth()
-
-        if self.model.investingList:
-            self.plot_investment_pie_chart()
-
-        if self.model.operatingList:
-            self.plot_operating_pie_chart()
-
-        if self.model.cryptoList:
-            self.plot_crypto_pie_chart()
-
-        if self.model.equityList:
-            self.plot_equity_pie_chart()
-
-        if self.model.summaryList:
-            self.plot_summary_pie_chart()   
+        self.refresh_charts()
 
 
     def select_grouped_accounts(self, groupList):
@@ -266,313 +315,58 @@ class FinanceController(QMainWindow):
             else:
                 var.setChecked(False)
 
-    def plot_crypto_pie_chart(self, *args):
-        date = args[0] if args else datetime.today().date()
-        if isinstance(date, str):
-            date = datetime.strptime(date, "%Y-%m-%d")
-        
-        # Use cached method for better performance
-        account_balances = {}
-        date_str = date.strftime("%Y-%m-%d") if isinstance(date, datetime) else str(date)
-        
-        if self.model.cryptoList:
-            for account in self.model.cryptoList:
-                balance = self._get_account_balance_at_date(account, date_str)
-                if balance != 0:
-                    account_balances[account] = abs(balance)
-
-            # Sum all account balances for the crypto pie chart
-            total_balance = sum(account_balances.values())
+    @traced("plot_pie_chart")
+    def _plot_pie_chart(self, name, groupList, date=None, signed_total=False):
+        """Update one pie chart in place with the balances of groupList at date (default today).
 
-            # Only create pie chart if there are balances to show
-            if account_balances and total_balance > 0:
-                labels = list(account_balances.keys())
-                sizes = list(account_balances.values())
-                fig, ax = plt.subplots()
-                ax.pie(sizes, labels=labels, autopct=lambda pct: autopct_format(pct, sizes, self.model.main_currency), startangle=90)
-                ax.axis('equal')
-                ax.set_title("Crypto Accounts Distribution", color=self.txtColor, alpha=self.txtAlpha)
-
-                fig.text(
-                    0.5, 0.01,
-                    f"Balance: {self.model.main_currency} {total_balance:,.2f}",
-                    ha='center', va='bottom', fontsize=10, color=self.txtColor, alpha=self.txtAlpha
-                )
-
-                # Add event to run a function when the pie chart is clicked anywhere
-                fig.canvas.mpl_connect("button_press_event", lambda event: self.select_grouped_accounts(self.model.cryptoList))
-
-                self.view.display_crypto_graph(fig)
-                plt.close(fig)
-            else:
-                # Display empty state message
-                self.view.display_crypto_empty("No crypto data available for selected date")
-
-
-
-    def plot_operating_pie_chart(self, *args):
-        date = args[0] if args else datetime.today().date()
+        signed_total sums the balances before taking their absolute value for the wedges.
+        """
+        if date is None:
+            date = datetime.today().date()
         if isinstance(date, str):
             date = datetime.strptime(date, "%Y-%m-%d")
-        
-        # Use cached method for better performance
-        account_balances = {}
-        date_str = date.strftime("%Y-%m-%d") if isinstance(date, datetime) else str(date)
-        
-        if self.model.operatingList:
-            for account in self.model.operatingList:
-                balance = self._get_account_balance_at_date(account, date_str)
-                if balance != 0:
-                    account_balances[account] = abs(balance)
 
-            # Sum all account balances for the operating pie chart
+        account_balances = self._balances_at(groupList, date)
+        if signed_total:
             total_balance = sum(account_balances.values())
-
-            # Only create pie chart if there are balances to show
-            if account_balances and total_balance > 0:
-                labels = list(account_balances.keys())
-                sizes = list(account_balances.values())
-                fig, ax = plt.subplots()
-                ax.pie(sizes, labels=labels, autopct=lambda pct: autopct_format(pct, sizes, self.model.main_currency), startangle=90)
-                ax.axis('equal')
-                ax.set_title("Operating Accounts Distribution", color=self.txtColor, alpha=self.txtAlpha)
-
-                fig.text(
-                    0.5, 0.01,
-                    f"Balance: {self.model.main_currency} {total_balance:,.2f}",
-                    ha='center', va='bottom', fontsize=10, color=self.txtColor, alpha=self.txtAlpha
-                )
-
-                # Add event to run a function when the pie chart is clicked anywhere
-                fig.canvas.mpl_connect("button_press_event", lambda event: self.select_grouped_accounts(self.model.operatingList))
-
-                self.view.display_operating_graph(fig)
-                plt.close(fig)
-            else:
-                # Display empty state message
-                self.view.display_operating_empty("No operating data available for selected date")
-
-    def plot_investment_pie_chart(self, *args):
-        account_balances = {}
-        date = args[0] if args else datetime.today().date()
-
-        if isinstance(date, str):
-            date = datetime.strptime(date, "%Y-%m-%d")
-        account_data = self.get_account_data()
-        if self.model.investingList:
-            for account in self.model.investingList:
-                if account in account_data:
-                    if date in account_data[account]:
-                        account_balances[account] = account_data[account][date]
-                    else:
-                        #interpolate
-                        dates = list(account_data[account].keys())
-
-                        balances = list(account_data[account].values())
-                        
-                        for i in range(len(dates) - 1):
-                            prev_date, next_date = dates[i].date(), dates[i + 1].date()
-
-                            if isinstance(date, datetime):
-                                date = date.date()
-
-
-                            if prev_date < date < next_date:
-                                prev_balance, next_balance = balances[i], balances[i + 1]
-                                days_diff = (next_date - prev_date).days
-                                balance_diff = next_balance - prev_balance
-                                days_to_target = (date - prev_date).days
-                                interpolated_balance = prev_balance + (balance_diff / days_diff) * days_to_target
-                                account_balances[account] = interpolated_balance
-                                break
-
+        account_balances = {account: abs(balance) for account, balance in account_balances.items()}
+        if not signed_total:
             total_balance = sum(account_balances.values())
 
-            removeZeroKeys = []
-
-            for key, value in account_balances.items():
-                if value < 0:
-                    account_balances[key] = value * -1
-                if value == 0:
-                    removeZeroKeys.append(key)
-
-            for key in removeZeroKeys:
-                if key in account_balances:        
-                    del account_balances[key]
+        # Only show a pie chart if there are balances to show
+        if not account_balances:
+            self.view.display_chart_empty(name, f"No {name} data available for selected date")
+            return
 
-            labels = account_balances.keys()
-            sizes = account_balances.values()
-            fig, ax = plt.subplots()
-            #ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
-            ax.pie(sizes, labels=labels, autopct=lambda pct: autopct_format(pct, sizes, self.model.main_currency), startangle=90)
-            ax.axis('equal')
-            ax.set_title("Investment Accounts Distribution", color=self.txtColor, alpha=self.txtAlpha)
+        self._get_pie_chart(name, groupList).update(account_balances, self.model.main_currency, total_balance)
+        self.view.display_pie(name)
 
-            fig.text(
-                0.5, 0.01,
-                f"Balance: {self.model.main_currency} {total_balance:,.2f}",
-                ha='center', va='bottom', fontsize=10, color=self.txtColor, alpha=self.txtAlpha
-            )
+    def plot_crypto_pie_chart(self, *args):
+        self._plot_pie_chart("crypto", self.model.cryptoList, *args)
 
-            fig.canvas.mpl_connect("button_press_event", lambda event: self.select_grouped_accounts(self.model.investingList))
+    def plot_operating_pie_chart(self, *args):
+        self._plot_pie_chart("operating", self.model.operatingList, *args)
 
-            self.view.display_investing_graph(fig)
-            plt.close(fig)
+    def plot_investment_pie_chart(self, *args):
+        self._plot_pie_chart("investing", self.model.investingList, *args, signed_total=True)
 
     def plot_equity_pie_chart(self, *args):
-        account_balances = {}
-        date = args[0] if args else datetime.today().date()
-
-        if isinstance(date, str):
-            date = datetime.strptime(date, "%Y-%m-%d")
-
-        account_data = self.get_account_data()
-        if self.model.equityList:
-            for account in self.model.equityList:
-                if account in account_data:
-                    if date in account_data[account]:
-                        account_balances[account] = account_data[account][date]
-                    else:
-                        #interpolate
-                        dates = list(account_data[account].keys())
-
-                        balances = list(account_data[account].values())
-                        
-                        for i in range(len(dates) - 1):
-                            prev_date, next_date = dates[i].date(), dates[i + 1].date()
-
-                            if isinstance(date, datetime):
-                                date = date.date()
-
-
-                            if prev_date < date < next_date:
-                                prev_balance, next_balance = balances[i], balances[i + 1]
-                                days_diff = (next_date - prev_date).days
-                                balance_diff = next_balance - prev_balance
-                                days_to_target = (date - prev_date).days
-                                interpolated_balance = prev_balance + (balance_diff / days_diff) * days_to_target
-                                account_balances[account] = interpolated_balance
-                                break
-
-
-
-
-            total_balance = sum(account_balances.values())
+        self._plot_pie_chart("equity", self.model.equityList, *args, signed_total=True)
 
-            removeZeroKeys = []
-
-            for key, value in account_balances.items():
-                if value < 0:
-                    account_balances[key] = value * -1
-                if value == 0:
-                    removeZeroKeys.append(key)
-
-            for key in removeZeroKeys:
-                if key in account_balances:        
-                    del account_balances[key]
-
-            labels = account_balances.keys()
-            sizes = account_balances.values()
-            fig, ax = plt.subplots()
-            #ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
-            ax.pie(sizes, labels=labels, autopct=lambda pct: autopct_format(pct, sizes, self.model.main_currency), startangle=90)
-            ax.axis('equal')
-
-            ax.set_title("Equity Accounts Distribution", color=self.txtColor, alpha=self.txtAlpha)
-
-            fig.text(
-                0.5, 0.01,
-                f"Balance: {self.model.main_currency} {total_balance:,.2f}",
-                ha='center', va='bottom', fontsize=10, color=self.txtColor, alpha=self.txtAlpha
-            )
-
-            fig.canvas.mpl_connect("button_press_event", lambda event: self.select_grouped_accounts(self.model.equityList))
-
-            self.view.display_equity_graph(fig)
-            plt.close(fig)
-
-    
     def plot_summary_pie_chart(self, *args):
-        account_balances = {}
-        date = args[0] if args else datetime.today().date()
-
-        if isinstance(date, str):
-            date = datetime.strptime(date, "%Y-%m-%d")
-
-        account_data = self.get_account_data()
-        if self.model.summaryList:
-            for account in self.model.summaryList:
-                if account in account_data:
-                    if date in account_data[account]:
-                        account_balances[account] = account_data[account][date]
-                    else:
-                        #interpolate
-                        dates = list(account_data[account].keys())
-
-                        balances = list(account_data[account].values())
-                        
-                        for i in range(len(dates) - 1):
-                            prev_date, next_date = dates[i].date(), dates[i + 1].date()
-
-                            if isinstance(date, datetime):
-                                date = date.date()
-
-
-                            if prev_date < date < next_date:
-                                prev_balance, next_balance = balances[i], balances[i + 1]
-                                days_diff = (next_date - prev_date).days
-                                balance_diff = next_balance - prev_balance
-                                days_to_target = (date - prev_date).days
-                                interpolated_balance = prev_balance + (balance_diff / days_diff) * days_to_target
-                                account_balances[account] = interpolated_balance
-                                break
-
-
-
-            # Sum all account balances for the summary pie chart
-            total_balance = sum(account_balances.values())
-           
-            removeZeroKeys = []
-
-            for key, value in account_balances.items():
-                if value < 0:
-                    account_balances[key] = value * -1
-                if value == 0:
-                    removeZeroKeys.append(key)
-
-            for key in removeZeroKeys:
-                if key in account_balances:        
-                    del account_balances[key]
-
-
-            labels = account_balances.keys()
-            sizes = account_balances.values()
-            fig, ax = plt.subplots()
-
-
-            ax.pie(sizes, labels=labels, autopct=lambda pct: autopct_format(pct, sizes, self.model.main_currency), startangle=90)
-            ax.axis('equal')
-
-            ax.set_title("Summary Distribution", color=self.txtColor, alpha=self.txtAlpha)
-
-            fig.text(
-                0.5, 0.01,
-                f"Balance: {self.model.main_currency} {total_balance:,.2f}",
-                ha='center', va='bottom', fontsize=10, color=self.txtColor, alpha=self.txtAlpha
-            )
-
-            fig.canvas.mpl_connect("button_press_event", lambda event: self.select_grouped_accounts(self.model.summaryList))
-
-            self.view.display_summary_graph(fig)
-            plt.close(fig)
-
-
+        self._plot_pie_chart("summary", self.model.summaryList, *args, signed_total=True)
 
+    @traced()
     def plot_net_worth(self, *args):
         """Plots net worth with dynamic time filtering and interactive tooltips."""
+        # drawing now satisfies any redraw still waiting in the scheduler
+        self.redraws.drawn("net_worth")
         account_data = self.get_account_data()
         if not account_data:
-            QMessageBox.warning(self, "No Data", "No financial data available to plot.")
+            if self._loading:
+                self.view.display_graph_empty("Loading data...")
+            else:
+                QMessageBox.warning(self, "No Data", "No financial data available to plot.")
             return
         
         selected_accounts = [account for account, var in self.view.account_check_vars.items() if var.isChecked()]
@@ -610,110 +404,31 @@ class FinanceController(QMainWindow):
         else:
             start_date = None  
 
-        fig, ax = plt.subplots(figsize=(8, 5))
-        fig.tight_layout()
-
-        lines = []
-
-        for account in selected_accounts:
-            if account in account_data:
-                dates = []
-                balances = []
-                for date, balance in account_data[account].items():
-
-                    if end_date:
-                        if date >= start_date and date <= end_date:
-                            dates.append(date)
-                            balances.append(balance)
-                    else:
-                        dates.append(date)
-                        balances.append(balance)
-
-                if start_date:
-                    filtered_dates = [d for d in dates if d >= start_date]
-                    filtered_balances = [b for d, b in zip(dates, balances) if d >= start_date]
-                else:
-                    filtered_dates, filtered_balances = dates, balances  
-
-                if filtered_dates:
-                    #print(f"Plotting account: {account} with {len(filtered_dates)} data points")
-                    #for date in filtered_dates:
-                        #print(f"\tDate: {date}, Balance: {account_data[account][date]}")
-                    # Convert dates to matplotlib date format
-                    #filtered_dates = mdates.date2num(filtered_dates)
-                    line, = ax.plot(filtered_dates, filtered_balances, marker='o', linestyle='-', label=account)
-                    lines.append(line)  
-
-        if lines:
-            cursor = mplcursors.cursor(lines, hover=False)
-            cursor.connect("add", lambda sel: sel.annotation.set_text(
-                f"{sel.artist.get_label()}\nDate: {mdates.num2date(sel.target[0]).strftime('%Y-%m-%d')}\nBalance: {self.model.main_currency} {sel.target[1]:,.2f}"
-            ))
-            cursor.connect("add", lambda sel: self.plot_crypto_pie_chart(mdates.num2date(sel.target[0]).strftime('%Y-%m-%d')))
-            cursor.connect("add", lambda sel: self.plot_operating_pie_chart(mdates.num2date(sel.target[0]).strftime('%Y-%m-%d')))
-            cursor.connect("add", lambda sel: self.plot_investment_pie_chart(mdates.num2date(sel.target[0]).strftime('%Y-%m-%d')))
-            cursor.connect("add", lambda sel: self.plot_equity_pie_chart(mdates.num2date(sel.target[0]).strftime('%Y-%m-%d')))
-            cursor.connect("add", lambda sel: self.plot_summary_pie_chart(mdates.num2date(sel.target[0]).strftime('%Y-%m-%d')))
-
-        ax.set_xlabel("Date", color=self.txtColor, alpha=self.txtAlpha)
-        ax.set_ylabel("Balance ({})".format(self.model.main_currency), color=self.txtColor, alpha=self.txtAlpha)
-        ax.set_title(f"Account Balances ({timeframe})", color=self.txtColor, alpha=self.txtAlpha)
-        ax.tick_params(axis='x', colors="gray")
-        ax.tick_params(axis='y', colors="gray")
-        ax.xaxis.set_alpha(self.txtAlpha)
-        ax.yaxis.set_alpha(self.txtAlpha)
-        ax.legend()
-        ax.grid()
-        plt.xticks(rotation=0)
-
-
-
-        # Calculate amount changed for the selected timeframe
-        if selected_accounts and any(filtered_dates for account in selected_accounts if account in account_data):
-            # Find the earliest and latest date in the filtered data
-            all_dates = []
-            for account in selected_accounts:
-                if account in account_data:
-                    #dates = [d for d in account_data[account].keys() if (not start_date or d >= start_date and d<=end_date)]
-                    dates = []
-                    for d in account_data[account].keys():
-                        if (not start_date or d >= start_date):
-                            if end_date:
-                                if (not end_date or d <= end_date):
-                                    dates.append(d)
-                            else:
-                                    dates.append(d)
-                    
-                    all_dates.extend(dates)
-            if all_dates:
-                min_date = min(all_dates)
-                max_date = max(all_dates)
-                start_total = 0
-                end_total = 0
-                for account in selected_accounts:
-                    if account in account_data:
-                        # Get balance at min_date
-                        start_balance = None
-                        end_balance = None
-                        dates = sorted(account_data[account].keys())
-                        # Find closest date <= min_date for start, and <= max_date for end
-                        for d in dates:
-                            if d <= min_date:
-                                start_balance = account_data[account][d]
-                            if d <= max_date:
-                                end_balance = account_data[account][d]
-                        if start_balance is not None:
-                            start_total += start_balance
-                        if end_balance is not None:
-                            end_total += end_balance
-                amount_changed = end_total - start_total
-                fig.text(
-                    0.01, 0.01,
-                    f"Amount Changed: {self.model.main_currency} {amount_changed:,.2f}   ({min_date.strftime('%Y-%m-%d')} to {max_date.strftime('%Y-%m-%d')})",
-                    ha='left', va='bottom', fontsize=10, color=self.txtColor, alpha=self.txtAlpha
-                )
-
-
-        self.view.display_graph(fig)
-        plt.close(fig)
+        # Pick the pre-aggregated level that fits the timeframe into the chart's width,
+        # then slice each account's sorted date array to the timeframe with a binary search
+        chart = self._get_net_worth_chart()
+        span_start = start_date if start_date is not None else account_data.axis[0]
+        level = series_engine.choose_level(span_start, end_date or today, chart.max_points())
+        series = account_data.level(level).between(selected_accounts, start_date, end_date)
+
+        # Calculate amount changed for the selected timeframe, from the daily data so the
+        # dates and the amount do not depend on the level drawn
+        change_text = ""
+        daily = account_data.between(selected_accounts, start_date, end_date) if level != "daily" else series
+        if daily:
+            # Sum the balances on or before the earliest and latest date with data
+            min_date = pd.Timestamp(min(dates[0] for _, dates, _ in daily))
+            max_date = pd.Timestamp(max(dates[-1] for _, dates, _ in daily))
+            start_total = np.nansum(account_data.balances_asof(min_date, selected_accounts))
+            end_total = np.nansum(account_data.balances_asof(max_date, selected_accounts))
+            amount_changed = end_total - start_total
+            change_text = f"Amount Changed: {self.model.main_currency} {amount_changed:,.2f}   ({min_date.strftime('%Y-%m-%d')} to {max_date.strftime('%Y-%m-%d')})"
+
+        chart.update(
+            series, self.model.main_currency,
+            title=f"Account Balances ({timeframe}, {level})",
+            ylabel="Balance ({})".format(self.model.main_currency),
+            change_text=change_text,
+        )
+        self.view.display_graph()
 
@@ -0,0 +1,171 @@
+"""On-disk cache of the dataset computed by FinanceModel.load_data.
+
+The cached state (the CAD-denominated series, account merges and group
+totals, plus the views already built for a main currency) is written as one
+.npy file per array next to a JSON manifest, so a warm start memory-maps the
+arrays instead of recomputing anything.
+
+The manifest is keyed by a fingerprint of the three databases (size and
+modification time of the files and their write-ahead logs), the config
+lists, the day the series were extended to and CACHE_VERSION. Any change
+there is a miss and the dataset is recomputed and written again.
+"""
+import os
+import json
+import uuid
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+import series_engine
+
+
+# bump whenever the layout of the cached state changes
+CACHE_VERSION = 2
+
+MANIFEST = "dataset.json"
+
+
+def _file_stamp(path):
+    """(size, mtime) of a database file and its WAL; an empty WAL only means a connection is open."""
+    stamp = []
+    for name in (path, path + "-wal"):
+        try:
+            st = os.stat(name)
+        except FileNotFoundError:
+            stamp.append(None)
+            continue
+        stamp.append([st.st_size, st.st_mtime_ns] if st.st_size else [0])
+    return stamp
+
+
+def source_stamps(model):
+    """File stamps of the rate and price databases, which other processes write to."""
+    return [_file_stamp(os.path.abspath(db_file)) for db_file in (model.exchangeRate.db_file, model.stock.db_file)]
+
+
+def fingerprint(model, time_now):
+    """Hash everything the computed dataset depends on, except the main currency."""
+    parts = {
+        "version": CACHE_VERSION,
+        "time_now": pd.Timestamp(time_now).isoformat(),
+        "databases": [
+            _file_stamp(os.path.abspath(db_file))
+            for db_file in (model.db_file, model.exchangeRate.db_file, model.stock.db_file)
+        ],
+        "config": [
+            model.ignoreForTotalList, model.operatingList, model.investingList, model.cryptoList,
+            model.equityList, model.summaryList, model.available_currencies, model.available_stock,
+            model.customGroups,
+        ],
+    }
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def _columns(frame):
+    return [list(column) for column in frame.columns]
+
+
+def _frame(values, index, columns):
+    return pd.DataFrame(values, index=index, columns=pd.MultiIndex.from_tuples([tuple(c) for c in columns], names=series_engine.SERIES_KEYS))
+
+
+class DatasetCache:
+    def __init__(self, cache_dir, read_only=False):
+        self.cache_dir = cache_dir
+        # a read-only cache never writes or prunes, for processes sharing one cache directory
+        self.read_only = read_only
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def load(self, key):
+        """Return the cached state for key with its arrays memory-mapped, or None on a miss."""
+        try:
+            with open(self._path(MANIFEST), "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != CACHE_VERSION or manifest.get("key") != key:
+            return None
+
+        try:
+            arrays = {name: np.load(self._path(file), mmap_mode="r") for name, file in manifest["arrays"].items()}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable dataset cache: {e}")
+            return None
+
+        axis = pd.DatetimeIndex(arrays["axis"].astype("datetime64[ns]"))
+        raw_index = pd.DatetimeIndex(arrays["raw_index"].astype("datetime64[ns]"))
+        state = {
+            "time_now": pd.Timestamp(manifest["time_now"]),
+            "raw": _frame(arrays["raw"], raw_index, manifest["raw_columns"]),
+            "axis": axis,
+            "cad": _frame(arrays["cad"], axis, manifest["cad_columns"]),
+            "passthrough": None,
+            "first_dates": pd.Series({account: pd.Timestamp(date) for account, date in manifest["first_dates"]}, dtype="datetime64[ns]"),
+            "order": manifest["order"],
+            "names": manifest["names"],
+            "combined_cad": arrays["combined_cad"],
+            "combined_passthrough": arrays.get("combined_passthrough"),
+            "views": {},
+        }
+        if "passthrough" in arrays:
+            state["passthrough"] = _frame(arrays["passthrough"], axis, manifest["cad_columns"])
+        for currency in manifest["views"]:
+            state["views"][currency] = series_engine.AccountSeries(axis, arrays[f"view_{currency}"], state["names"])
+        return state
+
+    def save(self, key, state):
+        """Write state and its current views under key, replacing the previous cache."""
+        if self.read_only:
+            return
+        arrays = {
+            "axis": series_engine.nanoseconds(state["axis"]),
+            "raw_index": series_engine.nanoseconds(state["raw"].index),
+            "raw": state["raw"].to_numpy(dtype=float),
+            "cad": state["cad"].to_numpy(dtype=float),
+            "combined_cad": state["combined_cad"],
+        }
+        if state["passthrough"] is not None:
+            arrays["passthrough"] = state["passthrough"].to_numpy(dtype=float)
+        if state["combined_passthrough"] is not None:
+            arrays["combined_passthrough"] = state["combined_passthrough"]
+        for currency, view in state["views"].items():
+            arrays[f"view_{currency}"] = view.matrix
+
+        # new files get a fresh prefix so a reader of the old manifest never sees them half written
+        prefix = uuid.uuid4().hex
+        manifest = {
+            "version": CACHE_VERSION,
+            "key": key,
+            "time_now": state["time_now"].isoformat(),
+            "arrays": {name: f"{prefix}-{name}.npy" for name in arrays},
+            "raw_columns": _columns(state["raw"]),
+            "cad_columns": _columns(state["cad"]),
+            "first_dates": [[account, date.isoformat()] for account, date in state["first_dates"].items()],
+            "order": list(state["order"]),
+            "names": list(state["names"]),
+            "views": list(state["views"]),
+        }
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for name, values in arrays.items():
+                np.save(self._path(manifest["arrays"][name]), np.ascontiguousarray(values))
+            tmp = self._path(f"{prefix}-{MANIFEST}")
+            with open(tmp, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self._path(MANIFEST))
+        except OSError as e:
+            print(f"Could not write the dataset cache: {e}")
+            return
+
+        # drop the arrays of earlier caches
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npy") and not name.startswith(prefix):
+                try:
+                    os.remove(self._path(name))
+                except OSError:
+                    pass
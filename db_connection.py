@@ -0,0 +1,124 @@
+"""Shared SQLite connection manager for the model, exchange rate and stock databases.
+
+Connections are opened once per (thread, database file) and reused, so a cold
+load no longer pays for a ``sqlite3.connect`` on every lookup. Each new
+connection is switched to WAL mode and tuned with the pragmas below, and the
+manager counts connects and executed statements per database. A thread's
+connections are closed by close_all, or when the thread ends.
+"""
+import os
+import sqlite3
+import weakref
+import threading
+from contextlib import contextmanager
+
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # negative values are KiB, so ~64 MB of page cache
+    "mmap_size": 268435456,
+}
+
+
+class _ThreadConnections(dict):
+    """One thread's {db file: connection}, with the connections in the order they were opened."""
+
+    def __init__(self):
+        super().__init__()
+        self.opened = []
+
+
+class ConnectionManager:
+    def __init__(self, pragmas=None):
+        self.pragmas = PRAGMAS if pragmas is None else pragmas
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._stats = {}
+
+    def _key(self, db_file):
+        return db_file if db_file == ":memory:" else os.path.abspath(db_file)
+
+    def _count(self, key, counter):
+        with self._lock:
+            stats = self._stats.setdefault(key, {"connections": 0, "queries": 0})
+            stats[counter] += 1
+
+    def _connect(self, key):
+        conn = sqlite3.connect(key)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        conn.set_trace_callback(lambda statement: self._count(key, "queries"))
+
+        with self._lock:
+            self._connections.append((threading.get_ident(), key, conn))
+        self._count(key, "connections")
+        return conn
+
+    def _release(self, connections):
+        """Forget and close connections of a thread that ended without close_all."""
+        with self._lock:
+            self._connections = [entry for entry in self._connections if entry[2] not in connections]
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass  # collected on another thread, the connection closes when it is freed
+
+    def get(self, db_file):
+        """Return the calling thread's long-lived connection to db_file."""
+        key = self._key(db_file)
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = _ThreadConnections()
+            # thread-local data is dropped when its thread ends, e.g. an expired QThreadPool thread
+            weakref.finalize(connections, self._release, connections.opened)
+
+        conn = connections.get(key)
+        if conn is None:
+            conn = connections[key] = self._connect(key)
+            connections.opened.append(conn)
+        return conn
+
+    @contextmanager
+    def connection(self, db_file):
+        """Context manager yielding a pooled connection; rolls back on errors instead of closing."""
+        conn = self.get(db_file)
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+    def close_all(self):
+        """Close the pooled connections owned by the calling thread."""
+        current = threading.get_ident()
+        with self._lock:
+            owned = [entry for entry in self._connections if entry[0] == current]
+            self._connections = [entry for entry in self._connections if entry[0] != current]
+        for _, _, conn in owned:
+            conn.close()
+        connections = getattr(self._local, "connections", None)
+        if connections is not None:
+            connections.clear()
+            connections.opened.clear()
+
+    def stats(self):
+        """Return connection and statement counters, overall and per database file."""
+        with self._lock:
+            per_db = {key: dict(values) for key, values in self._stats.items()}
+        return {
+            "connections": sum(values["connections"] for values in per_db.values()),
+            "queries": sum(values["queries"] for values in per_db.values()),
+            "databases": per_db,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# the manager shared by FinanceModel, ExchangeRate and stockTicker
+connection_manager = ConnectionManager()
@@ -0,0 +1,238 @@
+"""Schema migrations for the finance, exchange rate and stock databases.
+
+Each database records the schema it is on in ``PRAGMA user_version`` and
+the migrate_* functions below bring it up to date; they are called from the
+_initialize_db methods, so opening an old database migrates it in place.
+
+Version 1:
+
+* exchange_rates and stock_prices become WITHOUT ROWID tables clustered on
+  (base_currency, target_currency, date) and (symbol, date). The "nearest
+  date on or before" lookups then read a single b-tree range that already
+  holds the rate or price, i.e. the primary key is the covering index.
+* account_balances is kept as it is, since the Node server reads and writes
+  it by name and text date. Next to it, balance_days stores every row as
+  dictionary-encoded account/currency/ticker ids and an integer day number
+  (days since 1970-01-01), clustered per series and day. Triggers on
+  account_balances keep it in sync, whichever client writes.
+
+INSERT OR REPLACE into account_balances only fires the delete trigger with
+``PRAGMA recursive_triggers`` on; none of the clients writes it that way, and
+rebuild_balance_days() recreates the mirror from scratch if it ever drifts.
+"""
+import numpy as np
+import pandas as pd
+
+
+SCHEMA_VERSION = 1
+
+# integer day number of a 'YYYY-MM-DD' text date, NULL when it does not parse
+_DAY = "CAST(julianday({0}) - 2440587.5 AS INTEGER)"
+
+_DICTIONARIES = {
+    "account_ids": "name",
+    "currency_ids": "code",
+    "ticker_ids": "symbol",
+}
+
+
+def user_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _set_user_version(conn, version):
+    conn.execute(f"PRAGMA user_version={int(version)}")
+
+
+def _is_without_rowid(conn, table):
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone()
+    return row is not None and "WITHOUT ROWID" in row[0].upper()
+
+
+def _cluster(conn, table, create_sql, key, columns):
+    """Recreate table from create_sql (a WITHOUT ROWID table keyed on key) and copy its rows over."""
+    if _is_without_rowid(conn, table):
+        return
+    column_list = ", ".join(columns)
+    conn.execute(f"ALTER TABLE {table} RENAME TO {table}_rowid")
+    conn.execute(create_sql.format(table=table))
+    # rows with a NULL key cannot live in a WITHOUT ROWID table, and were never found by a lookup anyway
+    conn.execute(f"""
+        INSERT OR REPLACE INTO {table} ({column_list})
+        SELECT {column_list} FROM {table}_rowid WHERE {" AND ".join(f"{c} IS NOT NULL" for c in key)}
+    """)
+    conn.execute(f"DROP TABLE {table}_rowid")
+
+
+def _migrate(conn, steps):
+    """Run the steps newer than the database's user_version in one transaction."""
+    version = user_version(conn)
+    if version >= SCHEMA_VERSION:
+        return
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for step_version, step in steps:
+            if version < step_version:
+                step(conn)
+        _set_user_version(conn, SCHEMA_VERSION)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+EXCHANGE_RATES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        date TEXT NOT NULL,
+        base_currency TEXT NOT NULL,
+        target_currency TEXT NOT NULL,
+        rate REAL,
+        PRIMARY KEY (base_currency, target_currency, date)
+    ) WITHOUT ROWID
+'''
+
+STOCK_PRICES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        date TEXT NOT NULL,
+        symbol TEXT NOT NULL,
+        currency TEXT,
+        price REAL,
+        PRIMARY KEY (symbol, date)
+    ) WITHOUT ROWID
+'''
+
+
+def migrate_exchange_rates(conn):
+    conn.execute(EXCHANGE_RATES_TABLE.format(table="exchange_rates"))
+    _migrate(conn, [
+        (1, lambda conn: _cluster(conn, "exchange_rates", EXCHANGE_RATES_TABLE,
+                                  ["base_currency", "target_currency", "date"],
+                                  ["base_currency", "target_currency", "date", "rate"])),
+    ])
+
+
+def migrate_stock_prices(conn):
+    conn.execute(STOCK_PRICES_TABLE.format(table="stock_prices"))
+    _migrate(conn, [
+        (1, lambda conn: _cluster(conn, "stock_prices", STOCK_PRICES_TABLE,
+                                  ["symbol", "date"], ["symbol", "date", "currency", "price"])),
+    ])
+
+
+def _add_id(table, column, value):
+    # not INSERT OR IGNORE: inside a trigger the conflict policy of the outer statement (e.g. an upsert) wins
+    return f"INSERT INTO {table} ({column}) SELECT {value} WHERE {value} IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {table} WHERE {column} = {value});"
+
+
+def _insert_balance_days(row):
+    """SQL adding the balance_days row of an account_balances row (NEW or OLD)."""
+    ticker = f"COALESCE({row}.ticker, '')"
+    return f"""
+        {_add_id("account_ids", "name", f"{row}.account_name")}
+        {_add_id("currency_ids", "code", f"{row}.currency")}
+        {_add_id("ticker_ids", "symbol", ticker)}
+        INSERT INTO balance_days (account_id, currency_id, ticker_id, day, source_id, balance)
+        SELECT a.id, c.id, t.id, {_DAY.format(f"{row}.date")}, {row}.id, {row}.balance
+        FROM account_ids a, currency_ids c, ticker_ids t
+        WHERE a.name = {row}.account_name AND c.code = {row}.currency AND t.symbol = {ticker}
+            AND {_DAY.format(f"{row}.date")} IS NOT NULL;
+    """
+
+
+def _delete_balance_days(row):
+    return f"""
+        DELETE FROM balance_days
+        WHERE account_id = (SELECT id FROM account_ids WHERE name = {row}.account_name)
+            AND currency_id = (SELECT id FROM currency_ids WHERE code = {row}.currency)
+            AND ticker_id = (SELECT id FROM ticker_ids WHERE symbol = COALESCE({row}.ticker, ''))
+            AND day = {_DAY.format(f"{row}.date")}
+            AND source_id = {row}.id;
+    """
+
+
+def _create_balance_days(conn):
+    for table, column in _DICTIONARIES.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, {column} TEXT NOT NULL UNIQUE)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS balance_days (
+            account_id INTEGER NOT NULL,
+            currency_id INTEGER NOT NULL,
+            ticker_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            source_id INTEGER NOT NULL,
+            balance REAL,
+            PRIMARY KEY (account_id, currency_id, ticker_id, day, source_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS account_balances_insert_days AFTER INSERT ON account_balances
+        BEGIN {_insert_balance_days("NEW")} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS account_balances_update_days
+        AFTER UPDATE OF account_name, date, balance, currency, ticker ON account_balances
+        BEGIN {_delete_balance_days("OLD")} {_insert_balance_days("NEW")} END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS account_balances_delete_days AFTER DELETE ON account_balances
+        BEGIN {_delete_balance_days("OLD")} END
+    """)
+    rebuild_balance_days(conn)
+
+
+def rebuild_balance_days(conn):
+    """Refill balance_days from account_balances; the caller commits."""
+    conn.execute("DELETE FROM balance_days")
+    for table, column in _DICTIONARIES.items():
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("INSERT OR IGNORE INTO account_ids (name) SELECT DISTINCT account_name FROM account_balances WHERE account_name IS NOT NULL ORDER BY account_name")
+    conn.execute("INSERT OR IGNORE INTO currency_ids (code) SELECT DISTINCT currency FROM account_balances WHERE currency IS NOT NULL ORDER BY currency")
+    conn.execute("INSERT OR IGNORE INTO ticker_ids (symbol) SELECT DISTINCT COALESCE(ticker, '') FROM account_balances ORDER BY 1")
+    conn.execute(f"""
+        INSERT INTO balance_days (account_id, currency_id, ticker_id, day, source_id, balance)
+        SELECT a.id, c.id, t.id, {_DAY.format("b.date")}, b.id, b.balance
+        FROM account_balances b
+        JOIN account_ids a ON a.name = b.account_name
+        JOIN currency_ids c ON c.code = b.currency
+        JOIN ticker_ids t ON t.symbol = COALESCE(b.ticker, '')
+        WHERE {_DAY.format("b.date")} IS NOT NULL
+    """)
+
+
+def migrate_finance(conn):
+    """Bring a finance database with an account_balances table up to SCHEMA_VERSION."""
+    _migrate(conn, [
+        (1, _create_balance_days),
+    ])
+
+
+def read_balance_days(conn, accounts=None):
+    """Return the balance_days rows as an account_name, date, balance, currency, ticker DataFrame.
+
+    Rows come per series and day in primary key order, so of two rows on
+    the same day the most recently inserted one is last. Names are decoded
+    through the dictionary tables and dates straight from the day numbers.
+    """
+    query = "SELECT account_id, currency_id, ticker_id, day, balance FROM balance_days"
+    params = []
+    if accounts is not None:
+        query += f" WHERE account_id IN (SELECT id FROM account_ids WHERE name IN ({','.join('?' * len(accounts))}))"
+        params = list(accounts)
+    data = np.array(conn.execute(query, params).fetchall(), dtype=float).reshape(-1, 5)
+    ids = data[:, :3].astype(np.int64)
+
+    columns = {}
+    for position, (table, column) in enumerate(_DICTIONARIES.items()):
+        entries = conn.execute(f"SELECT id, {column} FROM {table}").fetchall()
+        values = np.empty(max((i for i, _ in entries), default=0) + 1, dtype=object)
+        for i, value in entries:
+            values[i] = value
+        columns[table] = values[ids[:, position]]
+
+    return pd.DataFrame({
+        "account_name": columns["account_ids"],
+        "date": pd.to_datetime(data[:, 3].astype(np.int64), unit="D"),
+        "balance": data[:, 4],
+        "currency": columns["currency_ids"],
+        "ticker": columns["ticker_ids"],
+    })
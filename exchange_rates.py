@@ -1,37 +1,31 @@
-import sqlite3
 from datetime import datetime
-from functools import lru_cache
-from contextlib import contextmanager
+from db_connection import connection_manager
+import db_schema
+from instrumentation import recorder
+
+import numpy as np
 
 
 class ExchangeRate:
-    def __init__(self, db_file="db/exchange_rates.db"):
+    def __init__(self, db_file="db/exchange_rates.db", preload=False):
         self.db_file = db_file
         self._initialize_db()
         self._rate_cache = {}  # Simple cache for frequently accessed rates
 
-    @contextmanager
+        # As-of index: (base, target) -> (sorted date strings, rates)
+        self._rate_index = {}
+        self._rate_index_complete = False
+        self.use_index = preload
+        if preload:
+            self.preload_index()
+
     def get_db_connection(self):
-        """Context manager for database connections."""
-        conn = sqlite3.connect(self.db_file)
-        try:
-            yield conn
-        finally:
-            conn.close()
+        """Context manager yielding the shared, long-lived connection for this database."""
+        return connection_manager.connection(self.db_file)
 
     def _initialize_db(self):
         with self.get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS exchange_rates (
-                    date TEXT,
-                    base_currency TEXT,
-                    target_currency TEXT,
-                    rate REAL,
-                    PRIMARY KEY (date, base_currency, target_currency)
-                )
-            ''')
-            conn.commit()
+            db_schema.migrate_exchange_rates(conn)
 
     def add_rate(self, date, base_currency, target_currency, rate):
         with self.get_db_connection() as conn:
@@ -43,11 +37,91 @@ class ExchangeRate:
             conn.commit()
             # Clear cache when new rates are added
             self._rate_cache.clear()
+            self._rate_index.pop((base_currency, target_currency), None)
+            self._rate_index_complete = False
+
+    def add_rates(self, rows):
+        """Upsert many (date, base_currency, target_currency, rate) rows in one transaction."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        with self.get_db_connection() as conn:
+            with conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO exchange_rates (date, base_currency, target_currency, rate)
+                    VALUES (?, ?, ?, ?)
+                ''', rows)
+        self.invalidate_index()
+        return len(rows)
+
+    def get_last_dates(self):
+        """Return {(base_currency, target_currency): last stored date} for every pair."""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT base_currency, target_currency, MAX(date) FROM exchange_rates
+                GROUP BY base_currency, target_currency
+            ''')
+            return {(base, target): date for base, target, date in cursor.fetchall()}
+
+    def get_coverage(self):
+        """Return {(base_currency, target_currency): stored dates, oldest first} for every pair."""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT base_currency, target_currency, date FROM exchange_rates
+                ORDER BY base_currency, target_currency, date
+            ''')
+            rows = cursor.fetchall()
+        coverage = {}
+        for base_currency, target_currency, date in rows:
+            coverage.setdefault((base_currency, target_currency), []).append(date)
+        return coverage
+
+    def preload_index(self):
+        """Load every pair into the in-memory as-of index with a single query."""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT base_currency, target_currency, date, rate FROM exchange_rates
+                ORDER BY base_currency, target_currency, date
+            ''')
+            rows = cursor.fetchall()
+
+        grouped = {}
+        for base_currency, target_currency, date, rate in rows:
+            dates, rates = grouped.setdefault((base_currency, target_currency), ([], []))
+            dates.append(date)
+            rates.append(rate)
+
+        self._rate_index = {pair: self._as_arrays(dates, rates) for pair, (dates, rates) in grouped.items()}
+        self._rate_index_complete = True
+        self.use_index = True
+
+    def invalidate_index(self):
+        """Drop the in-memory index, e.g. after another process wrote new rates."""
+        self._rate_index = {}
+        self._rate_index_complete = False
+        self._rate_cache.clear()
+
+    @staticmethod
+    def _as_arrays(dates, rates):
+        return np.array(dates, dtype=str), np.array(rates, dtype=float)
+
+    def _pair_index(self, base_currency, target_currency):
+        """Return the (dates, rates) arrays for a pair, loading it on first use."""
+        key = (base_currency, target_currency)
+        if key not in self._rate_index:
+            if self._rate_index_complete:
+                return self._as_arrays([], [])
+            rows = self.get_rate_history(base_currency, target_currency)
+            self._rate_index[key] = self._as_arrays([row[0] for row in rows], [row[1] for row in rows])
+        return self._rate_index[key]
 
-    @lru_cache(maxsize=1024)
     def get_rate(self, date, base_currency, target_currency):
         """Cached version of get_rate for better performance."""
         cache_key = f"{date}_{base_currency}_{target_currency}"
+        recorder.cache("rate_cache", cache_key in self._rate_cache)
         if cache_key in self._rate_cache:
             return self._rate_cache[cache_key]
         
@@ -63,10 +137,20 @@ class ExchangeRate:
             self._rate_cache[cache_key] = result
             return result
 
-    @lru_cache(maxsize=1024)
     def get_nearest_rate(self, date, base_currency, target_currency):
-        """Cached version of get_nearest_rate for better performance."""
+        """Rate on or before the date, else the first one after it. Uses the index when enabled."""
+        if self.use_index:
+            dates, rates = self._pair_index(base_currency, target_currency)
+            if not len(dates):
+                recorder.warn("missing_rate", f"No exchange rate found for {base_currency} to {target_currency} on or around {date}.")
+                return None
+            # binary search for the nearest date on or before, else the first one after it
+            position = np.searchsorted(dates, date, side="right") - 1
+            rate = rates[max(position, 0)]
+            return None if np.isnan(rate) else float(rate)
+
         cache_key = f"nearest_{date}_{base_currency}_{target_currency}"
+        recorder.cache("rate_cache", cache_key in self._rate_cache)
         if cache_key in self._rate_cache:
             return self._rate_cache[cache_key]
         
@@ -95,5 +179,33 @@ class ExchangeRate:
                 result = row[0] if row else None
                 self._rate_cache[cache_key] = result
                 if result is None:
-                    print(f"No exchange rate found for {base_currency} to {target_currency} on or around {date}.")
-                return result
\ No newline at end of file
+                    recorder.warn("missing_rate", f"No exchange rate found for {base_currency} to {target_currency} on or around {date}.")
+                return result
+
+    def get_rate_history(self, base_currency, target_currency):
+        """Return every stored (date, rate) row for a currency pair, oldest first."""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT date, rate FROM exchange_rates
+                WHERE base_currency=? AND target_currency=?
+                ORDER BY date
+            ''', (base_currency, target_currency))
+            return cursor.fetchall()
+
+    def get_nearest_rates(self, dates, base_currency, target_currency):
+        """Vectorized get_nearest_rate: one rate per date, NaN where the pair has no data.
+
+        Accepts date strings, datetimes or a datetime64 array and always answers
+        from the in-memory index.
+        """
+        dates = np.asarray(dates)
+        if dates.dtype.kind != "U":
+            dates = np.datetime_as_string(dates.astype("datetime64[D]"))
+
+        pair_dates, pair_rates = self._pair_index(base_currency, target_currency)
+        if not len(pair_dates):
+            return np.full(len(dates), np.nan)
+
+        positions = np.searchsorted(pair_dates, dates, side="right") - 1
+        return pair_rates[np.maximum(positions, 0)]
@@ -0,0 +1,230 @@
+"""Spans, counters and optional profiling for the hot paths of the app.
+
+The shared ``recorder`` collects:
+
+* spans: named, timed and nested blocks, e.g. every load_data stage, kept
+  with their thread so they can be shown on a timeline;
+* counters, including cache hits and misses, from which hit ratios are
+  derived;
+* rate-limited warnings: a repeated message (a missing rate or price) is
+  only counted, and printed at most once per WARN_INTERVAL seconds with the
+  number of repeats since it was last shown.
+
+summary() adds the per-database connection and query counts of
+db_connection, and export_json() / export_chrome_trace() write everything
+out; the trace opens in chrome://tracing or https://ui.perfetto.dev.
+
+Profiling is off by default. enable_profiling("cprofile" or "pyinstrument",
+directory) makes every ``profiled(name)`` block write a profile of itself to
+directory. The environment variables NET_WORTH_PROFILE (the profiler),
+NET_WORTH_PROFILE_DIR and NET_WORTH_TRACE (a trace file written at exit by
+main.py) switch the same things on without code changes.
+"""
+import os
+import json
+import functools
+import time
+import threading
+import collections
+from contextlib import contextmanager
+
+from db_connection import connection_manager
+
+
+# at most one print per warning key in this many seconds
+WARN_INTERVAL = 10.0
+
+# spans kept for export; older ones are dropped, their totals are not
+MAX_SPANS = 100000
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+        self.profiler = None
+        self.profile_dir = None
+        self._profiles = 0
+
+    def reset(self):
+        """Forget every span, counter and warning recorded so far."""
+        with self._lock:
+            self._origin = time.perf_counter()
+            self._spans = collections.deque(maxlen=MAX_SPANS)
+            self._totals = {}
+            self._counters = collections.Counter()
+            self._warnings = {}
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, **args):
+        """Time the block under name; spans opened inside it become its children."""
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                self._spans.append({
+                    "name": name,
+                    "parent": parent,
+                    "start": start - self._origin,
+                    "duration": duration,
+                    "thread": threading.get_ident(),
+                    "args": args,
+                })
+                total = self._totals.setdefault(name, [0, 0.0, 0.0])
+                total[0] += 1
+                total[1] += duration
+                total[2] = max(total[2], duration)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def cache(self, name, hit):
+        """Count a hit or a miss of the named cache."""
+        self.count(f"{name}.{'hits' if hit else 'misses'}")
+
+    def warn(self, key, message):
+        """Count a warning under key and print it, unless the same key was printed recently."""
+        now = time.monotonic()
+        with self._lock:
+            self._counters[f"warnings.{key}"] += 1
+            last_printed, suppressed = self._warnings.get(key, (None, 0))
+            if last_printed is not None and now - last_printed < WARN_INTERVAL:
+                self._warnings[key] = (last_printed, suppressed + 1)
+                return
+            self._warnings[key] = (now, 0)
+        if suppressed:
+            message += f" ({suppressed} similar warnings not shown)"
+        print(message)
+
+    def summary(self):
+        """Span totals, counters, cache hit ratios and database usage as one dict."""
+        with self._lock:
+            spans = {
+                name: {"count": count, "total": total, "mean": total / count, "max": longest}
+                for name, (count, total, longest) in self._totals.items()
+            }
+            counters = dict(self._counters)
+
+        caches = {}
+        for name, value in counters.items():
+            if name.endswith(".hits") or name.endswith(".misses"):
+                cache, kind = name.rsplit(".", 1)
+                caches.setdefault(cache, {"hits": 0, "misses": 0})[kind] = value
+        for stats in caches.values():
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_ratio"] = stats["hits"] / lookups if lookups else None
+
+        return {"spans": spans, "counters": counters, "caches": caches, "databases": connection_manager.stats()}
+
+    def export_json(self, path):
+        """Write the summary and every recorded span to path."""
+        with self._lock:
+            spans = list(self._spans)
+        with open(path, "w") as f:
+            json.dump({"summary": self.summary(), "spans": spans}, f, indent=2, default=str)
+
+    def export_chrome_trace(self, path):
+        """Write the spans as complete events and the counters as counter events in Chrome trace format."""
+        with self._lock:
+            spans = list(self._spans)
+        pid = os.getpid()
+        events = [
+            {
+                "name": span["name"], "ph": "X", "pid": pid, "tid": span["thread"],
+                "ts": span["start"] * 1e6, "dur": span["duration"] * 1e6,
+                "args": {key: str(value) for key, value in span["args"].items()},
+            }
+            for span in spans
+        ]
+        end = max((span["start"] + span["duration"] for span in spans), default=0.0)
+        summary = self.summary()
+        events.append({"name": "counters", "ph": "C", "pid": pid, "tid": 0, "ts": end * 1e6, "args": summary["counters"]})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"caches": summary["caches"], "databases": summary["databases"]}}, f, default=str)
+
+    def export(self, path):
+        """Chrome trace for *.trace.json or *.trace paths, the plain JSON summary otherwise."""
+        if path.endswith(".trace.json") or path.endswith(".trace"):
+            self.export_chrome_trace(path)
+        else:
+            self.export_json(path)
+
+    def enable_profiling(self, profiler="cprofile", directory="profiles"):
+        """Profile every ``profiled`` block from now on; profiler=None switches it off again."""
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"unknown profiler {profiler!r}, expected one of {', '.join(PROFILERS)}")
+        if profiler == "pyinstrument":
+            # fail now rather than in the middle of a load
+            import pyinstrument  # noqa: F401
+        self.profiler = profiler
+        self.profile_dir = directory
+
+    @contextmanager
+    def profiled(self, name):
+        """A span that is also captured by the enabled profiler, written to profile_dir/name-N.prof or .html."""
+        if self.profiler is None:
+            with self.span(name):
+                yield
+            return
+
+        with self._lock:
+            self._profiles += 1
+            path = os.path.join(self.profile_dir, f"{name}-{self._profiles}")
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+        if self.profiler == "cprofile":
+            import cProfile
+            profile = cProfile.Profile()
+            with self.span(name):
+                profile.enable()
+                try:
+                    yield
+                finally:
+                    profile.disable()
+            profile.dump_stats(path + ".prof")
+        else:
+            from pyinstrument import Profiler
+            profile = Profiler()
+            with self.span(name):
+                profile.start()
+                try:
+                    yield
+                finally:
+                    profile.stop()
+            with open(path + ".html", "w") as f:
+                f.write(profile.output_html())
+
+
+# the recorder shared by the model, the data sources and the controller
+recorder = Recorder()
+
+
+def traced(name=None):
+    """Decorator recording every call of the function as a span (named after it by default)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with recorder.span(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+if os.environ.get("NET_WORTH_PROFILE"):
+    recorder.enable_profiling(os.environ["NET_WORTH_PROFILE"], os.environ.get("NET_WORTH_PROFILE_DIR", "profiles"))
@@ -2,6 +2,8 @@ from controller import FinanceController
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QIcon
 import sys
+import os
+from instrumentation import recorder
 
 # Run the application
 if __name__ == "__main__":
@@ -12,4 +14,9 @@ if __name__ == "__main__":
     
     window = FinanceController()
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    exit_code = app.exec()
+
+    # NET_WORTH_TRACE=file.json (summary) or file.trace.json (Chrome trace) keeps the recorded spans
+    if os.environ.get("NET_WORTH_TRACE"):
+        recorder.export(os.environ["NET_WORTH_TRACE"])
+    sys.exit(exit_code)
\ No newline at end of file
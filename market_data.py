@@ -0,0 +1,346 @@
+"""Concurrent, incremental market data fetcher for the rate and price databases.
+
+One asyncio run fetches every source:
+
+    boc     Bank of Canada Valet FX_RATES_DAILY: the X/CAD rates, one request
+    yahoo   Yahoo Finance daily chart: closing prices, one request per symbol
+    cmc     CoinMarketCap latest quotes: crypto/CAD rates, one request
+
+Only the weekdays after the last stored date are asked for (per pair or
+symbol), so a source whose data is already up to date sends no request at
+all; with backfill_from every gap since that date is planned instead, see
+backfill.py. At
+most ``concurrency`` requests are in flight; a failed request (connection
+error, timeout, 429 or 5xx) is retried with exponential backoff and jitter,
+honouring Retry-After. Each source's rows are written in one bulk upsert
+transaction once its requests are done. A source that fails stores
+nothing, except that a Yahoo symbol that fails only leaves that symbol
+behind.
+
+The base URLs are parameters so the whole flow can run against the local
+stand-in in scripts/fake_market_server.py.
+"""
+import json
+import time
+import random
+import asyncio
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import backfill
+from instrumentation import recorder
+
+
+BOC_URL = "https://www.bankofcanada.ca/valet"
+YAHOO_URL = "https://query1.finance.yahoo.com"
+CMC_URL = "https://pro-api.coinmarketcap.com"
+
+SOURCES = ("boc", "yahoo", "cmc")
+
+# where a source starts when nothing is stored yet, like addHistoricalDataToDB
+DEFAULT_START = "2021-01-01"
+
+# responses worth another try; anything else fails at once
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """A request that failed for good: a non-retryable status or out of retries.
+
+    rows holds what the rest of the source fetched, which is still stored.
+    """
+
+    def __init__(self, message, rows=None):
+        super().__init__(message)
+        self.rows = rows
+
+
+class HttpClient:
+    """JSON GETs with bounded concurrency and retries, for use from a single event loop.
+
+    requests does the HTTP work in a private thread pool, one pooled session
+    per thread, so connections are kept alive across requests.
+    """
+
+    def __init__(self, concurrency=8, retries=4, backoff=0.5, max_backoff=30.0, timeout=30.0, headers=None):
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.headers = {"User-Agent": "Mozilla/5.0 (net-worth-tracker)", "Accept": "application/json"}
+        self.headers.update(headers or {})
+        self.requests = 0
+        self.retried = 0
+        self._semaphore = None
+        self._executor = None
+        self._local = threading.local()
+
+    async def __aenter__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="market-data")
+        return self
+
+    async def __aexit__(self, *exc):
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+            session.headers.update(self.headers)
+        return session
+
+    def _get(self, url, params, headers):
+        response = self._session().get(url, params=params, headers=headers, timeout=self.timeout)
+        return response.status_code, response.text, response.headers.get("Retry-After")
+
+    def _delay(self, attempt, retry_after):
+        """Exponential backoff with full jitter; a numeric Retry-After wins when longer."""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        try:
+            delay = max(delay, min(float(retry_after), self.max_backoff))
+        except (TypeError, ValueError):
+            pass
+        return delay
+
+    async def get_json(self, url, params=None, headers=None):
+        import requests
+
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            # the slot is only held for the request itself, not while backing off
+            async with self._semaphore:
+                self.requests += 1
+                recorder.count("market_data.requests")
+                try:
+                    status, body, retry_after = await loop.run_in_executor(self._executor, self._get, url, params, headers)
+                except requests.RequestException as e:
+                    status, error, retry_after = None, e, None
+                else:
+                    if status == 200:
+                        return json.loads(body)
+                    error = f"HTTP {status}"
+                    if status not in RETRY_STATUSES:
+                        raise FetchError(f"{url}: {error}")
+
+            if attempt == self.retries:
+                break
+            self.retried += 1
+            recorder.count("market_data.retries")
+            await asyncio.sleep(self._delay(attempt, retry_after))
+        raise FetchError(f"{url}: {error} after {self.retries + 1} attempts")
+
+
+def parse_boc(data):
+    """(date, base, target, rate) rows of a Valet observations response."""
+    series_detail = data.get("seriesDetail", {})
+    pairs = {}
+    for series, detail in series_detail.items():
+        label = (detail or {}).get("label")  # e.g. "USD/CAD"
+        if label and "/" in label:
+            pairs[series] = tuple(label.split("/", 1))
+
+    rows = []
+    for obs in data.get("observations", []):
+        date = obs.get("d")
+        if not date:
+            continue
+        for series, value in obs.items():
+            if series == "d" or series not in pairs or not isinstance(value, dict):
+                continue
+            rate = value.get("v")
+            if not rate:
+                continue
+            base_currency, target_currency = pairs[series]
+            rows.append((date, base_currency, target_currency, float(rate)))
+    return rows
+
+
+def parse_yahoo(symbol, data):
+    """(date, symbol, currency, close) rows of a chart response."""
+    results = (data.get("chart") or {}).get("result") or []
+    if not results:
+        return []
+    result = results[0]
+    meta = result.get("meta", {})
+    currency = meta.get("currency") or "USD"
+    offset = meta.get("gmtoffset") or 0
+    quotes = (result.get("indicators", {}).get("quote") or [{}])[0]
+    rows = []
+    for timestamp, close in zip(result.get("timestamp") or [], quotes.get("close") or []):
+        if close is None:
+            continue
+        date = datetime.fromtimestamp(timestamp + offset, tz=timezone.utc).strftime("%Y-%m-%d")
+        rows.append((date, symbol, currency, float(close)))
+    return rows
+
+
+def parse_cmc(data):
+    """(date, symbol, "CAD", price) rows of a quotes/latest response."""
+    rows = []
+    for symbol, info in (data.get("data") or {}).items():
+        if isinstance(info, list):
+            info = info[0] if info else None
+        quote = ((info or {}).get("quote") or {}).get("CAD")
+        if not quote or quote.get("price") is None:
+            continue
+        rows.append((quote["last_updated"][:10], symbol, "CAD", float(quote["price"])))
+    return rows
+
+
+def _wanted(date, key, plans, stored, last_dates):
+    """Whether a fetched row fills a planned gap; keys outside the plan only take new dates."""
+    if date in stored.get(key, ()):
+        return False
+    if key in plans:
+        return backfill.in_ranges(date, plans[key])
+    return date > (last_dates.get(key) or "")
+
+
+async def _gather_rows(requests):
+    """Await the (label, coroutine) requests together; raise FetchError with the good rows if any failed."""
+    rows = []
+    failed = []
+    results = await asyncio.gather(*(request for _, request in requests), return_exceptions=True)
+    for (label, _), result in zip(requests, results):
+        if isinstance(result, Exception):
+            failed.append(f"{label} ({result})")
+        else:
+            rows.extend(result)
+    if failed:
+        # one bad request does not cost the others their update
+        raise FetchError("failed: " + ", ".join(failed), rows=rows)
+    return rows
+
+
+async def fetch_boc(client, plans, stored=None, last_dates=None, base_url=BOC_URL):
+    """X/CAD rates for the planned {(currency, "CAD"): ranges}, one request per merged range."""
+    stored = stored or {}
+    last_dates = last_dates or {}
+
+    async def fetch_range(first, last):
+        data = await client.get_json(
+            f"{base_url}/observations/group/FX_RATES_DAILY/json",
+            params={"start_date": first, "end_date": last},
+        )
+        # the group holds every pair, keep the rows that fill a gap of theirs
+        return [row for row in parse_boc(data) if _wanted(row[0], (row[1], row[2]), plans, stored, last_dates)]
+
+    return await _gather_rows([(f"{first}..{last}", fetch_range(first, last)) for first, last in backfill.combined(plans)])
+
+
+async def fetch_yahoo(client, plans, stored=None, base_url=YAHOO_URL):
+    """Daily closes for the planned {symbol: ranges}, one concurrent request per range."""
+    stored = stored or {}
+
+    def timestamp(date_str):
+        return int(datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+
+    async def fetch_range(symbol, first, last):
+        data = await client.get_json(
+            f"{base_url}/v8/finance/chart/{symbol}",
+            params={"period1": timestamp(first), "period2": timestamp(last) + 86400, "interval": "1d"},
+        )
+        return [row for row in parse_yahoo(symbol, data) if _wanted(row[0], symbol, plans, stored, {})]
+
+    return await _gather_rows([
+        (f"{symbol} {first}..{last}", fetch_range(symbol, first, last))
+        for symbol, ranges in plans.items() for first, last in ranges
+    ])
+
+
+async def fetch_cmc(client, currencies, last_dates, today, api_key, base_url=CMC_URL):
+    """Today's crypto/CAD rates, unless every currency already has one."""
+    if not currencies or all((last_dates.get((currency, "CAD")) or "") >= today for currency in currencies):
+        return []
+    if not api_key:
+        raise FetchError("no CoinMarketCap API key")
+    data = await client.get_json(
+        f"{base_url}/v1/cryptocurrency/quotes/latest",
+        params={"symbol": ",".join(currencies), "convert": "CAD"},
+        headers={"X-CMC_PRO_API_KEY": api_key},
+    )
+    return [row for row in parse_cmc(data) if row[0] > (last_dates.get((row[1], "CAD")) or "")]
+
+
+async def _fetch(name, fetcher):
+    started = time.perf_counter()
+    try:
+        rows = await fetcher
+    except Exception as e:
+        return name, getattr(e, "rows", None), e, time.perf_counter() - started
+    return name, rows, None, time.perf_counter() - started
+
+
+async def fetch_market_data(rate_db, stock_db, currencies=(), cryptos=(), symbols=(), sources=SOURCES,
+                            today=None, backfill_from=None, concurrency=8, retries=4, backoff=0.5,
+                            api_key=None, urls=None):
+    """Fetch the missing rates and prices of every source concurrently and store them.
+
+    rate_db is an ExchangeRate and stock_db a stockTicker. By default only
+    the weekdays after each series' last stored date are fetched; with
+    backfill_from every gap since that date is planned from the stored
+    coverage (see backfill.py). Returns {source: {"rows", "ranges", "days",
+    "seconds", "error"}} plus a "requests" and "retries" count for the run.
+    """
+    today = today or datetime.now().strftime("%Y-%m-%d")
+    urls = urls or {}
+    rate_dates = rate_db.get_last_dates() if rate_db is not None else {}
+    pairs = [(currency, "CAD") for currency in currencies if currency != "CAD"]
+
+    with recorder.span("plan_market_data"):
+        if backfill_from:
+            price_coverage, price_currencies = stock_db.get_coverage() if "yahoo" in sources else ({}, {})
+            rate_coverage = rate_db.get_coverage() if "boc" in sources else {}
+            # symbols share holidays with the others quoted in their currency, pairs with the other BoC pairs;
+            # a currency with a single symbol borrows the BoC calendar
+            rate_holidays = backfill.market_holidays(rate_coverage, pairs)
+            plans = {
+                "yahoo": backfill.plan(
+                    price_coverage, symbols, backfill_from, today, groups=price_currencies,
+                    fallback_holidays=rate_holidays if len(rate_holidays) else None,
+                ),
+                "boc": backfill.plan(rate_coverage, pairs, backfill_from, today, groups={pair: "boc" for pair in pairs}),
+            }
+            stored = {
+                "yahoo": {symbol: set(dates) for symbol, dates in price_coverage.items()},
+                "boc": {pair: set(dates) for pair, dates in rate_coverage.items()},
+            }
+        else:
+            price_dates = stock_db.get_last_dates() if "yahoo" in sources else {}
+            plans = {
+                "yahoo": backfill.plan_after(price_dates, symbols, today, DEFAULT_START),
+                "boc": backfill.plan_after(rate_dates, pairs, today, DEFAULT_START),
+            }
+            stored = {"yahoo": {}, "boc": {}}
+
+    async with HttpClient(concurrency=concurrency, retries=retries, backoff=backoff) as client:
+        fetchers = {
+            "boc": lambda: fetch_boc(client, plans["boc"], stored["boc"], rate_dates, urls.get("boc", BOC_URL)),
+            "yahoo": lambda: fetch_yahoo(client, plans["yahoo"], stored["yahoo"], urls.get("yahoo", YAHOO_URL)),
+            "cmc": lambda: fetch_cmc(client, cryptos, rate_dates, today, api_key, urls.get("cmc", CMC_URL)),
+        }
+        with recorder.span("fetch_market_data"):
+            fetched = await asyncio.gather(*(_fetch(name, fetchers[name]()) for name in sources))
+
+    report = {"requests": client.requests, "retries": client.retried}
+    for name, rows, error, seconds in fetched:
+        stored_rows = 0
+        if rows:
+            with recorder.span("store_market_data", source=name):
+                stored_rows = stock_db.add_prices(rows) if name == "yahoo" else rate_db.add_rates(rows)
+        ranges, days = backfill.summary(plans[name]) if name in plans else (0, 0)
+        report[name] = {
+            "rows": stored_rows, "ranges": ranges, "days": days,
+            "seconds": seconds, "error": None if error is None else str(error),
+        }
+    return report
+
+
+def update_market_data(*args, **kwargs):
+    """Blocking wrapper around fetch_market_data for scripts and the GUI's worker threads."""
+    return asyncio.run(fetch_market_data(*args, **kwargs))
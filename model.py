@@ -1,15 +1,33 @@
-import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 import json
+import threading
+import numpy as np
 import pandas as pd
 import exchange_rates
 import stocks
-from contextlib import contextmanager
+import series_engine
+import series_pool
+import dataset_cache
+import db_schema
+from db_connection import connection_manager
+from instrumentation import recorder
+
+
+class LoadCancelled(Exception):
+    """Raised when a caller cancels load_data or import_sheets between stages."""
+
+
+def report_progress(progress, is_cancelled, stage, percent):
+    """Forward a stage update to the optional callbacks and stop if cancellation was requested."""
+    if is_cancelled is not None and is_cancelled():
+        raise LoadCancelled(stage)
+    if progress is not None:
+        progress(stage, percent)
 
 
 class FinanceModel:
-    def __init__(self, db_file="db/finance.db"):
+    def __init__(self, db_file="db/finance.db", use_cache=True, executor=None, workers=None, cache_read_only=False):
 
         #list of accounts to ignore when calculating total net worth
         self.ignoreForTotalList = self.load_list_from_file('ignoreForTotal')
@@ -19,6 +37,9 @@ class FinanceModel:
         self.equityList = self.load_list_from_file('equity')
         self.summaryList = self.load_list_from_file('summary')
 
+        #user-defined groups, one config/groups/<group>.txt each, aggregated like the categories above
+        self.customGroups = self.load_groups()
+
         self.available_currencies = self.load_list_from_file('available_currency') + self.load_list_from_file('available_crypto')
         self.available_stock = self.load_list_from_file('available_stock')
         self.main_currency = "CAD"  # Default main currency
@@ -30,17 +51,27 @@ class FinanceModel:
         os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
 
         self._initialize_db()
-        self.exchangeRate = exchange_rates.ExchangeRate()
+
+        # computed series reused by load_data, plus the (account, currency, ticker)
+        # series written through this model since they were computed
+        self._series_state = None
+        self._changed_series = set()
+        self._load_lock = threading.Lock()
+
+        self.exchangeRate = exchange_rates.ExchangeRate(preload=True)
         self.stock = stocks.stockTicker()
+        # stamps of the rate and price databases when the rate index was loaded
+        self._source_stamps = dataset_cache.source_stamps(self)
+
+        # runs the per-series work of load_data: "serial", "thread" or "process", see series_pool.py
+        self.series_pool = series_pool.SeriesPool(executor, workers)
+
+        # computed dataset persisted between runs, next to the database
+        self.dataset_cache = dataset_cache.DatasetCache(os.path.join(os.path.dirname(self.db_file), "cache"), cache_read_only) if use_cache else None
 
-    @contextmanager
     def get_db_connection(self):
-        """Context manager for database connections with automatic cleanup."""
-        conn = sqlite3.connect(self.db_file)
-        try:
-            yield conn
-        finally:
-            conn.close()
+        """Context manager yielding the shared, long-lived connection for this database."""
+        return connection_manager.connection(self.db_file)
 
     def load_list_from_file(self, filename):
         fpath = f"config/{filename}.txt"
@@ -54,6 +85,17 @@ class FinanceModel:
             return items
         return []
     
+    def load_groups(self, directory="config/groups"):
+        """Return {group: members} of the user-defined groups; a member may also name another group."""
+        if not os.path.isdir(directory):
+            return {}
+        groups = {}
+        for fname in sorted(os.listdir(directory)):
+            name, ext = os.path.splitext(fname)
+            if ext == ".txt":
+                groups[name] = self.load_list_from_file(f"{os.path.basename(directory)}/{name}")
+        return groups
+
     def _initialize_db(self):
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
@@ -69,6 +111,7 @@ class FinanceModel:
                 )
             ''')
             conn.commit()
+            db_schema.migrate_finance(conn)
 
     def add_balance(self, account_name, date, balance, currency, ticker):
         with self.get_db_connection() as conn:
@@ -79,6 +122,125 @@ class FinanceModel:
                 ON CONFLICT(account_name, date, currency, ticker) DO UPDATE SET balance=excluded.balance
             """, (account_name, date, balance, currency, ticker))
             conn.commit()
+        self._changed_series.add((account_name, currency, ticker or ""))
+
+    def clean_sheet(self, df):
+        """Validate one imported sheet in bulk.
+
+        The first cell names the account, the next columns are date, balance,
+        currency and an optional ticker. Returns the valid rows with the
+        account_balances column names and the number of rows dropped, or None
+        when the sheet does not have four or five columns.
+        """
+        account_name = df.iloc[0, 0]
+
+        # Ensure only first five columns are used
+        df = df.iloc[:, :5].copy()
+        if df.shape[1] == 5:
+            df.columns = ["account", "date", "balance", "currency", "ticker"]
+        elif df.shape[1] == 4:
+            df.columns = ["account", "date", "balance", "currency"]
+            df["ticker"] = ""
+        else:
+            return None
+
+        dates = pd.to_datetime(df["date"], errors="coerce")
+        balances = pd.to_numeric(
+            df["balance"].astype(str).str.strip().str.replace("$", "", regex=False).str.replace(",", "", regex=False),
+            errors="coerce"
+        )
+        currencies = df["currency"].where(df["currency"].notna(), "").astype(str).str.strip()
+        tickers = df["ticker"].where(df["ticker"].notna(), "").astype(str).str.strip()
+        tickers = tickers.where(~tickers.isin(["nan", "NaN"]), "")
+
+        valid = dates.notna() & balances.notna() & (currencies != "")
+        rows = pd.DataFrame({
+            "account_name": account_name,
+            "date": dates[valid].dt.strftime("%Y-%m-%d"),
+            "balance": balances[valid].astype(float),
+            "currency": currencies[valid],
+            "ticker": tickers[valid],
+        })
+        return rows, int((~valid).sum())
+
+    def _upsert_balances(self, conn, rows):
+        """Upsert validated rows on an open connection and count what happened to them."""
+        keys = ["account_name", "date", "currency", "ticker"]
+        # a later row for the same key wins, like repeated add_balance calls
+        deduplicated = rows.drop_duplicates(subset=keys, keep="last")
+        duplicates = len(rows) - len(deduplicated)
+        rows = deduplicated
+        if rows.empty:
+            return {"inserted": 0, "updated": 0, "skipped": duplicates}
+
+        accounts = list(rows["account_name"].unique())
+        existing = pd.read_sql_query(
+            f"""SELECT account_name, date, currency, ticker, balance AS stored_balance FROM account_balances
+                WHERE account_name IN ({",".join("?" * len(accounts))})""",
+            conn, params=accounts
+        )
+        merged = rows.merge(existing, on=keys, how="left", indicator=True)
+        is_new = merged["_merge"] == "left_only"
+        unchanged = ~is_new & (merged["balance"] == merged["stored_balance"])
+
+        changed = merged[~unchanged]
+        self._changed_series.update(changed[["account_name", "currency", "ticker"]].itertuples(index=False, name=None))
+        conn.executemany("""
+            INSERT INTO account_balances (account_name, date, balance, currency, ticker)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(account_name, date, currency, ticker) DO UPDATE SET balance=excluded.balance
+        """, changed[["account_name", "date", "balance", "currency", "ticker"]].itertuples(index=False, name=None))
+
+        return {
+            "inserted": int(is_new.sum()),
+            "updated": int((~is_new & ~unchanged).sum()),
+            "skipped": int(unchanged.sum()) + duplicates,
+        }
+
+    def add_balances(self, rows):
+        """Bulk version of add_balance inside a single transaction.
+
+        rows is a DataFrame with the account_balances columns or an iterable of
+        (account_name, date, balance, currency, ticker) tuples. Rows identical to
+        the stored balance are skipped.
+        """
+        if not isinstance(rows, pd.DataFrame):
+            rows = pd.DataFrame(list(rows), columns=["account_name", "date", "balance", "currency", "ticker"])
+
+        with self.get_db_connection() as conn:
+            counts = self._upsert_balances(conn, rows)
+            conn.commit()
+        return counts
+
+    def import_sheets(self, sheets, progress=None, is_cancelled=None):
+        """Import a workbook given as {sheet_name: DataFrame} in one transaction.
+
+        Returns per sheet counts of inserted, updated and skipped rows. Skipped
+        rows are invalid rows plus rows that match the stored balance; sheets
+        with an unexpected shape get an "error" entry instead of being written.
+        Cancelling rolls back the whole workbook.
+        """
+        results = {}
+        with self.get_db_connection() as conn:
+            for i, (sheet_name, df) in enumerate(sheets.items()):
+                report_progress(progress, is_cancelled, f"importing {sheet_name}", int(100 * i / len(sheets)))
+                if df.empty:
+                    continue  # Skip empty sheets
+
+                cleaned = self.clean_sheet(df)
+                if cleaned is None:
+                    results[sheet_name] = {
+                        "inserted": 0, "updated": 0, "skipped": len(df),
+                        "error": f"unexpected number of columns ({df.shape[1]})",
+                    }
+                    continue
+
+                rows, invalid = cleaned
+                counts = self._upsert_balances(conn, rows)
+                counts["skipped"] += invalid
+                results[sheet_name] = counts
+            conn.commit()
+        return results
 
 
     def convert_to_main(self, date, amount, currency):
@@ -131,311 +293,328 @@ class FinanceModel:
 
         return cad_amount / MaintoCAD_rate  # Convert to main
 
-    def load_data(self):
+    def _nearest_series_values(self, kind, key, dates, cache):
+        """Load one price or FX series once per load and resolve it for all dates."""
+        if kind == "rate":
+            # the exchange rate index is kept across loads, load_data reloads it when the database changed
+            rates = self.exchangeRate.get_nearest_rates(dates, *key)
+            if np.isnan(rates).all() and (kind, key) not in cache:
+                cache[(kind, key)] = None
+                recorder.warn("missing_rate_history", f"No exchange rate history found for {key[0]} to {key[1]}.")
+            return rates
+
+        recorder.cache("price_history", (kind, key) in cache)
+        if (kind, key) not in cache:
+            rows = self.stock.get_price_history(key)
+            cache[(kind, key)] = series_engine.sorted_series(rows)
+            if not rows:
+                recorder.warn("missing_price_history", f"No stock price history found for {key}.")
+
+        series_dates, series_values = cache[(kind, key)]
+        return series_engine.nearest_values(series_dates, series_values, dates)
+
+    def main_currency_factors(self, dates, currency, cache=None, main_currency=None):
+        """Vectorized convert_to_main: the multiplier from currency to the main currency per date.
+
+        main_currency defaults to self.main_currency.
+        """
+        cache = {} if cache is None else cache
+        main_currency = main_currency or self.main_currency
+        factors = np.ones(len(dates))
+        if currency == main_currency:
+            return factors
+
+        if currency != "CAD":
+            # NaN marks dates without a rate, those keep the original amount below
+            factors = self._nearest_series_values("rate", (currency, "CAD"), dates, cache)
+
+        if main_currency != "CAD":
+            MaintoCAD_rate = self._nearest_series_values("rate", (main_currency, "CAD"), dates, cache)
+            # If no exchange rate found for main currency, keep the CAD amount
+            factors = factors / np.where(np.isnan(MaintoCAD_rate), 1.0, MaintoCAD_rate)
+
+        # If no exchange rate found, keep the original amount
+        return np.where(np.isnan(factors), 1.0, factors)
+
+    def _price_factors(self, dates, ticker, cache):
+        """Return the per-date price multiplier of a ticker series, 1 where no price exists."""
+        if not ticker:
+            return np.ones(len(dates))
+        #convert the balance to the ticker currency
+        stock_price = self._nearest_series_values("price", ticker, dates, cache)
+        return np.where(np.isnan(stock_price), 1.0, stock_price)
+
+    def invalidate(self):
+        """Forget the computed series so the next load_data recomputes everything.
+
+        Needed after the databases were changed by something other than this model.
+        """
+        self._series_state = None
+        self.exchangeRate.invalidate_index()
+
+    def _read_balances(self, accounts=None):
+        """Read balance rows in a supported currency, optionally only for some accounts.
+
+        The rows come from the integer-day balance_days mirror, so neither the
+        names nor the dates are parsed from text.
+        """
         with self.get_db_connection() as conn:
-            # Use pandas for faster data loading and processing
-            df = pd.read_sql_query(
-                "SELECT account_name, date, balance, currency, ticker FROM account_balances ORDER BY date",
-                conn
-            )
-        
-        if df.empty:
-            return {}
-        
-        account_data = {}
-        net_worth = {}
-        total = {}
-        operating = {}
-        investing = {}
-        crypto = {}
-        equity = {}
-
-        timeNow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-
-        # Filter valid currencies first
-        valid_mask = df['currency'].isin(self.available_currencies)
-        df_valid = df[valid_mask].copy()
-        
-        if df_valid.empty:
-            return {}
-        
-        # Convert date strings to datetime objects
-        df_valid['date'] = pd.to_datetime(df_valid['date'])
-        
-        # Process data more efficiently
-        for _, row in df_valid.iterrows():
-            account_name = row['account_name']
-            date = row['date']
-            balance = row['balance']
-            currency = row['currency']
-            ticker = row['ticker']
-            
-            if pd.isna(ticker):
-                ticker = ""
-            
-            if account_name not in account_data:
-                account_data[account_name] = {}
-
-            if currency not in account_data[account_name]:
-                account_data[account_name][currency] = {}
-
-            if ticker not in account_data[account_name][currency]:
-                account_data[account_name][currency][ticker] = {}
-
-            if date not in account_data[account_name][currency][ticker]:
-                account_data[account_name][currency][ticker][date] = {}
-                
-            account_data[account_name][currency][ticker][date] = balance
-            
-        #for account_name, currencies in invalid_currencies.items():
-            #for currency in currencies:
-                #print(f"Warning: Currency '{currency}' for account '{account_name}' is not in available currencies. Skipping.")
-
-
-        #extend all data to current date
-        for account_name in account_data:
-            #print(f"Extending data for account: {account_name}")
-        
-            for currency in account_data[account_name].keys():
-                #print(f"Extending data for currency: {currency} in account: {account_name}")
-                
-                for ticker in account_data[account_name][currency].keys():
-                    last_date = max(account_data[account_name][currency][ticker].keys())
-                    #print(f"Last date for {account_name} {ticker} in {currency}: {last_date}")
-                    last_balance = account_data[account_name][currency][ticker][last_date]
-                    account_data[account_name][currency][ticker][timeNow] = last_balance
-
-        #sort the account data by date
-        for account_name in account_data:
-            for currency in account_data[account_name].keys():
-                for ticker in account_data[account_name][currency].keys():
-                    account_data[account_name][currency][ticker] = dict(sorted(account_data[account_name][currency][ticker].items()))
-                #account_data[account_name][currency] = dict(sorted(account_data[account_name][currency].items()))
-
-
-
-        #interpolate all data for all dates available in the data
-        all_dates = set()
-        for account_name in account_data:
-            for currency in account_data[account_name].keys():
-                for ticker in account_data[account_name][currency].keys():
-                    all_dates.update(account_data[account_name][currency][ticker].keys())
-                #all_dates.update(account_data[account_name][currency].keys())
-        all_dates = sorted(all_dates)
-
-        #add dates by interval
-        if all_dates:
-            firstDate = min(all_dates)
-            lastDate = max(all_dates)
-            interval = timedelta(days=10)  # Daily interval
-            current_date = firstDate
-
-            while current_date <= lastDate:
-                all_dates.append(current_date)
-                current_date += interval
-
-            all_dates = sorted(set(all_dates))
-
-
-        for account_name in account_data:
-            for currency in account_data[account_name].keys():
-                for ticker in account_data[account_name][currency].keys():
-                    for date in all_dates:
-                        if date not in account_data[account_name][currency][ticker].keys():
-                            
-                            #check if this is the first recorded date for this account
-                            if date > min(account_data[account_name][currency][ticker].keys()):
-            
-                                previous_date = max(d for d in account_data[account_name][currency][ticker] if d < date)
-                                previous_balance = account_data[account_name][currency][ticker][previous_date]
-            
-                                #check if this is the last recorded date for this account
-                                #print("date:", date, type(date))
-                                #timeNow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-                                #print("time now:", timeNow, type(timeNow))
-            
-                                if date < timeNow:
-            
-                                    next_date = min(d for d in account_data[account_name][currency][ticker] if d > date)
-                                    next_balance = account_data[account_name][currency][ticker][next_date]
-            
-                                    #update the account data with the interpolated balance
-                                    #print(f"Interpolating balance for {account_name} on {date} in {currency}: previous date {previous_date} with balance {previous_balance}, next date {next_date} with balance {next_balance}")
-            
-                                    account_data[account_name][currency][ticker][date] = previous_balance + (next_balance - previous_balance) * (date - previous_date).days / (next_date - previous_date).days
-
-
-        #sort the account data by date
-        for account_name in account_data:
-            for currency in account_data[account_name].keys():
-                for ticker in account_data[account_name][currency].keys():
-                    account_data[account_name][currency][ticker] = dict(sorted(account_data[account_name][currency][ticker].items()))
-                #account_data[account_name][currency] = dict(sorted(account_data[account_name][currency].items()))
-            #account_data[account_name] = dict(sorted(account_data[account_name].items()))
-
-
-        #convert currencies to main currency
-        for account_name in account_data:
-            for currency in account_data[account_name].keys():
-                for ticker in account_data[account_name][currency].keys():
-                    for date, balance in account_data[account_name][currency][ticker].items():
-                        try:
-                            #convert the balance to the ticker currency
-                            if ticker:
-                                # Convert pandas Timestamp to string for SQLite
-                                date_str = date.strftime('%Y-%m-%d') if hasattr(date, 'strftime') else str(date)
-                                stock_price = self.stock.get_nearest_price(date_str, ticker)
-                                if stock_price is not None:
-                                    balance = balance * stock_price
-                            #convert the balance to the main currency
-                            converted_balance = self.convert_to_main(date, balance, currency)
-                            account_data[account_name][currency][ticker][date] = converted_balance
-                        except Exception as e:
-                            print(f"Error processing {account_name} {currency} {ticker} on {date}: {e}")
-                            # Keep original balance if conversion fails
-                            account_data[account_name][currency][ticker][date] = balance
-
-        #print("Account data after conversion:", account_data)
-
-
-
-        #merge all the currencies in to the main currency
-        newData = {}
-        for account_name in account_data:
-            if account_name not in newData:
-                newData[account_name] = {}
-            for currency in account_data[account_name].keys():
-                for ticker in account_data[account_name][currency].keys():
-                    for date, balance in account_data[account_name][currency][ticker].items():
-                        if date not in newData[account_name]:
-                            newData[account_name][date] = 0
-                        newData[account_name][date] += balance
-       
-        account_data = newData
-        #print("\n\n\n\n\n\nAccount data after merging currencies:", account_data)
-
-
-        #calculate the net worth, total, operating, total investing, crypto, and equity
-        for account_name, data in account_data.items():
-            #print(f"Processing account: {account_name}")
-            #for currency, data2 in data.items():
-            #print(f"Processing currency: {currency} for account: {account_name}")
-            for date, balance in data.items():
-                #print(f"Processing date: {date} with balance: {balance} for account: {account_name} in currency: {currency}")
-
-                #calculate the total of everything minus accounts in the ignore list
-                if self.ignoreForTotalList:
-                    if account_name not in self.ignoreForTotalList:
-                        totalAccount = "total"
-                        if totalAccount not in total:
-                            total[totalAccount] = {}
-        
-                        if date not in total[totalAccount]:
-                            total[totalAccount][date] = balance
-                        else:
-                            total[totalAccount][date] += balance
-                
-                #calculate overall net worth with no exclusions
-                netWorthAccount = "net worth"
-                if netWorthAccount not in net_worth:
-                    net_worth[netWorthAccount] = {}
-
-                if date not in net_worth[netWorthAccount]:
-                    net_worth[netWorthAccount][date] = balance
+            df = db_schema.read_balance_days(conn, accounts)
+
+        # Filter valid currencies
+        df = df[df['currency'].isin(self.available_currencies)]
+        return df.sort_values("date", kind="stable").reset_index(drop=True)
+
+    def _series_factors(self, columns, dates):
+        """Resolve the price multiplier of every ticker and the CAD rate of every currency of columns on dates."""
+        series_cache = {}
+        prices = {ticker: self._price_factors(dates, ticker, series_cache) for ticker in dict.fromkeys(t for _, _, t in columns if t)}
+        rates = {
+            currency: self._nearest_series_values("rate", (currency, "CAD"), dates, series_cache)
+            for currency in dict.fromkeys(c for _, c, _ in columns if c != "CAD")
+        }
+        return prices, rates
+
+    def _process_series(self, raw, dates, timeNow):
+        """Interpolate every raw series on dates, price it and convert it to CAD.
+
+        Returns the (dates x raw.columns) CAD values and the passthrough matrix
+        of the amounts in a currency without any CAD rate, None when there are
+        none: convert_to_main keeps those unconverted whatever the main
+        currency is. The columns are split across self.series_pool, whose
+        blocks record the interpolate and convert spans.
+        """
+        with recorder.span("convert", step="factors"):
+            prices, rates = self._series_factors(raw.columns, dates)
+        with recorder.span("series", executor=self.series_pool.executor):
+            return self.series_pool.run(raw, dates, timeNow, prices, rates)
+
+    def _compute_series(self, timeNow, progress, is_cancelled):
+        """Run the whole pipeline over every series and return the new cached state."""
+        with recorder.span("read"):
+            df = self._read_balances()
+            if df.empty:
+                return None
+
+            #pivot to a (date x account/currency/ticker) matrix
+            raw = series_engine.pivot_balances(df)
+
+        #extend all data to current date and interpolate on every day
+        report_progress(progress, is_cancelled, "interpolate", 10)
+        with recorder.span("extend"):
+            axis = series_engine.build_axis(raw.index, timeNow)
+
+        #interpolate and convert currencies to CAD, the main currency is applied per view
+        report_progress(progress, is_cancelled, "convert", 30)
+        values, passthrough = self._process_series(raw, axis, timeNow)
+
+        state = {
+            "time_now": timeNow,
+            "raw": raw,
+            "axis": axis,
+            "cad": pd.DataFrame(values, index=axis, columns=raw.columns),
+            "passthrough": None if passthrough is None else pd.DataFrame(passthrough, index=axis, columns=raw.columns),
+            "first_dates": df.groupby('account_name', sort=False)['date'].min(),
+            "order": [],
+        }
+        report_progress(progress, is_cancelled, "aggregate", 80)
+        return self._aggregate(state)
+
+    def _update_series(self, state, changed, timeNow, progress, is_cancelled):
+        """Recompute only the changed series and reuse the cached ones.
+
+        Falls back to a full recompute when the shared axis moved, e.g. because
+        data older than the first known date arrived and shifted the grid.
+        """
+        report_progress(progress, is_cancelled, "read", 5)
+        with recorder.span("read"):
+            df = self._read_balances(sorted({account for account, currency, ticker in changed}))
+            df = df[pd.MultiIndex.from_frame(df[series_engine.SERIES_KEYS]).isin(list(changed))]
+            if df.empty:
+                return state
+            changed_raw = series_engine.pivot_balances(df)
+
+        report_progress(progress, is_cancelled, "interpolate", 20)
+        raw = state["raw"].drop(columns=changed_raw.columns, errors="ignore")
+        with recorder.span("extend"):
+            axis = series_engine.build_axis(raw.index.union(changed_raw.index), timeNow)
+
+        old_axis = state["axis"]
+        added = axis.difference(old_axis)
+        if len(old_axis.difference(axis)) or len(added) > len(old_axis) // 2:
+            return self._compute_series(timeNow, progress, is_cancelled)
+
+        def reuse(frame):
+            return frame.drop(columns=changed_raw.columns, errors="ignore").reindex(axis)
+
+        cad = reuse(state["cad"])
+        passthrough = None if state["passthrough"] is None else reuse(state["passthrough"]).fillna(0.0)
+
+        #untouched series only need values on the new dates
+        if len(added):
+            added_values, added_passthrough = self._process_series(raw, added, timeNow)
+            cad.loc[added, :] = added_values
+            if added_passthrough is not None:
+                if passthrough is None:
+                    passthrough = pd.DataFrame(0.0, index=axis, columns=raw.columns)
+                passthrough.loc[added, :] = added_passthrough
+
+        #the changed series are recomputed on the whole axis
+        report_progress(progress, is_cancelled, "convert", 40)
+        changed_values, changed_passthrough = self._process_series(changed_raw, axis, timeNow)
+        cad = pd.concat([cad, pd.DataFrame(changed_values, index=axis, columns=changed_raw.columns)], axis=1)
+        if passthrough is not None or changed_passthrough is not None:
+            if passthrough is None:
+                passthrough = pd.DataFrame(0.0, index=axis, columns=raw.columns)
+            if changed_passthrough is None:
+                changed_passthrough = np.zeros_like(changed_values)
+            passthrough = pd.concat([passthrough, pd.DataFrame(changed_passthrough, index=axis, columns=changed_raw.columns)], axis=1)
+
+        first_dates = pd.concat([state["first_dates"], df.groupby('account_name', sort=False)['date'].min()])
+        first_dates = first_dates.groupby(level=0, sort=False).min()
+
+        new_state = dict(state)
+        new_state.update({
+            "raw": pd.concat([raw, changed_raw], axis=1).sort_index(),
+            "axis": axis,
+            "cad": cad,
+            "passthrough": passthrough,
+            "first_dates": first_dates,
+        })
+
+        report_progress(progress, is_cancelled, "aggregate", 80)
+        return self._aggregate(new_state)
+
+    def _group_members(self, accounts):
+        """Return the (name, member accounts) of every total, in result order; custom groups come last."""
+        groups = [
+            ("equity", self.equityList),
+            ("net worth", accounts),
+            ("total", [a for a in accounts if a not in self.ignoreForTotalList] if self.ignoreForTotalList else []),
+            ("operating", self.operatingList),
+            ("investing", self.investingList),
+            ("crypto", self.cryptoList),
+        ]
+        builtin = {name for name, _ in groups}
+        return groups + [(name, members) for name, members in self.customGroups.items() if name not in builtin]
+
+    def _aggregate(self, state):
+        """Merge series per account and build the group totals, still in CAD."""
+        axis = state["axis"]
+
+        #merge all the currencies in to one balance per account, ordered by first appearance
+        with recorder.span("merge"):
+            cad_accounts = series_engine.merge_accounts(state["cad"].to_numpy(), state["cad"].columns, axis)
+        first_dates = state["first_dates"]
+        previous_order = {account: i for i, account in enumerate(state["order"])}
+        order = sorted(cad_accounts.columns, key=lambda a: (first_dates[a], previous_order.get(a, len(previous_order))))
+        cad_accounts = cad_accounts[order]
+
+        with recorder.span("aggregate"):
+            return self._totals(state, axis, order, cad_accounts)
+
+    def _totals(self, state, axis, order, cad_accounts):
+        """Add the group totals to the merged accounts and store the combined matrices in a new state."""
+        #calculate the net worth, total, operating, investing, crypto, equity and custom groups at once
+        groups = self._group_members(order)
+        membership = series_engine.membership_matrix(order, groups)
+        totals, contributes = series_engine.group_totals(cad_accounts.to_numpy(), membership)
+        kept = np.flatnonzero(contributes)
+        membership = membership[:, kept]
+        cad_totals = pd.DataFrame(totals[:, kept], index=axis, columns=[groups[j][0] for j in kept])
+
+        # an account named like a total is replaced by it, as with dict.update
+        names = [a for a in order if a not in cad_totals] + list(cad_totals)
+        combined = pd.concat([cad_accounts, cad_totals], axis=1)
+        combined = combined.loc[:, ~combined.columns.duplicated(keep="last")][names]
+
+        passthrough = None
+        if state["passthrough"] is not None:
+            pass_accounts = series_engine.merge_accounts(state["passthrough"].to_numpy(), state["passthrough"].columns, axis).fillna(0.0)
+            pass_accounts = pass_accounts.reindex(columns=order, fill_value=0.0)
+            pass_totals = pd.DataFrame(pass_accounts.to_numpy() @ membership, index=axis, columns=cad_totals.columns)
+            passthrough = pd.concat([pass_accounts, pass_totals], axis=1)
+            passthrough = passthrough.loc[:, ~passthrough.columns.duplicated(keep="last")][names].to_numpy()
+
+        state = dict(state)
+        state.update({
+            "order": order,
+            "names": names,
+            "combined_cad": combined.to_numpy(),
+            "combined_passthrough": passthrough,
+            "views": {},
+        })
+        return state
+
+    def _account_view(self, state, main_currency):
+        """Return the {account: {date: balance}} view of the state in main_currency.
+
+        Switching the main currency is one multiply of the cached CAD matrix by
+        the CAD to main currency rate vector; views are kept per currency.
+        """
+        recorder.cache("currency_view", main_currency in state["views"])
+        if main_currency not in state["views"]:
+            factors = self.main_currency_factors(state["axis"], "CAD", main_currency=main_currency)
+            values = state["combined_cad"] * factors[:, None]
+            if state["combined_passthrough"] is not None:
+                values = values + state["combined_passthrough"]
+            state["views"][main_currency] = series_engine.AccountSeries(state["axis"], values, state["names"])
+        return state["views"][main_currency]
+
+    def load_data(self, progress=None, is_cancelled=None):
+        """Load, interpolate and convert every series; returns {account: {date: balance}}.
+
+        Results are cached between calls in CAD, and on disk between runs
+        (see dataset_cache). When only series written through this model
+        changed since the last call, just those series and the totals are
+        recomputed, and a main currency switch only rescales the cached
+        matrix. progress(stage, percent) is called between stages and
+        is_cancelled() is polled at the same points, raising LoadCancelled when
+        it returns True.
+        """
+        with self._load_lock, recorder.profiled("load_data"):
+            report_progress(progress, is_cancelled, "read", 0)
+            # the GUI thread may switch the main currency meanwhile, this load uses the one it started with
+            main_currency = self.main_currency
+            timeNow = pd.Timestamp(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+
+            # rates and prices written by another process, e.g. scripts/fetch_market_data.py
+            source_stamps = dataset_cache.source_stamps(self)
+            sources_changed = source_stamps != self._source_stamps
+            if sources_changed:
+                self.exchangeRate.preload_index()
+                self._source_stamps = source_stamps
+
+            # fingerprint the databases before reading them, so writes made meanwhile invalidate the cache
+            cache_key = dataset_cache.fingerprint(self, timeNow) if self.dataset_cache is not None else None
+
+            changed = set(self._changed_series)
+            previous = state = self._series_state
+            reusable = state is not None and state["time_now"] == timeNow and not sources_changed
+
+            recorder.cache("series_state", reusable and not changed)
+            if reusable and changed:
+                state = self._update_series(state, changed, timeNow, progress, is_cancelled)
+            elif not reusable:
+                with recorder.span("cache_load"):
+                    state = self.dataset_cache.load(cache_key) if cache_key is not None else None
+                if cache_key is not None:
+                    recorder.cache("dataset_cache", state is not None)
+                if state is not None:
+                    previous = state
                 else:
-                    net_worth[netWorthAccount][date] += balance
-
-                #calculate the total of all operating accounts
-                if self.operatingList:
-                    if account_name in self.operatingList:
-                        operatingAccount = "operating"
-                        if operatingAccount not in operating:
-                            operating[operatingAccount] = {}
-
-                        if date not in operating[operatingAccount]:
-                            operating[operatingAccount][date] = balance
-                        else:
-                            operating[operatingAccount][date] += balance
-
-                #calculate the total of all investing accounts
-                if self.investingList:
-                    if account_name in self.investingList:
-                        investingAccount = "investing"
-                        if investingAccount not in investing:
-                            investing[investingAccount] = {}
-
-                        if date not in investing[investingAccount]:
-                            investing[investingAccount][date] = balance
-                        else:
-                            investing[investingAccount][date] += balance
-
-                #calculate the total of all crypto accounts
-                if self.cryptoList:
-                    if account_name in self.cryptoList:
-                        cryptoAccount = "crypto"
-                        if cryptoAccount not in crypto:
-                            crypto[cryptoAccount] = {}
-
-                        if date not in crypto[cryptoAccount]:
-                            crypto[cryptoAccount][date] = balance
-                        else:
-                            crypto[cryptoAccount][date] += balance
-
-                #calculate the total of all equity accounts
-                if self.equityList:
-                    if account_name in self.equityList:
-                        equityAccount = "equity"
-                        if equityAccount not in equity:
-                            equity[equityAccount] = {}
-
-                        if date not in equity[equityAccount]:
-                            equity[equityAccount][date] = balance
-                        else:
-                            equity[equityAccount][date] += balance
-
-
-        if equity:
-
-            #sort the equity dictionary by date
-            for account_name in equity:
-                equity[account_name] = dict(sorted(equity[account_name].items()))
-
-            account_data.update(equity)
-
-        if net_worth:
-            # Sort the net worth dictionary by date
-            for account_name in net_worth:
-                net_worth[account_name] = dict(sorted(net_worth[account_name].items()))
-
-            account_data.update(net_worth)
-        
-        if total:
-            #sort the total dictionary by date
-            for account_name in total:
-                total[account_name] = dict(sorted(total[account_name].items()))
-
-            account_data.update(total)
-
-        if operating:
-            #sort the operating dictionary by date
-            for account_name in operating:
-                operating[account_name] = dict(sorted(operating[account_name].items()))
-
-            account_data.update(operating)
-
-        if investing:
-            #sort the investing dictionary by date
-            for account_name in investing:
-                investing[account_name] = dict(sorted(investing[account_name].items()))
-
-            account_data.update(investing)
-        
-        if crypto:
-            #sort the crypto dictionary by date
-            for account_name in crypto:
-                crypto[account_name] = dict(sorted(crypto[account_name].items()))
-
-            account_data.update(crypto)
-
+                    state = self._compute_series(timeNow, progress, is_cancelled)
+
+            self._series_state = state
+            self._changed_series -= changed
+            if state is None:
+                account_data = {}
+            else:
+                new_view = main_currency not in state["views"]
+                account_data = self._account_view(state, main_currency)
+                if cache_key is not None and (state is not previous or new_view):
+                    with recorder.span("cache_save"):
+                        self.dataset_cache.save(cache_key, state)
+
+        report_progress(progress, None, "done", 100)
         return account_data
-
@@ -0,0 +1,185 @@
+"""Stream the sheets of an ODS workbook without loading it whole.
+
+pd.read_excel(engine="odf") builds the odfpy DOM of content.xml, every
+cell of every sheet, before the first DataFrame exists; a large workbook
+takes tens of seconds and several times its XML size in memory. This
+reader iterparses content.xml straight from the zip and drops every row
+once it has been read, so memory holds only the typed values of the sheet
+being read.
+
+Cells are typed like the odf engine types them: float, percentage and
+currency cells give their office:value (an int when integral), dates a
+datetime, times a time, booleans a bool and strings their text; "#N/A"
+and the strings read_excel treats as missing give NaN. Repeated rows and
+columns are expanded, except empty ones at the end of a row or sheet, which
+spreadsheets write with repeat counts of a thousand or a million. Blank
+rows before the last row with a value are kept, as read_excel keeps them,
+and the first row is the header.
+"""
+import re
+import zipfile
+import itertools
+import xml.etree.ElementTree as ET
+from datetime import datetime, time
+
+import numpy as np
+import pandas as pd
+
+
+OFFICE = "{urn:oasis:names:tc:opendocument:xmlns:office:1.0}"
+TABLE = "{urn:oasis:names:tc:opendocument:xmlns:table:1.0}"
+TEXT = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+
+SHEET = TABLE + "table"
+ROW = TABLE + "table-row"
+CELL = TABLE + "table-cell"
+COVERED_CELL = TABLE + "covered-table-cell"
+# elements rows can be nested in, which drop them once read
+ROW_PARENTS = {SHEET, TABLE + "table-row-group", TABLE + "table-header-rows", TABLE + "table-rows"}
+
+VALUE_TYPE = OFFICE + "value-type"
+VALUE = OFFICE + "value"
+DATE_VALUE = OFFICE + "date-value"
+TIME_VALUE = OFFICE + "time-value"
+BOOLEAN_VALUE = OFFICE + "boolean-value"
+STRING_VALUE = OFFICE + "string-value"
+ROWS_REPEATED = TABLE + "number-rows-repeated"
+COLUMNS_REPEATED = TABLE + "number-columns-repeated"
+SPACES = TEXT + "s"
+SPACE_COUNT = TEXT + "c"
+ANNOTATION = OFFICE + "annotation"
+
+# the strings read_excel reads as missing values by default
+NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+
+TIME_PATTERN = re.compile(r"PT(\d+)H(\d+)M(\d+(?:\.\d+)?)S")
+
+
+def _text(element):
+    """The text of a cell or paragraph; text:s stands for a run of spaces, annotations are left out."""
+    parts = [element.text or ""]
+    for child in element:
+        if child.tag == SPACES:
+            parts.append(" " * int(child.get(SPACE_COUNT, 1)))
+        elif child.tag != ANNOTATION:
+            parts.append(_text(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def cell_value(cell):
+    """The typed value of a table:table-cell element, None when it is empty."""
+    value_type = cell.get(VALUE_TYPE)
+    if value_type is None:
+        return None
+    if value_type == "float":
+        value = float(cell.get(VALUE))
+        return int(value) if value.is_integer() else value
+    if value_type in ("percentage", "currency"):
+        return float(cell.get(VALUE))
+    if value_type == "date":
+        return datetime.fromisoformat(cell.get(DATE_VALUE))
+    if value_type == "boolean":
+        return cell.get(BOOLEAN_VALUE) == "true"
+    if value_type == "time":
+        hours, minutes, seconds = TIME_PATTERN.fullmatch(cell.get(TIME_VALUE)).groups()
+        seconds = float(seconds)
+        return time(int(hours) % 24, int(minutes), int(seconds), round(seconds % 1 * 1e6))
+    if value_type == "string":
+        text = cell.get(STRING_VALUE)
+        if text is None:
+            text = _text(cell)
+        if not text:
+            return None
+        return np.nan if text in NA_STRINGS else text
+    raise ValueError(f"Unrecognized cell type {value_type}")
+
+
+def _row_values(row):
+    """The values of a row element, NaN for its empty cells, without the trailing ones."""
+    values = []
+    empty = 0
+    for cell in row:
+        if cell.tag == CELL:
+            value = cell_value(cell)
+        elif cell.tag == COVERED_CELL:
+            value = None
+        else:
+            continue
+        repeat = int(cell.get(COLUMNS_REPEATED, 1))
+        # empty cells are only written once a value follows them
+        if value is None:
+            empty += repeat
+        else:
+            values.extend([np.nan] * empty)
+            empty = 0
+            values.extend([value] * repeat)
+    return values
+
+
+def iter_rows(path):
+    """Yield (sheet_name, values) for every row of the workbook up to each sheet's last value.
+
+    Rows are as long as their last value, so blank rows are empty lists.
+    """
+    with zipfile.ZipFile(path) as workbook, workbook.open("content.xml") as content:
+        parents = []
+        sheet_name = None
+        blank = 0
+        for event, element in ET.iterparse(content, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag in ROW_PARENTS:
+                    parents.append(element)
+                    if tag == SHEET:
+                        sheet_name = element.get(TABLE + "name")
+                        blank = 0
+                continue
+
+            if tag == ROW:
+                values = _row_values(element)
+                parents[-1].remove(element)
+                repeat = int(element.get(ROWS_REPEATED, 1))
+                # blank rows are only written once a value follows them
+                if not values:
+                    blank += repeat
+                    continue
+                for _ in range(blank):
+                    yield sheet_name, []
+                blank = 0
+                for _ in range(repeat):
+                    yield sheet_name, values
+            elif tag in ROW_PARENTS:
+                parents.pop()
+                element.clear()
+
+
+def _frame(rows):
+    """A read_excel-like DataFrame of a sheet's rows: the first row is the header."""
+    width = max(len(row) for row in rows)
+    header = []
+    for i, name in enumerate(rows[0] + [np.nan] * (width - len(rows[0]))):
+        name = f"Unnamed: {i}" if name is np.nan else str(name)
+        # duplicate names are numbered like read_excel numbers them
+        seen = name
+        count = 0
+        while seen in header:
+            count += 1
+            seen = f"{name}.{count}"
+        header.append(seen)
+    data = [row + [np.nan] * (width - len(row)) for row in rows[1:]]
+    return pd.DataFrame(data, columns=header)
+
+
+def iter_sheets(path):
+    """Yield (sheet_name, DataFrame) one sheet at a time; sheets without any value are left out."""
+    for sheet_name, rows in itertools.groupby(iter_rows(path), key=lambda item: item[0]):
+        yield sheet_name, _frame([values for _, values in rows])
+
+
+def read_sheets(path):
+    """{sheet_name: DataFrame} of the workbook, for pd.read_excel(path, sheet_name=None, engine="odf")."""
+    return dict(iter_sheets(path))
@@ -0,0 +1,67 @@
+"""Coalesce redraw requests so a burst of widget signals draws a chart once.
+
+Toggling every account checkbox, or selecting a pie chart's group, changes
+one checkbox after another, and each stateChanged used to rebuild the net
+worth chart. Views now ask the scheduler for a redraw instead: it marks the
+view dirty and runs its draw callback once, on the next turn of the event
+loop (or after a debounce window, for widgets such as date edits that emit
+a stream of changes). Requests for a view that is already dirty are
+counted as avoided redraws, as are pending requests that a direct draw
+made unnecessary (see ``drawn``).
+"""
+from PyQt6.QtCore import QTimer
+
+from instrumentation import recorder
+
+
+class RedrawScheduler:
+    def __init__(self, delay_ms=0):
+        self.delay_ms = delay_ms
+        self._views = {}
+        self._dirty = {}  # view name -> args of its latest request, in request order
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self.requested = 0
+        self.performed = 0
+        self.avoided = 0
+
+    def register(self, name, draw):
+        """Make draw(*args) the callback that redraws the named view."""
+        self._views[name] = draw
+
+    def request(self, name, *args, delay_ms=None):
+        """Mark the view dirty; it is drawn once when the event loop gets back to the scheduler.
+
+        A later request replaces the arguments of a pending one. delay_ms
+        (default: the scheduler's) restarts the wait, so a stream of requests
+        is drawn once it pauses for that long.
+        """
+        self.requested += 1
+        if name in self._dirty:
+            self.avoided += 1
+            recorder.count("redraws.avoided")
+        self._dirty[name] = args
+        self._timer.start(self.delay_ms if delay_ms is None else delay_ms)
+
+    def drawn(self, name):
+        """Tell the scheduler the view was just drawn directly; a pending request for it is dropped."""
+        if self._dirty.pop(name, None) is not None:
+            self.avoided += 1
+            recorder.count("redraws.avoided")
+
+    def pending(self):
+        return list(self._dirty)
+
+    def flush(self):
+        """Draw every dirty view now, in the order they were first requested."""
+        self._timer.stop()
+        while self._dirty:
+            name = next(iter(self._dirty))
+            args = self._dirty.pop(name)
+            self.performed += 1
+            recorder.count("redraws.performed")
+            self._views[name](*args)
+
+    def stats(self):
+        return {"requested": self.requested, "performed": self.performed, "avoided": self.avoided}
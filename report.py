@@ -0,0 +1,264 @@
+"""Headless reports: net worth and group totals without Qt.
+
+Runs FinanceModel directly (so the on-disk dataset cache is shared with the
+desktop app) and writes, per report, into the output directory:
+
+    <name>.csv          date x (net worth, total, groups) for the date range
+    <name>.json         balances and changes per group and per account
+    <name>.png          the group totals as lines (matplotlib Agg)
+    <name>-<group>.png  one pie per non-empty group at the end date
+
+One report is made per --currency, or per entry of a --spec JSON file:
+
+    [{"name": "nightly-cad", "currency": "CAD", "start": "2024-01-01", "end": null,
+      "formats": ["csv", "json", "png"]}, ...]
+
+Reports run in separate processes, --jobs at a time. The dataset and its
+view in every requested currency are loaded or computed once beforehand;
+the processes only read the on-disk cache. Like main.py it reads config/
+and db/ from the working directory.
+
+usage: python report.py [--currency CUR ...] [--start DATE] [--end DATE | --days N]
+                        [--output DIR] [--format csv json png] [--spec FILE] [--jobs N]
+"""
+import os
+import json
+import time
+import argparse
+import functools
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+FORMATS = ["csv", "json", "png"]
+
+# the totals built by load_data, in the order they are reported
+GROUPS = ["net worth", "total", "operating", "investing", "crypto", "equity"]
+
+
+def group_members(model, account_data):
+    """{group: member accounts} of the configured and custom groups, like the pie charts use them."""
+    accounts = [account for account in account_data if account not in GROUPS and account not in model.customGroups]
+    members = {
+        "net worth": accounts,
+        "total": [a for a in accounts if a not in model.ignoreForTotalList],
+        "operating": model.operatingList,
+        "investing": model.investingList,
+        "crypto": model.cryptoList,
+        "equity": model.equityList,
+        "summary": model.summaryList,
+    }
+    for name, listed in model.customGroups.items():
+        # a custom group may list other groups, report the accounts they stand for
+        members.setdefault(name, list(dict.fromkeys(
+            account for member in listed for account in members.get(member, [member])
+        )))
+    return members
+
+
+def _day(date):
+    return None if date is None else pd.Timestamp(date).normalize()
+
+
+def compute_report(model, account_data, start=None, end=None):
+    """Return (frame of the group totals between start and end, summary dict) for one dataset."""
+    end = _day(end) or pd.Timestamp(datetime.today().date())
+    start = _day(start)
+    totals = [name for name in GROUPS + list(model.customGroups) if name in account_data]
+
+    columns = {}
+    for name, dates, balances in account_data.between(totals, start, end):
+        columns[name] = pd.Series(balances, index=pd.DatetimeIndex(dates))
+    frame = pd.DataFrame(columns)[[name for name in totals if name in columns]] if columns else pd.DataFrame()
+    frame.index.name = "date"
+
+    first = start if start is not None else (frame.index.min() if len(frame) else end)
+    members = group_members(model, account_data)
+    accounts = members["net worth"]
+    start_balances = account_data.balances_at(first, accounts)
+    end_balances = account_data.balances_at(end, accounts)
+    by_account = {
+        account: {"start": float(a), "end": float(b), "change": float(b - a)}
+        for account, a, b in zip(accounts, start_balances, end_balances)
+        if a != 0 or b != 0
+    }
+
+    groups = {}
+    for name, listed in members.items():
+        listed = [account for account in listed if account in account_data]
+        if not listed:
+            continue
+        if name in account_data:
+            # the totals built by load_data, carried forward like the chart shows them
+            a, b = account_data.balances_at(first, [name])[0], account_data.balances_at(end, [name])[0]
+        else:
+            a = float(np.sum(account_data.balances_at(first, listed)))
+            b = float(np.sum(account_data.balances_at(end, listed)))
+        groups[name] = {"start": float(a), "end": float(b), "change": float(b - a), "accounts": listed}
+
+    summary = {
+        "currency": model.main_currency,
+        "start": first.strftime("%Y-%m-%d"),
+        "end": end.strftime("%Y-%m-%d"),
+        "groups": groups,
+        "accounts": by_account,
+    }
+    return frame, summary
+
+
+def write_csv(path, frame):
+    frame.to_csv(path, date_format="%Y-%m-%d", float_format="%.2f")
+
+
+def write_json(path, summary):
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2)
+
+
+def write_png(path, frame, summary, account_data):
+    """Draw the totals as lines and one pie per group, with the same chart classes as the app."""
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from charts import LineChart, PieChart
+
+    paths = []
+    figure = Figure(figsize=(16, 9), dpi=100)
+    FigureCanvasAgg(figure)
+    chart = LineChart(figure, "black", 1.0)
+    series = [(name, frame[name].dropna().index.values, frame[name].dropna().to_numpy()) for name in frame.columns]
+    change = summary["groups"].get("net worth", {}).get("change")
+    chart.update(
+        series, summary["currency"],
+        title=f"Account Balances ({summary['start']} to {summary['end']})",
+        ylabel=f"Balance ({summary['currency']})",
+        change_text="" if change is None else f"Amount Changed: {summary['currency']} {change:,.2f}",
+    )
+    figure.savefig(path)
+    paths.append(path)
+
+    end = pd.Timestamp(summary["end"])
+    base = os.path.splitext(path)[0]
+    for name, group in summary["groups"].items():
+        if name in ("net worth", "total"):
+            continue
+        balances = account_data.balances_at(end, group["accounts"])
+        wedges = {account: abs(balance) for account, balance in zip(group["accounts"], balances.tolist()) if balance != 0}
+        if not wedges:
+            continue
+        figure = Figure(figsize=(8, 8), dpi=100)
+        FigureCanvasAgg(figure)
+        # investing, equity and summary show the signed total, like the app's pies
+        total = group["end"] if name in ("investing", "equity", "summary") else sum(wedges.values())
+        PieChart(figure, f"{name.capitalize()} ({summary['end']})", "black", 1.0).update(wedges, summary["currency"], total)
+        pie_path = f"{base}-{name.replace(' ', '_')}.png"
+        figure.savefig(pie_path)
+        paths.append(pie_path)
+    return paths
+
+
+def prepare_cache(specs):
+    """Load or compute the dataset and its view in every currency of specs, saving them to the on-disk cache."""
+    from model import FinanceModel
+
+    model = FinanceModel()
+    for currency in dict.fromkeys(spec.get("currency") or model.main_currency for spec in specs):
+        model.main_currency = currency
+        model.load_data()
+
+
+def run_report(spec, read_only_cache=False):
+    """Build one report from its spec dict in this process; returns the written paths and timings.
+
+    With read_only_cache the on-disk cache is used but never written, so
+    parallel reports cannot replace each other's cache files.
+    """
+    from model import FinanceModel
+
+    started = time.perf_counter()
+    model = FinanceModel(cache_read_only=read_only_cache)
+    model.main_currency = spec.get("currency") or model.main_currency
+    account_data = model.load_data()
+    loaded = time.perf_counter()
+
+    frame, summary = compute_report(model, account_data, spec.get("start"), spec.get("end"))
+    os.makedirs(spec["output"], exist_ok=True)
+    base = os.path.join(spec["output"], spec["name"])
+    formats = spec.get("formats") or FORMATS
+
+    paths = []
+    if "csv" in formats:
+        write_csv(base + ".csv", frame)
+        paths.append(base + ".csv")
+    if "json" in formats:
+        write_json(base + ".json", summary)
+        paths.append(base + ".json")
+    if "png" in formats and not frame.empty:
+        paths += write_png(base + ".png", frame, summary, account_data)
+
+    return {
+        "name": spec["name"],
+        "paths": paths,
+        "load_seconds": loaded - started,
+        "total_seconds": time.perf_counter() - started,
+    }
+
+
+def build_specs(args):
+    """The report specs from --spec, or one per --currency with the command line options."""
+    if args.spec:
+        with open(args.spec) as f:
+            specs = json.load(f)
+    else:
+        end = args.end
+        start = args.start
+        if args.days is not None:
+            end_day = pd.Timestamp(end) if end else pd.Timestamp(datetime.today().date())
+            start = (end_day - timedelta(days=args.days)).strftime("%Y-%m-%d")
+        specs = [
+            {"name": f"report-{currency}", "currency": currency, "start": start, "end": end, "formats": args.format}
+            for currency in args.currency
+        ]
+    for i, spec in enumerate(specs):
+        spec.setdefault("name", f"report-{i + 1}")
+        spec.setdefault("output", args.output)
+    return specs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--currency", nargs="+", default=["CAD"], help="one report per main currency")
+    parser.add_argument("--start", help="first date, YYYY-MM-DD (default: the first known date)")
+    parser.add_argument("--end", help="last date, YYYY-MM-DD (default: today)")
+    parser.add_argument("--days", type=int, help="start this many days before the end date instead of --start")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=FORMATS)
+    parser.add_argument("--output", default="reports")
+    parser.add_argument("--spec", help="JSON list of report specs, overrides the options above")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="reports built in parallel, each in its own process")
+    args = parser.parse_args()
+
+    specs = build_specs(args)
+    jobs = max(1, min(args.jobs or 1, len(specs)))
+    started = time.perf_counter()
+    if jobs == 1:
+        results = [run_report(spec) for spec in specs]
+    else:
+        prepare_cache(specs)
+        # spawned rather than forked, a forked child would reuse the parent's open sqlite connections
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(functools.partial(run_report, read_only_cache=True), specs))
+
+    for result in results:
+        print(f"{result['name']}: {len(result['paths'])} files in {result['total_seconds']:.2f}s (load {result['load_seconds']:.2f}s)")
+        for path in result["paths"]:
+            print("\t", path)
+    print(f"{len(results)} reports in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Before/after benchmark of the schema migration in db_schema.py.
+
+The rows of the given databases are copied into a temporary directory twice:
+once with the original tables (TEXT dates, rowid tables, no extra indexes)
+and once migrated with db_schema. The same queries then run against both:
+
+    nearest_rate    date <= ? AND base_currency=? AND target_currency=? ORDER BY date DESC LIMIT 1
+    nearest_price   date <= ? AND symbol=? ORDER BY date DESC LIMIT 1
+    read_balances   every balance row as a DataFrame with parsed dates, as load_data needs it
+
+The query plans are printed too, so a missing index shows up as a SCAN.
+
+usage: python scripts/benchmark_schema.py [--db-dir DIR] [--lookups N] [--repeat N] [--json FILE]
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+
+import pandas as pd
+
+# Get the current script's directory
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# Get the parent directory
+parent_dir = os.path.dirname(current_dir)
+# Add the parent directory to sys.path
+sys.path.append(parent_dir)
+# Now you can import modules from the parent directory
+import db_schema
+
+
+LEGACY_TABLES = {
+    "finance.db": ("account_balances", '''
+        CREATE TABLE account_balances (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_name TEXT,
+            date TEXT,
+            balance REAL,
+            currency TEXT,
+            ticker TEXT,
+            UNIQUE(account_name, date, currency, ticker)
+        )
+    ''', "id, account_name, date, balance, currency, ticker"),
+    "exchange_rates.db": ("exchange_rates", '''
+        CREATE TABLE exchange_rates (
+            date TEXT,
+            base_currency TEXT,
+            target_currency TEXT,
+            rate REAL,
+            PRIMARY KEY (date, base_currency, target_currency)
+        )
+    ''', "date, base_currency, target_currency, rate"),
+    "stock.db": ("stock_prices", '''
+        CREATE TABLE stock_prices (
+            date TEXT,
+            symbol TEXT,
+            currency TEXT,
+            price REAL,
+            PRIMARY KEY (date, symbol)
+        )
+    ''', "date, symbol, currency, price"),
+}
+
+MIGRATIONS = {
+    "finance.db": db_schema.migrate_finance,
+    "exchange_rates.db": db_schema.migrate_exchange_rates,
+    "stock.db": db_schema.migrate_stock_prices,
+}
+
+NEAREST_RATE = '''
+    SELECT rate FROM exchange_rates
+    WHERE date <= ? AND base_currency=? AND target_currency=?
+    ORDER BY date DESC
+    LIMIT 1
+'''
+
+NEAREST_PRICE = '''
+    SELECT price FROM stock_prices
+    WHERE date <= ? AND symbol=?
+    ORDER BY date DESC
+    LIMIT 1
+'''
+
+
+def copy_legacy(source, target):
+    """Copy the rows of source into a database at target that uses the original table."""
+    table, create_sql, columns = LEGACY_TABLES[os.path.basename(source)]
+    conn = sqlite3.connect(target)
+    conn.execute(create_sql)
+    if os.path.exists(source):
+        conn.execute("ATTACH DATABASE ? AS source", (source,))
+        conn.execute(f"INSERT OR IGNORE INTO {table} ({columns}) SELECT {columns} FROM source.{table}")
+        conn.commit()
+        conn.execute("DETACH DATABASE source")
+    conn.commit()
+    return conn
+
+
+def timed(function, repeat):
+    """Best wall time in ms over repeat calls, and the last result."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def plan(conn, query, params):
+    return " / ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+
+
+def lookups(keys, count, seed=0):
+    """count random (date, *key) parameter tuples for query, with dates inside the stored range."""
+    rng = random.Random(seed)
+    days = pd.date_range("2000-01-01", pd.Timestamp.now().normalize(), freq="D").strftime("%Y-%m-%d")
+    return [(rng.choice(days),) + rng.choice(keys) for _ in range(count)] if keys else []
+
+
+def run_lookups(conn, query, params):
+    cursor = conn.cursor()
+    return [cursor.execute(query, p).fetchone() for p in params]
+
+
+def read_balances_legacy(conn):
+    df = pd.read_sql_query("SELECT account_name, date, balance, currency, ticker FROM account_balances ORDER BY date", conn)
+    df["date"] = pd.to_datetime(df["date"])
+    df["ticker"] = df["ticker"].fillna("")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-dir", default="db", help="directory holding finance.db, exchange_rates.db and stock.db")
+    parser.add_argument("--lookups", type=int, default=20000, help="number of nearest rate/price queries")
+    parser.add_argument("--repeat", type=int, default=3, help="keep the best of this many runs")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        conns = {"before": {}, "after": {}}
+        for name in LEGACY_TABLES:
+            source = os.path.abspath(os.path.join(args.db_dir, name))
+            conns["before"][name] = copy_legacy(source, os.path.join(tmp, "before-" + name))
+            after = copy_legacy(source, os.path.join(tmp, "after-" + name))
+            start = time.perf_counter()
+            MIGRATIONS[name](after)
+            results[f"migrate {name}"] = {"after": (time.perf_counter() - start) * 1000}
+            conns["after"][name] = after
+
+        rates = conns["before"]["exchange_rates.db"]
+        pairs = rates.execute("SELECT DISTINCT base_currency, target_currency FROM exchange_rates").fetchall()
+        symbols = conns["before"]["stock.db"].execute("SELECT DISTINCT symbol FROM stock_prices").fetchall()
+
+        benchmarks = {
+            "nearest_rate": ("exchange_rates.db", NEAREST_RATE, lookups(pairs, args.lookups)),
+            "nearest_price": ("stock.db", NEAREST_PRICE, lookups(symbols, args.lookups)),
+        }
+        for label, (name, query, params) in benchmarks.items():
+            if not params:
+                continue
+            results[label] = {}
+            answers = {}
+            for stage in ("before", "after"):
+                conn = conns[stage][name]
+                results[label][stage], answers[stage] = timed(lambda: run_lookups(conn, query, params), args.repeat)
+                print(f"{label} {stage} plan: {plan(conn, query, params[0])}")
+            if answers["before"] != answers["after"]:
+                print(f"WARNING: {label} answers differ between the schemas")
+
+        results["read_balances"] = {}
+        frames = {}
+        results["read_balances"]["before"], frames["before"] = timed(lambda: read_balances_legacy(conns["before"]["finance.db"]), args.repeat)
+        results["read_balances"]["after"], frames["after"] = timed(lambda: db_schema.read_balance_days(conns["after"]["finance.db"]), args.repeat)
+        if len(frames["before"]) != len(frames["after"]):
+            print(f"WARNING: read_balances returned {len(frames['before'])} rows before and {len(frames['after'])} after")
+
+        for stages in conns.values():
+            for conn in stages.values():
+                conn.close()
+
+    print(f"\n{'':<28}{'before':>12}{'after':>12}")
+    for label, timings in results.items():
+        before = f"{timings['before']:.1f} ms" if "before" in timings else ""
+        after = f"{timings['after']:.1f} ms"
+        speedup = f"  ({timings['before'] / timings['after']:.1f}x)" if "before" in timings and timings["after"] else ""
+        print(f"{label:<28}{before:>12}{after:>12}{speedup}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"lookups": args.lookups, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
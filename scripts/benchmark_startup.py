@@ -0,0 +1,155 @@
+"""Startup benchmark for the desktop app: import cost and time to first paint.
+
+Every run starts the app in a fresh interpreter and records, relative to the
+moment the process was spawned:
+
+    qt_ready        QApplication created
+    imports         controller (and with it model, view, pandas...) imported
+    constructed     FinanceController built
+    first_paint     first paint event of any widget after window.show()
+    interactive     the background load_data finished and the data is applied
+    charts_drawn    the progressively drawn pie charts are all done
+
+With --importtime the runs use ``python -X importtime`` and the slowest top
+level imports are listed too (that flag slows imports down, so compare
+import tables with each other, not with the timings above).
+
+usage: python scripts/benchmark_startup.py [--runs N] [--cwd DIR] [--json FILE] [--importtime] [--onscreen]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+# Get the current script's directory
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# Get the parent directory
+parent_dir = os.path.dirname(current_dir)
+
+MARKER = "STARTUP_BENCHMARK "
+MARKS = ["qt_ready", "imports", "constructed", "first_paint", "interactive", "charts_drawn"]
+
+
+def child(timeout):
+    """Start the app like main.py does and print the timestamps of each startup stage."""
+    start = float(os.environ["STARTUP_BENCHMARK_START"])
+    marks = {}
+
+    def mark(name):
+        if name not in marks:
+            marks[name] = time.time() - start
+
+    sys.path.append(parent_dir)
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QObject, QEvent, QTimer
+
+    app = QApplication(sys.argv)
+    app.setStyle("Fusion")
+    mark("qt_ready")
+
+    from controller import FinanceController
+    mark("imports")
+
+    window = FinanceController()
+    mark("constructed")
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint:
+                mark("first_paint")
+            return False
+
+    watcher = PaintWatcher()
+    app.installEventFilter(watcher)
+
+    def poll():
+        if window._cached_account_data is not None and not window._loading:
+            mark("interactive")
+            # older trees drew every chart synchronously
+            if not getattr(window, "_pending_pie_charts", None):
+                mark("charts_drawn")
+        if "charts_drawn" in marks and "first_paint" in marks or time.time() - start > timeout:
+            app.quit()
+
+    timer = QTimer()
+    timer.timeout.connect(poll)
+    timer.start(5)
+
+    window.show()
+    app.exec()
+    print(MARKER + json.dumps(marks), flush=True)
+
+
+def parse_importtime(stderr, top):
+    """Return the slowest top level imports as (module, cumulative ms)."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # nested imports are indented below the module that triggered them
+        if not name.startswith("  "):
+            imports.append((name.strip(), int(cumulative) / 1000))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:top]
+
+
+def run_once(cwd, importtime, onscreen, timeout):
+    env = dict(os.environ)
+    if not onscreen:
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + [os.path.abspath(__file__), "--child", "--timeout", str(timeout)]
+
+    env["STARTUP_BENCHMARK_START"] = repr(time.time())
+    result = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True, timeout=timeout + 30)
+
+    lines = [line for line in result.stdout.splitlines() if line.startswith(MARKER)]
+    if not lines:
+        raise RuntimeError(f"startup run failed (exit code {result.returncode}):\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1][len(MARKER):]), result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--cwd", default=parent_dir, help="directory holding config/ and db/ (default: the repository)")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--importtime", action="store_true", help="run with -X importtime and list the slowest imports")
+    parser.add_argument("--top", type=int, default=15, help="number of imports to list")
+    parser.add_argument("--onscreen", action="store_true", help="use the real display instead of the offscreen platform")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.timeout)
+        return
+
+    runs = []
+    imports = []
+    for i in range(args.runs):
+        marks, stderr = run_once(args.cwd, args.importtime, args.onscreen, args.timeout)
+        runs.append(marks)
+        if args.importtime:
+            imports = parse_importtime(stderr, args.top)
+        print(f"run {i + 1}: " + ", ".join(f"{name} {marks[name]:.3f}s" for name in MARKS if name in marks))
+
+    median = {name: statistics.median(run[name] for run in runs) for name in MARKS if all(name in run for run in runs)}
+    print("\nmedian over %d runs:" % len(runs))
+    for name, seconds in median.items():
+        print(f"\t{name:<14} {seconds:.3f}s")
+
+    if imports:
+        print("\nslowest top level imports (last run, -X importtime):")
+        for name, ms in imports:
+            print(f"\t{name:<40} {ms:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": runs, "median": median, "imports": imports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""Headless benchmark suite on a synthetic portfolio.
+
+Generates a portfolio with scripts/synthetic_portfolio.py in a temporary
+directory (or --dir), then times the model and the charts against it:
+
+    model_init                FinanceModel() including the exchange rate index preload
+    load_data_cold            load_data on a new model, without the on-disk cache
+    load_data_cached          load_data on a new model, from the on-disk cache
+    load_data_incremental     load_data after add_balance on one account
+    load_data_currency        load_data after switching the main currency
+    convert_to_main           --lookups scalar conversions at random dates
+    main_currency_factors     the vectorized conversion of every currency over the whole axis
+    get_nearest_rate          --lookups lookups through the in-memory index
+    get_nearest_rate_sql      --lookups lookups through SQL (ExchangeRate without preload)
+    get_nearest_price         --lookups stock price lookups
+    ods_import                ods_read: ods_reader.read_sheets of a workbook with --ods-accounts sheets,
+                              ods_read_odf: pd.read_excel(engine="odf") of it, which the app used before,
+                              ods_import_sheets: import_sheets of it into an empty finance.db
+    plot_net_worth            plot_net_worth_first: every account drawn on a new LineChart (Agg)
+                              at the pyramid level plot_net_worth picks for all data,
+                              plot_net_worth_update: the same chart updated in place
+    plot_pie_charts           plot_pie_charts_first: the five group pies drawn on new PieCharts (Agg),
+                              plot_pie_charts_update: the same pies updated in place for another date
+
+--executor and --workers choose how load_data runs the per-series work, see
+series_pool.py; a process pool is started by the first run and reused.
+
+Every benchmark runs --repeat times and the JSON written by --json keeps
+every run plus the median, with the commit and library versions, so files
+from two commits can be compared. --compare BASELINE.json prints the ratio of
+the medians and exits with status 1 when one is slower than the baseline by
+more than --threshold. --trace keeps the instrumentation spans of the runs.
+
+usage: python scripts/benchmark_suite.py [--accounts N] [--years N] [--tickers N] [--currencies N]
+                                         [--repeat N] [--executor serial|thread|process] [--workers N]
+                                         [--only NAME ...] [--json FILE] [--compare FILE]
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import subprocess
+from datetime import datetime
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import numpy as np
+import pandas as pd
+
+# Get the current script's directory
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# Get the parent directory
+parent_dir = os.path.dirname(current_dir)
+# Add the parent directory to sys.path
+sys.path.append(parent_dir)
+# Now you can import modules from the parent directory
+import charts
+import exchange_rates
+import stocks
+import series_engine
+import series_pool
+import ods_reader
+from model import FinanceModel
+from db_connection import connection_manager
+from instrumentation import recorder
+from synthetic_portfolio import generate_balances, write_portfolio, write_ods, working_directory
+
+
+BENCHMARKS = {}
+
+
+def benchmark(function):
+    """Register function(env, timer) as a benchmark; it times its measured part with ``with timer():``."""
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+class Timer:
+    """Collects wall times per benchmark name over the repeated runs."""
+
+    def __init__(self):
+        self.runs = {}
+        self.name = None
+
+    @contextlib.contextmanager
+    def __call__(self, name=None):
+        name = name or self.name
+        start = time.perf_counter()
+        yield
+        self.runs.setdefault(name, []).append(time.perf_counter() - start)
+
+
+def quiet():
+    """Swallow the model's prints (config lists, missing rate messages) while benchmarking."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+class Environment:
+    """The generated portfolio, plus scratch copies of it for benchmarks that write."""
+
+    def __init__(self, directory, portfolio, args):
+        self.directory = directory
+        self.portfolio = portfolio
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self._scratch = 0
+
+    def copy(self):
+        """Return a fresh copy of the portfolio directory (config and databases, no cache)."""
+        self._scratch += 1
+        target = os.path.join(self.directory, "scratch", str(self._scratch))
+        shutil.copytree(os.path.join(self.directory, "config"), os.path.join(target, "config"))
+        os.makedirs(os.path.join(target, "db"))
+        for name in ("finance.db", "exchange_rates.db", "stock.db"):
+            shutil.copy(os.path.join(self.directory, "db", name), os.path.join(target, "db", name))
+        return target
+
+    def model(self, use_cache=False):
+        with quiet():
+            return FinanceModel(use_cache=use_cache, executor=self.args.executor, workers=self.args.workers)
+
+    def loaded_model(self, use_cache=False):
+        model = self.model(use_cache)
+        with quiet():
+            model.load_data()
+        return model
+
+    def random_dates(self, count):
+        balances = self.portfolio["balances"]
+        first, last = pd.Timestamp(balances["date"].min()), pd.Timestamp.now().normalize()
+        days = (last - first).days
+        return [(first + pd.Timedelta(days=self.rng.randint(0, days))).strftime("%Y-%m-%d") for _ in range(count)]
+
+
+@benchmark
+def model_init(env, timer):
+    with timer(), quiet():
+        FinanceModel(use_cache=False)
+
+
+@benchmark
+def load_data_cold(env, timer):
+    model = env.model()
+    with timer(), quiet():
+        model.load_data()
+
+
+@benchmark
+def load_data_cached(env, timer):
+    with working_directory(env.copy()):
+        env.loaded_model(use_cache=True)
+        model = env.model(use_cache=True)
+        with timer(), quiet():
+            model.load_data()
+        connection_manager.close_all()
+
+
+@benchmark
+def load_data_incremental(env, timer):
+    with working_directory(env.copy()):
+        model = env.loaded_model()
+        account = env.rng.choice(sorted(env.portfolio["balances"]["account_name"].unique()))
+        row = env.portfolio["balances"][env.portfolio["balances"]["account_name"] == account].iloc[-1]
+        model.add_balance(account, env.random_dates(1)[0], float(row["balance"]) + 1, row["currency"], row["ticker"])
+        with timer(), quiet():
+            model.load_data()
+        connection_manager.close_all()
+
+
+@benchmark
+def load_data_currency(env, timer):
+    model = env.loaded_model()
+    currency = next((c for c in model.available_currencies if c != model.main_currency), model.main_currency)
+    model.main_currency = currency
+    with timer(), quiet():
+        model.load_data()
+
+
+@benchmark
+def convert_to_main(env, timer):
+    model = env.model()
+    model.main_currency = "USD" if "USD" in model.available_currencies else "CAD"
+    dates = env.random_dates(env.args.lookups)
+    currencies = [env.rng.choice(model.available_currencies) for _ in dates]
+    with timer(), quiet():
+        for date, currency in zip(dates, currencies):
+            model.convert_to_main(date, 100.0, currency)
+
+
+@benchmark
+def main_currency_factors(env, timer):
+    model = env.loaded_model()
+    model.main_currency = "USD" if "USD" in model.available_currencies else "CAD"
+    axis = model._series_state["axis"]
+    with timer(), quiet():
+        cache = {}
+        for currency in model.available_currencies:
+            model.main_currency_factors(axis, currency, cache)
+
+
+@benchmark
+def get_nearest_rate(env, timer):
+    with quiet():
+        rates = exchange_rates.ExchangeRate(preload=True)
+    pairs = [(c, "CAD") for c in env.portfolio["rates"]["base_currency"].unique()]
+    lookups = [(date, *env.rng.choice(pairs)) for date in env.random_dates(env.args.lookups)] if pairs else []
+    with timer(), quiet():
+        for lookup in lookups:
+            rates.get_nearest_rate(*lookup)
+
+
+@benchmark
+def get_nearest_rate_sql(env, timer):
+    with quiet():
+        rates = exchange_rates.ExchangeRate(preload=False)
+    pairs = [(c, "CAD") for c in env.portfolio["rates"]["base_currency"].unique()]
+    lookups = [(date, *env.rng.choice(pairs)) for date in env.random_dates(env.args.lookups)] if pairs else []
+    with timer(), quiet():
+        for lookup in lookups:
+            rates.get_nearest_rate(*lookup)
+
+
+@benchmark
+def get_nearest_price(env, timer):
+    with quiet():
+        prices = stocks.stockTicker()
+    symbols = list(env.portfolio["prices"]["symbol"].unique())
+    lookups = [(date, env.rng.choice(symbols)) for date in env.random_dates(env.args.lookups)] if symbols else []
+    with timer(), quiet():
+        for lookup in lookups:
+            prices.get_nearest_price(*lookup)
+
+
+def workbook(env):
+    """Path of the benchmark workbook, written once on first use."""
+    path = os.path.join(env.directory, "import.ods")
+    if not os.path.exists(path):
+        accounts = sorted(env.portfolio["balances"]["account_name"].unique())[:env.args.ods_accounts]
+        write_ods(path, env.portfolio["balances"], accounts)
+    return path
+
+
+@benchmark
+def ods_import(env, timer):
+    path = workbook(env)
+    with working_directory(env.copy()):
+        conn = sqlite3.connect("db/finance.db")
+        conn.execute("DELETE FROM account_balances")
+        conn.commit()
+        conn.close()
+        model = env.model()
+        with timer("ods_read"):
+            sheets = ods_reader.read_sheets(path)
+        with timer("ods_read_odf"):
+            pd.read_excel(path, sheet_name=None, engine="odf")
+        with timer("ods_import_sheets"), quiet():
+            model.import_sheets(sheets)
+        connection_manager.close_all()
+
+
+def line_series(account_data):
+    """[(account, dates, balances)] of every account, as plot_net_worth passes it with all of them selected."""
+    return [(account, *account_data.arrays(account)) for account in account_data]
+
+
+def pie_balances(account_data, accounts, date):
+    balances = account_data.balances_at(date, accounts)
+    return {account: abs(balance) for account, balance in zip(accounts, balances) if balance != 0}
+
+
+def new_figure():
+    figure = Figure(figsize=(12, 6), dpi=100)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+@benchmark
+def plot_net_worth(env, timer):
+    model = env.model()
+    with quiet():
+        account_data = model.load_data()
+    with timer("plot_net_worth_first"):
+        chart = charts.LineChart(new_figure(), "white", 0.8)
+        # the level plot_net_worth picks for "All Data" at this width
+        level = series_engine.choose_level(account_data.axis[0], account_data.axis[-1], chart.max_points())
+        series = line_series(account_data.level(level))
+        chart.update(series, model.main_currency, "Account Balances (All)", f"Balance ({model.main_currency})")
+    with timer("plot_net_worth_update"):
+        chart.update(series[::-1], model.main_currency, "Account Balances (All)", f"Balance ({model.main_currency})")
+
+
+@benchmark
+def plot_pie_charts(env, timer):
+    model = env.model()
+    with quiet():
+        account_data = model.load_data()
+    groups = [model.cryptoList, model.operatingList, model.investingList, model.equityList, model.summaryList]
+    today = pd.Timestamp.now().normalize()
+    pies = []
+    with timer("plot_pie_charts_first"):
+        for accounts in groups:
+            balances = pie_balances(account_data, accounts, today)
+            if balances:
+                pie = charts.PieChart(new_figure(), "Group", "white", 0.8)
+                pie.update(balances, model.main_currency, sum(balances.values()))
+                pies.append((pie, accounts))
+    earlier = today - pd.Timedelta(days=90)
+    with timer("plot_pie_charts_update"):
+        for pie, accounts in pies:
+            balances = pie_balances(account_data, accounts, earlier)
+            if balances:
+                pie.update(balances, model.main_currency, sum(balances.values()))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=parent_dir,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(runs):
+    return {"median": statistics.median(runs), "best": min(runs), "runs": runs}
+
+
+def compare(results, baseline, threshold):
+    """Print current vs baseline medians and return the names that got slower than threshold allows."""
+    regressions = []
+    print(f"\n{'benchmark':<28}{'baseline':>12}{'current':>12}{'ratio':>9}")
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            print(f"{name:<28}{'-':>12}{result['median'] * 1000:>10.1f}ms")
+            continue
+        ratio = result["median"] / before["median"] if before["median"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<28}{before['median'] * 1000:>10.1f}ms{result['median'] * 1000:>10.1f}ms{ratio:>8.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=40)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--tickers", type=int, default=5)
+    parser.add_argument("--currencies", type=int, default=4, help="including CAD")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=5000, help="number of scalar rate/price/conversion lookups")
+    parser.add_argument("--ods-accounts", type=int, default=10, help="number of account sheets in the imported workbook")
+    parser.add_argument("--executor", choices=series_pool.EXECUTORS, help="how load_data runs the per-series work (default: serial)")
+    parser.add_argument("--workers", type=int, help="workers of the thread or process executor (default: one per CPU)")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--dir", help="generate the portfolio here and keep it (default: a temporary directory)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="baseline JSON written by an earlier --json run")
+    parser.add_argument("--trace", help="write the recorded spans here, as a Chrome trace when the name ends in .trace.json")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown against the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        directory = args.dir or stack.enter_context(tempfile.TemporaryDirectory())
+        directory = os.path.abspath(directory)
+        start = time.perf_counter()
+        portfolio = generate_balances(args.accounts, args.years, args.tickers, args.currencies, args.seed)
+        write_portfolio(directory, portfolio)
+        print(f"generated {len(portfolio['balances'])} balance rows in {time.perf_counter() - start:.1f}s")
+
+        env = Environment(directory, portfolio, args)
+        timer = Timer()
+        stack.enter_context(working_directory(directory))
+        for name in args.only or BENCHMARKS:
+            timer.name = name
+            known = set(timer.runs)
+            for _ in range(args.repeat):
+                BENCHMARKS[name](env, timer)
+            connection_manager.close_all()
+            for measured in [n for n in timer.runs if n not in known]:
+                runs = timer.runs[measured]
+                print(f"{measured:<28}median {statistics.median(runs) * 1000:9.1f} ms   best {min(runs) * 1000:9.1f} ms")
+
+    results = {name: summarize(runs) for name, runs in timer.runs.items()}
+    pool = series_pool.SeriesPool(args.executor, args.workers)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "matplotlib": matplotlib.__version__,
+            "scale": {"accounts": args.accounts, "years": args.years, "tickers": args.tickers,
+                      "currencies": args.currencies, "seed": args.seed, "lookups": args.lookups,
+                      "ods_accounts": args.ods_accounts, "balance_rows": len(portfolio["balances"])},
+            "repeat": args.repeat,
+            "executor": {"executor": pool.executor, "workers": pool.workers},
+        },
+        "results": results,
+        # totals of the load_data stages and other spans over every run
+        "stages": recorder.summary()["spans"],
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.trace:
+        recorder.export(args.trace)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("scale") != report["meta"]["scale"]:
+            print("note: the baseline was run at a different scale")
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
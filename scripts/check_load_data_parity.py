@@ -0,0 +1,168 @@
+import sys
+import os
+import io
+import math
+import time
+import contextlib
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+# Get the current script's directory
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# Get the parent directory
+parent_dir = os.path.dirname(current_dir)
+# Add the parent directory to sys.path
+sys.path.append(parent_dir)
+# Now you can import modules from the parent directory
+from model import FinanceModel
+import series_engine
+
+
+def reference_load_data(model):
+    """The original dict based load_data, kept as the parity reference for the columnar engine."""
+    with model.get_db_connection() as conn:
+        df = pd.read_sql_query(
+            "SELECT account_name, date, balance, currency, ticker FROM account_balances ORDER BY date",
+            conn
+        )
+
+    if df.empty:
+        return {}
+
+    timeNow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    df_valid = df[df['currency'].isin(model.available_currencies)].copy()
+    if df_valid.empty:
+        return {}
+    df_valid['date'] = pd.to_datetime(df_valid['date'])
+
+    account_data = {}
+    for _, row in df_valid.iterrows():
+        ticker = "" if pd.isna(row['ticker']) else row['ticker']
+        account_data.setdefault(row['account_name'], {}).setdefault(row['currency'], {}).setdefault(ticker, {})[row['date']] = row['balance']
+
+    #extend all data to current date
+    for currencies in account_data.values():
+        for tickers in currencies.values():
+            for ticker, series in tickers.items():
+                series[timeNow] = series[max(series)]
+
+    all_dates = set()
+    for currencies in account_data.values():
+        for tickers in currencies.values():
+            for series in tickers.values():
+                all_dates.update(series.keys())
+    all_dates = sorted(all_dates)
+
+    #add dates by interval
+    current_date = min(all_dates)
+    while current_date <= max(all_dates):
+        all_dates.append(current_date)
+        current_date += timedelta(days=series_engine.INTERVAL_DAYS)
+    all_dates = sorted(set(all_dates))
+
+    #interpolate all data for all dates available in the data
+    for currencies in account_data.values():
+        for tickers in currencies.values():
+            for ticker, series in tickers.items():
+                for date in all_dates:
+                    if date in series or date <= min(series) or date >= timeNow:
+                        continue
+                    previous_date = max(d for d in series if d < date)
+                    next_date = min(d for d in series if d > date)
+                    previous_balance = series[previous_date]
+                    next_balance = series[next_date]
+                    series[date] = previous_balance + (next_balance - previous_balance) * (date - previous_date).days / (next_date - previous_date).days
+
+    #convert currencies to main currency and merge them per account
+    merged = {}
+    for account_name, currencies in account_data.items():
+        merged[account_name] = {}
+        for currency, tickers in currencies.items():
+            for ticker, series in tickers.items():
+                for date, balance in series.items():
+                    if ticker:
+                        stock_price = model.stock.get_nearest_price(date.strftime('%Y-%m-%d'), ticker)
+                        if stock_price is not None:
+                            balance = balance * stock_price
+                    balance = model.convert_to_main(date, balance, currency)
+                    merged[account_name][date] = merged[account_name].get(date, 0) + balance
+
+    #calculate the net worth, total, operating, total investing, crypto, and equity
+    groups = [
+        ("equity", model.equityList),
+        ("net worth", None),
+        ("total", model.ignoreForTotalList),
+        ("operating", model.operatingList),
+        ("investing", model.investingList),
+        ("crypto", model.cryptoList),
+    ]
+    result = dict(merged)
+    for name, members in groups:
+        group = {}
+        for account_name, data in merged.items():
+            if name == "net worth":
+                included = True
+            elif name == "total":
+                included = bool(members) and account_name not in members
+            else:
+                included = account_name in members
+            if included:
+                for date, balance in data.items():
+                    group[date] = group.get(date, 0) + balance
+        if group:
+            result[name] = dict(sorted(group.items()))
+    return result
+
+
+def compare(expected, actual, rel_tol=1e-9, abs_tol=1e-6):
+    """Return a list of human readable differences between two load_data results."""
+    differences = []
+    if set(expected) != set(actual):
+        differences.append(f"account sets differ: {sorted(set(expected) ^ set(actual))}")
+
+    for account in expected.keys() & actual.keys():
+        expected_dates = set(expected[account])
+        actual_dates = set(actual[account])
+        if expected_dates != actual_dates:
+            differences.append(f"{account}: {len(expected_dates ^ actual_dates)} dates differ")
+            continue
+        for date, balance in expected[account].items():
+            if not math.isclose(balance, actual[account][date], rel_tol=rel_tol, abs_tol=abs_tol):
+                differences.append(f"{account} {date:%Y-%m-%d}: expected {balance}, got {actual[account][date]}")
+    return differences
+
+
+def main():
+    db_file = sys.argv[1] if len(sys.argv) > 1 else "db/finance.db"
+    main_currency = sys.argv[2] if len(sys.argv) > 2 else "CAD"
+
+    # the model prints every missing rate, keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = FinanceModel(db_file, use_cache=False)
+        model.main_currency = main_currency
+
+        start = time.perf_counter()
+        expected = reference_load_data(model)
+        reference_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = model.load_data()
+        engine_time = time.perf_counter() - start
+
+    print(f"reference load_data: {reference_time:.3f}s")
+    print(f"columnar load_data:  {engine_time:.3f}s ({reference_time / max(engine_time, 1e-9):.1f}x faster)")
+
+    differences = compare(expected, actual)
+    if differences:
+        print(f"{len(differences)} differences found:")
+        for line in differences[:50]:
+            print("\t", line)
+        sys.exit(1)
+
+    print(f"Parity OK: {len(actual)} series, {sum(len(v) for v in actual.values())} points.")
+
+
+if __name__ == "__main__":
+    main()
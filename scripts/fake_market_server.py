@@ -0,0 +1,184 @@
+"""Local stand-in for the Bank of Canada, Yahoo Finance and CoinMarketCap APIs.
+
+Serves the three endpoints market_data.py uses, with deterministic data: a
+rate or price for every weekday up to --today, derived from a seeded random
+walk per series. Requests can be slowed down (--latency) and made to fail
+(--fail-every N answers every Nth request with a 503 and Retry-After: 0), so
+concurrency and retries can be exercised without a network.
+
+    /valet/observations/group/FX_RATES_DAILY/json?start_date=&end_date=
+    /v8/finance/chart/<symbol>?period1=&period2=&interval=1d
+    /v1/cryptocurrency/quotes/latest?symbol=A,B&convert=CAD
+
+usage: python scripts/fake_market_server.py [--port N] [--today DATE] [--latency S] [--fail-every N]
+"""
+import json
+import time
+import zlib
+import argparse
+import threading
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+
+FX_CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CHF", "AUD", "SEK", "NOK", "HKD", "MXN"]
+FIRST_DAY = "2015-01-01"
+
+
+class MarketData:
+    """Seeded daily series: every weekday from FIRST_DAY to today."""
+
+    def __init__(self, today=None, seed=0):
+        self.today = today or date.today().strftime("%Y-%m-%d")
+        self.seed = seed
+        self.days = [day.strftime("%Y-%m-%d") for day in np.arange(
+            np.datetime64(FIRST_DAY), np.datetime64(self.today) + 1, dtype="datetime64[D]"
+        ).astype(object) if day.weekday() < 5]
+        self._series = {}
+
+    def series(self, name, start_value, volatility=0.01):
+        """{date: value} of one named random walk."""
+        values = self._series.get(name)
+        if values is None:
+            rng = np.random.default_rng([self.seed, zlib.crc32(name.encode())])
+            walk = start_value * np.exp(np.cumsum(rng.normal(0.0, volatility, len(self.days))))
+            values = self._series[name] = dict(zip(self.days, np.round(walk, 6).tolist()))
+        return values
+
+    def between(self, name, start, end, start_value, volatility=0.01):
+        values = self.series(name, start_value, volatility)
+        return [(day, values[day]) for day in self.days if start <= day <= end]
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "FakeMarket/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload if payload is not None else {"error": status}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        server = self.server
+        with server.lock:
+            server.requests.append(url.path)
+            number = len(server.requests)
+        if server.latency:
+            time.sleep(server.latency)
+        if server.fail_every and number % server.fail_every == 0:
+            self._send(503, headers={"Retry-After": "0"})
+            return
+
+        data = server.data
+        if url.path == "/valet/observations/group/FX_RATES_DAILY/json":
+            start = params.get("start_date", FIRST_DAY)
+            end = params.get("end_date", data.today)
+            observations = {}
+            for i, currency in enumerate(FX_CURRENCIES):
+                for day, rate in data.between(f"FX{currency}CAD", start, end, 0.1 + i * 0.25, 0.004):
+                    observations.setdefault(day, {"d": day})[f"FX{currency}CAD"] = {"v": f"{rate:.4f}"}
+            self._send(200, {
+                "seriesDetail": {f"FX{currency}CAD": {"label": f"{currency}/CAD"} for currency in FX_CURRENCIES},
+                "observations": [observations[day] for day in sorted(observations)],
+            })
+        elif url.path.startswith("/v8/finance/chart/"):
+            symbol = url.path.rsplit("/", 1)[-1]
+            if symbol.startswith("MISSING"):
+                self._send(404, {"chart": {"result": None, "error": {"code": "Not Found"}}})
+                return
+            start = datetime.fromtimestamp(int(params.get("period1", 0)), tz=timezone.utc).strftime("%Y-%m-%d")
+            end = (datetime.fromtimestamp(int(params.get("period2", 0)), tz=timezone.utc) - timedelta(seconds=1)).strftime("%Y-%m-%d")
+            rows = data.between(symbol, start, end, 20 + zlib.crc32(symbol.encode()) % 300, 0.015)
+            timestamps = [int(datetime.strptime(day, "%Y-%m-%d").replace(hour=14, minute=30, tzinfo=timezone.utc).timestamp()) for day, _ in rows]
+            self._send(200, {"chart": {"result": [{
+                "meta": {"symbol": symbol, "currency": "CAD" if symbol.endswith(".TO") else "USD", "gmtoffset": -14400},
+                "timestamp": timestamps,
+                "indicators": {"quote": [{"close": [price for _, price in rows]}]},
+            }], "error": None}})
+        elif url.path == "/v1/cryptocurrency/quotes/latest":
+            if not self.headers.get("X-CMC_PRO_API_KEY"):
+                self._send(401)
+                return
+            quotes = {}
+            for symbol in filter(None, params.get("symbol", "").split(",")):
+                price = data.series(f"CRYPTO{symbol}", 100 + zlib.crc32(symbol.encode()) % 50000, 0.03)[data.days[-1]]
+                quotes[symbol] = {"symbol": symbol, "quote": {"CAD": {"price": price, "last_updated": f"{data.today}T12:00:00.000Z"}}}
+            self._send(200, {"status": {"error_code": 0}, "data": quotes})
+        else:
+            self._send(404)
+
+
+class FakeMarketServer(ThreadingHTTPServer):
+    """The stand-in on a background thread; use as a context manager or call start()/stop()."""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, today=None, latency=0.0, fail_every=0, seed=0, verbose=False):
+        super().__init__(("127.0.0.1", port), Handler)
+        self.data = MarketData(today, seed)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.requests = []
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def urls(self):
+        """The base URLs to hand to market_data.fetch_market_data."""
+        return {"boc": self.url + "/valet", "yahoo": self.url, "cmc": self.url}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--today", help="last day with data, YYYY-MM-DD (default: today)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with a 503")
+    args = parser.parse_args()
+
+    server = FakeMarketServer(args.port, args.today, args.latency, args.fail_every, verbose=True)
+    print(f"Serving fake market data up to {server.data.today} on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
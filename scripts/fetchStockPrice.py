@@ -139,14 +139,10 @@ def addHistoricalDataToDB(startDate = "2021-01-01"):
         print("No stock accounts found.")
         return
 
-    for stock in stockList:
-        print(f"Fetching historical data for {stock}...")
-        # Fetch historical data for the stock
-        data = get_stock_data(stock, startDate)
-        if data:
-            addDatatoDB(data, db)
-        else:
-            print(f"No historical data found for {stock}.")
+    print(f"Fetching missing historical data for {len(stockList)} stocks...")
+    # Only the gaps since startDate are fetched, the stored prices stay as they are;
+    # every stock is planned from one scan of the stored prices
+    db.populate_stocks_data(stockList, startDate)
 
 
 def runDaily():
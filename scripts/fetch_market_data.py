@@ -0,0 +1,108 @@
+"""Fetch new exchange rates and stock prices from every source at once.
+
+Replaces running fetchStockPrice.py, boc_fx_rates_daily.py and
+coinmarketcap.py one after the other: the sources are fetched concurrently,
+each only from the day after its last stored date, and written with one bulk
+upsert per source. See market_data.py for the details.
+
+Currencies, crypto currencies and symbols come from config/available_currency.txt,
+available_crypto.txt and available_stock.txt; the CoinMarketCap key from
+data/coinmarketcap_apikey.txt.
+
+With --backfill DATE the stored history is checked from DATE on and only
+its gaps are fetched: missing weekdays, less the holidays the other series
+of the same market show.
+
+usage: python scripts/fetch_market_data.py [--sources boc yahoo cmc] [--concurrency N] [--retries N]
+                                           [--today DATE] [--backfill DATE] [--fake]
+"""
+import os
+import sys
+import time
+import argparse
+
+# Get the current script's directory
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# Get the parent directory
+parent_dir = os.path.dirname(current_dir)
+# Add the parent directory to sys.path
+sys.path.append(parent_dir)
+# Now you can import modules from the parent directory
+import exchange_rates
+import stocks
+import market_data
+
+
+def loadList(basePath, name):
+    fpath = os.path.join(basePath, "config", f"{name}.txt")
+    if not os.path.exists(fpath):
+        return []
+    with open(fpath, "r") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def loadApiKey(basePath):
+    fpath = os.path.join(basePath, "data", "coinmarketcap_apikey.txt")
+    if not os.path.exists(fpath):
+        return None
+    with open(fpath, "r") as f:
+        return f.read().strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", nargs="+", choices=market_data.SOURCES, default=list(market_data.SOURCES))
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--retries", type=int, default=4, help="retries of a failed request")
+    parser.add_argument("--today", help="last date to fetch, YYYY-MM-DD (default: today)")
+    parser.add_argument("--backfill", metavar="DATE", help="fill every gap in the history since DATE, YYYY-MM-DD")
+    parser.add_argument("--base-path", default=parent_dir, help="directory holding config/, data/ and db/")
+    parser.add_argument("--fake", action="store_true", help="fetch from a local fake server instead of the real APIs")
+    args = parser.parse_args()
+
+    basePath = args.base_path
+    currencies = loadList(basePath, "available_currency")
+    cryptos = loadList(basePath, "available_crypto")
+    symbols = loadList(basePath, "available_stock")
+    print(f"{len(currencies)} currencies, {len(cryptos)} crypto currencies, {len(symbols)} symbols")
+
+    rate_db = exchange_rates.ExchangeRate(os.path.join(basePath, "db", "exchange_rates.db"))
+    stock_db = stocks.stockTicker(os.path.join(basePath, "db", "stock.db"))
+    api_key = loadApiKey(basePath)
+
+    server = None
+    urls = None
+    if args.fake:
+        from fake_market_server import FakeMarketServer
+        server = FakeMarketServer(today=args.today).start()
+        urls = server.urls
+        api_key = api_key or "fake"
+        print(f"Using the fake market server on {server.url}")
+
+    started = time.perf_counter()
+    try:
+        report = market_data.update_market_data(
+            rate_db, stock_db, currencies, cryptos, symbols,
+            sources=args.sources, today=args.today, backfill_from=args.backfill, concurrency=args.concurrency,
+            retries=args.retries, api_key=api_key, urls=urls,
+        )
+    finally:
+        if server is not None:
+            server.stop()
+
+    failed = False
+    for source in args.sources:
+        result = report[source]
+        if result["ranges"]:
+            print(f"{source}: {result['days']} missing weekdays in {result['ranges']} ranges")
+        if result["error"]:
+            failed = True
+            print(f"{source}: {result['rows']} rows stored, failed: {result['error']}")
+        else:
+            print(f"{source}: {result['rows']} rows stored in {result['seconds']:.2f}s")
+    print(f"{report['requests']} requests ({report['retries']} retries) in {time.perf_counter() - started:.2f}s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Generate a synthetic portfolio to benchmark the app at a chosen scale.
+
+Writes, under the target directory, the layout the app expects to find in
+its working directory:
+
+    db/finance.db          account_balances rows for every account
+    db/exchange_rates.db   a daily (weekday) rate to CAD for every currency
+    db/stock.db            a daily (weekday) price for every ticker
+    config/*.txt           currency, stock and account group lists
+
+Every series is a seeded random walk, so the same arguments always produce
+the same databases. The databases are created through the app's own classes
+and therefore use the current schema.
+
+usage: python scripts/synthetic_portfolio.py DIR [--accounts N] [--years N] [--tickers N] [--currencies N] [--seed N] [--ods FILE]
+"""
+import os
+import sys
+import io
+import argparse
+import contextlib
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Get the current script's directory
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# Get the parent directory
+parent_dir = os.path.dirname(current_dir)
+# Add the parent directory to sys.path
+sys.path.append(parent_dir)
+# Now you can import modules from the parent directory
+import exchange_rates
+import stocks
+from model import FinanceModel
+from db_connection import connection_manager
+
+
+# currencies added after CAD, in order; the crypto ones go to available_crypto
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CHF", "AUD", "BTC", "ETH", "SEK", "NOK", "HKD", "MXN"]
+CRYPTO = {"BTC", "ETH"}
+# rough CAD value of one unit, the random walks start there
+CAD_VALUE = {"USD": 1.35, "EUR": 1.47, "GBP": 1.7, "JPY": 0.0093, "CHF": 1.5, "AUD": 0.9,
+             "BTC": 60000.0, "ETH": 3000.0, "SEK": 0.13, "NOK": 0.13, "HKD": 0.17, "MXN": 0.08}
+
+GROUPS = ["operating", "investing", "crypto", "equity", "summary"]
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    """chdir into path for the duration of the block; the app resolves config/ and db/ from there."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def random_walk(rng, start, steps, volatility):
+    """A positive geometric random walk of the given length starting at start."""
+    returns = rng.normal(0.0, volatility, steps)
+    returns[0] = 0.0
+    return start * np.exp(np.cumsum(returns))
+
+
+def generate_balances(accounts=40, years=10, tickers=5, currencies=4, seed=0, end=None):
+    """Return the synthetic portfolio as DataFrames and config lists, without writing anything.
+
+    The result is a dict with "balances" (account_balances rows), "rates"
+    (exchange_rates rows), "prices" (stock_prices rows) and "config"
+    ({list name: items}).
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or date.today()).normalize()
+    start = end - pd.DateOffset(years=years)
+    weekdays = pd.bdate_range(start, end)
+
+    currency_list = ["CAD"] + CURRENCIES[:max(currencies - 1, 0)]
+    rates = []
+    for currency in currency_list[1:]:
+        volatility = 0.03 if currency in CRYPTO else 0.004
+        rates.append(pd.DataFrame({
+            "date": weekdays.strftime("%Y-%m-%d"),
+            "base_currency": currency,
+            "target_currency": "CAD",
+            "rate": random_walk(rng, CAD_VALUE[currency], len(weekdays), volatility),
+        }))
+    rates = pd.concat(rates, ignore_index=True) if rates else pd.DataFrame(columns=["date", "base_currency", "target_currency", "rate"])
+
+    fiat = [currency for currency in currency_list if currency not in CRYPTO]
+    symbols = [f"TK{i:03d}" for i in range(tickers)]
+    ticker_currency = {symbol: fiat[i % min(len(fiat), 2)] for i, symbol in enumerate(symbols)}
+    prices = []
+    for symbol in symbols:
+        prices.append(pd.DataFrame({
+            "date": weekdays.strftime("%Y-%m-%d"),
+            "symbol": symbol,
+            "currency": ticker_currency[symbol],
+            "price": random_walk(rng, rng.uniform(20, 400), len(weekdays), 0.015),
+        }))
+    prices = pd.concat(prices, ignore_index=True) if prices else pd.DataFrame(columns=["date", "symbol", "currency", "price"])
+
+    balances = []
+    groups = {name: [] for name in GROUPS}
+    names = [f"Account {i:03d}" for i in range(accounts)]
+    for i, name in enumerate(names):
+        # accounts open at different times and are updated every few days to a month
+        opened = start + pd.Timedelta(days=int(rng.integers(0, max((end - start).days // 2, 1))))
+        gaps = rng.integers(1, 31, size=(end - opened).days + 1)
+        offsets = np.cumsum(np.concatenate([[0], gaps]))
+        dates = opened + pd.to_timedelta(offsets[offsets <= (end - opened).days], unit="D")
+
+        if symbols and i % 4 == 3:
+            ticker = symbols[i % len(symbols)]
+            currency = ticker_currency[ticker]
+            amounts = np.round(np.cumsum(rng.integers(0, 5, len(dates))) + 1.0, 0)
+            group = "investing"
+        else:
+            ticker = ""
+            currency = currency_list[i % len(currency_list)]
+            amounts = np.round(random_walk(rng, rng.uniform(100, 50000), len(dates), 0.05) * (-1 if i % 9 == 5 else 1), 2)
+            group = "crypto" if currency in CRYPTO else ("equity" if i % 9 == 5 else "operating")
+            if currency in CRYPTO:
+                amounts = np.round(amounts / CAD_VALUE[currency], 6)
+
+        balances.append(pd.DataFrame({
+            "account_name": name,
+            "date": dates.strftime("%Y-%m-%d"),
+            "balance": amounts,
+            "currency": currency,
+            "ticker": ticker,
+        }))
+        groups[group].append(name)
+
+    groups["summary"] = names[::max(accounts // 8, 1)]
+    config = dict(groups)
+    config["ignoreForTotal"] = names[-1:] if accounts > 10 else []
+    config["available_currency"] = [currency for currency in currency_list if currency not in CRYPTO]
+    config["available_crypto"] = [currency for currency in currency_list if currency in CRYPTO]
+    config["available_stock"] = symbols
+
+    return {
+        "balances": pd.concat(balances, ignore_index=True),
+        "rates": rates,
+        "prices": prices,
+        "config": config,
+    }
+
+
+def write_portfolio(directory, portfolio):
+    """Write the config lists and the three databases of portfolio under directory."""
+    os.makedirs(os.path.join(directory, "config"), exist_ok=True)
+    os.makedirs(os.path.join(directory, "db"), exist_ok=True)
+    for name, items in portfolio["config"].items():
+        with open(os.path.join(directory, "config", f"{name}.txt"), "w") as file:
+            file.write("".join(f"{item}\n" for item in items))
+
+    for name in ("finance.db", "exchange_rates.db", "stock.db"):
+        for suffix in ("", "-wal", "-shm"):
+            path = os.path.join(directory, "db", name + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    with working_directory(directory), contextlib.redirect_stdout(io.StringIO()):
+        rates = exchange_rates.ExchangeRate()
+        with rates.get_db_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO exchange_rates (date, base_currency, target_currency, rate) VALUES (?, ?, ?, ?)",
+                portfolio["rates"].itertuples(index=False, name=None),
+            )
+            conn.commit()
+
+        prices = stocks.stockTicker()
+        with prices.get_db_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO stock_prices (date, symbol, currency, price) VALUES (?, ?, ?, ?)",
+                portfolio["prices"].itertuples(index=False, name=None),
+            )
+            conn.commit()
+
+        model = FinanceModel(use_cache=False)
+        model.add_balances(portfolio["balances"])
+
+    # the pooled connections point at files that are copied or removed next
+    connection_manager.close_all()
+
+
+def write_ods(path, balances, accounts=None):
+    """Write balances as an import workbook: one sheet per account, like the example data."""
+    if accounts is not None:
+        balances = balances[balances["account_name"].isin(accounts)]
+    with pd.ExcelWriter(path, engine="odf") as writer:
+        for i, (account, rows) in enumerate(balances.groupby("account_name", sort=False)):
+            sheet = rows.rename(columns={"account_name": "account"})
+            sheet.to_excel(writer, sheet_name=f"Sheet{i + 1}", index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="where to write db/ and config/")
+    parser.add_argument("--accounts", type=int, default=40)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--tickers", type=int, default=5)
+    parser.add_argument("--currencies", type=int, default=4, help="including CAD")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ods", help="also write the balances as an ODS workbook to this file")
+    args = parser.parse_args()
+
+    portfolio = generate_balances(args.accounts, args.years, args.tickers, args.currencies, args.seed)
+    write_portfolio(args.directory, portfolio)
+    if args.ods:
+        write_ods(args.ods, portfolio["balances"])
+
+    print(f"{len(portfolio['balances'])} balance rows, {len(portfolio['rates'])} rates, "
+          f"{len(portfolio['prices'])} prices written to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
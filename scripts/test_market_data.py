@@ -0,0 +1,147 @@
+"""Check market_data.py end to end against the local fake server.
+
+Runs the fetcher into temporary databases and checks that:
+- a cold fetch stores every weekday since DEFAULT_START;
+- a second run sends no request at all;
+- a weekend "today" sends no request;
+- a later "today" fetches only the new days;
+- 503s are retried;
+- a failing symbol does not stop the others;
+- a backfill fetches only the gaps, not the holidays all symbols share;
+- concurrent requests beat serial ones when the server is slow.
+
+usage: python scripts/test_market_data.py [--symbols N] [--latency S]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import io
+import contextlib
+
+# Get the current script's directory
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# Get the parent directory
+parent_dir = os.path.dirname(current_dir)
+# Add the parent directory to sys.path
+sys.path.append(parent_dir)
+# Now you can import modules from the parent directory
+import exchange_rates
+import stocks
+import market_data
+from db_connection import connection_manager
+from fake_market_server import FakeMarketServer, FX_CURRENCIES
+
+
+TODAY = "2024-06-14"
+CURRENCIES = ["CAD", "USD", "EUR"]
+CRYPTOS = ["BTC", "ETH"]
+
+failures = []
+
+
+def check(condition, message):
+    print(("ok    " if condition else "FAIL  ") + message)
+    if not condition:
+        failures.append(message)
+
+
+def open_dbs(directory):
+    with contextlib.redirect_stdout(io.StringIO()):
+        rate_db = exchange_rates.ExchangeRate(os.path.join(directory, "exchange_rates.db"))
+        stock_db = stocks.stockTicker(os.path.join(directory, "stock.db"))
+    return rate_db, stock_db
+
+
+def fetch(server, rate_db, stock_db, symbols, today, **kwargs):
+    return market_data.update_market_data(
+        rate_db, stock_db, CURRENCIES, CRYPTOS, symbols,
+        today=today, api_key="fake", urls=server.urls, backoff=0.01, **kwargs
+    )
+
+
+def count(db, table, where="", params=()):
+    with db.get_db_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} {where}", params).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per response in the timing check")
+    args = parser.parse_args()
+
+    symbols = [f"TK{i:03d}" for i in range(args.symbols)]
+    with tempfile.TemporaryDirectory() as tmp:
+        rate_db, stock_db = open_dbs(tmp)
+
+        with FakeMarketServer(today=TODAY) as server:
+            days = [day for day in server.data.days if day >= market_data.DEFAULT_START]
+
+            report = fetch(server, rate_db, stock_db, symbols, TODAY)
+            check(all(report[source]["error"] is None for source in market_data.SOURCES), "cold fetch has no errors")
+            check(count(stock_db, "stock_prices") == len(days) * len(symbols), f"cold fetch stored {len(days)} prices per symbol")
+            check(count(rate_db, "exchange_rates", "WHERE base_currency='USD'") == len(days), "cold fetch stored every USD/CAD day")
+            check(count(rate_db, "exchange_rates", "WHERE target_currency='CAD' AND date=? AND base_currency IN ('BTC', 'ETH')", (TODAY,)) == 2,
+                  "cold fetch stored today's crypto rates")
+            check(report["boc"]["rows"] == len(days) * len(FX_CURRENCIES), "the whole FX group is stored, like boc_fx_rates_daily.py does")
+            check(report["requests"] == len(symbols) + 2, f"one request per symbol plus one per rate source ({report['requests']})")
+
+            report = fetch(server, rate_db, stock_db, symbols, TODAY)
+            check(report["requests"] == 0, f"an up to date database sends no request ({report['requests']})")
+
+            report = fetch(server, rate_db, stock_db, symbols, "2024-06-16", sources=("boc", "yahoo"))
+            check(report["requests"] == 0, f"a weekend sends no rate or price request ({report['requests']})")
+
+        later = "2024-06-21"
+        with FakeMarketServer(today=later, fail_every=3) as server:
+            new_days = [day for day in server.data.days if TODAY < day <= later]
+            before = count(stock_db, "stock_prices")
+            report = fetch(server, rate_db, stock_db, symbols, later)
+            check(report["yahoo"]["rows"] == len(new_days) * len(symbols), f"a later day fetches only the {len(new_days)} new days")
+            check(count(stock_db, "stock_prices") == before + len(new_days) * len(symbols), "the new days are added to the stored ones")
+            check(report["retries"] > 0 and all(report[source]["error"] is None for source in market_data.SOURCES),
+                  f"503s are retried ({report['retries']} retries)")
+            check(stock_db.get_price(new_days[-1], "TK000") is not None, "the latest price is stored")
+
+        with FakeMarketServer(today="2024-06-24") as server:
+            report = fetch(server, rate_db, stock_db, symbols + ["MISSING"], "2024-06-24")
+            check(report["yahoo"]["error"] is not None and "MISSING" in report["yahoo"]["error"], "a failing symbol is reported")
+            check(report["yahoo"]["rows"] == len(symbols), "the other symbols are still stored")
+
+        # a gap in one symbol, a single day of another and a "holiday" missing from every symbol
+        with stock_db.get_db_connection() as conn:
+            conn.execute("DELETE FROM stock_prices WHERE symbol='TK001' AND date BETWEEN '2023-03-01' AND '2023-03-10'")
+            conn.execute("DELETE FROM stock_prices WHERE symbol='TK002' AND date='2023-07-05'")
+            conn.execute("DELETE FROM stock_prices WHERE date='2023-07-04'")
+            conn.commit()
+        with FakeMarketServer(today="2024-06-24") as server:
+            before = count(stock_db, "stock_prices")
+            report = fetch(server, rate_db, stock_db, symbols, "2024-06-24", backfill_from=market_data.DEFAULT_START)
+            check(report["yahoo"]["ranges"] == 2 and report["yahoo"]["days"] == 9, f"backfill plans the two gaps only ({report['yahoo']['ranges']} ranges, {report['yahoo']['days']} days)")
+            check(report["requests"] == 2, f"backfill sends one request per gap ({report['requests']})")
+            check(count(stock_db, "stock_prices") == before + 9, "backfill stores the missing days")
+            check(count(stock_db, "stock_prices", "WHERE date='2023-07-04'") == 0, "the shared holiday is not fetched")
+        connection_manager.close_all()
+
+    timings = {}
+    for concurrency in (1, 8):
+        with tempfile.TemporaryDirectory() as tmp, FakeMarketServer(today=TODAY, latency=args.latency) as server:
+            rate_db, stock_db = open_dbs(tmp)
+            started = time.perf_counter()
+            fetch(server, rate_db, stock_db, symbols, TODAY, concurrency=concurrency)
+            timings[concurrency] = time.perf_counter() - started
+            connection_manager.close_all()
+    print(f"\n{len(symbols)} symbols at {args.latency * 1000:.0f} ms per response: "
+          f"serial {timings[1]:.2f}s, 8 at once {timings[8]:.2f}s ({timings[1] / timings[8]:.1f}x)")
+    check(timings[8] < timings[1], "concurrent fetching is faster than serial")
+
+    if failures:
+        print(f"\n{len(failures)} checks failed")
+        sys.exit(1)
+    print("\nAll checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
+import os
 import pandas as pd
 import sys
 import re
 from datetime import datetime
 
+# Get the current script's directory
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# Get the parent directory
+parent_dir = os.path.dirname(current_dir)
+# Add the parent directory to sys.path
+sys.path.append(parent_dir)
+# Now you can import modules from the parent directory
+import ods_reader
+
 def clean_balance(balance):
     # Remove $ and commas, keep only numbers, dot, and minus
     if isinstance(balance, str):
@@ -14,7 +24,7 @@ def clean_balance(balance):
         return None
 
 def test_import_from_ods(ods_file):
-    sheets = pd.read_excel(ods_file, sheet_name=None, engine="odf")
+    sheets = ods_reader.read_sheets(ods_file)
     added = []
     skipped = []
 
@@ -0,0 +1,381 @@
+"""Columnar helpers used by FinanceModel.load_data.
+
+Balances are pivoted into a (date x series) matrix where every column is one
+(account, currency, ticker) series. Extending to today, interpolating, merging
+currencies and building the group totals then run as whole-array operations
+instead of per-date dictionary scans.
+"""
+from collections.abc import Mapping
+from itertools import compress
+
+import numpy as np
+import pandas as pd
+
+
+SERIES_KEYS = ["account_name", "currency", "ticker"]
+
+# spacing of the synthetic dates added between the first and last known date;
+# one day, so the base matrix is the daily level of the pyramid below
+INTERVAL_DAYS = 1
+
+# the resolutions a view can be drawn at, finest first, with the average number
+# of days one point stands for
+LEVELS = {
+    "daily": 1.0,
+    "weekly": 7.0,
+    "monthly": 30.44,
+    "quarterly": 91.31,
+}
+
+
+def nanoseconds(dates):
+    """Integer nanoseconds since the epoch, whatever the unit of the datetime64 dtype."""
+    return pd.DatetimeIndex(dates).as_unit("ns").asi8
+
+
+def pivot_balances(df):
+    """Pivot long balance rows into a date x (account, currency, ticker) frame."""
+    df = df.drop_duplicates(subset=SERIES_KEYS + ["date"], keep="last")
+    return df.pivot(index="date", columns=SERIES_KEYS, values="balance").sort_index()
+
+
+def build_axis(dates, time_now, interval_days=INTERVAL_DAYS):
+    """Return the sorted union of the known dates, today and the synthetic grid."""
+    dates = pd.DatetimeIndex(dates).append(pd.DatetimeIndex([time_now]))
+    grid = pd.date_range(dates.min(), dates.max(), freq=f"{interval_days}D")
+    return dates.append(grid).unique().sort_values()
+
+
+def fill_series(raw, dates, time_now):
+    """Evaluate every raw series on the given dates.
+
+    Each series is extended to today with its latest balance. It only gets
+    values from its first known date up to today, linearly interpolated in time
+    between the surrounding known balances; after today only its own entries
+    are kept and nothing is back-filled before the first entry. The result
+    does not depend on which other dates are requested, so any subset of the
+    axis can be evaluated on its own.
+    """
+    x = nanoseconds(dates).astype(float)
+    now = float(pd.Timestamp(time_now).value)
+    raw_x = nanoseconds(raw.index).astype(float)
+    data = raw.to_numpy(dtype=float)
+
+    values = np.full((len(x), data.shape[1]), np.nan)
+    for j in range(data.shape[1]):
+        known = ~np.isnan(data[:, j])
+        if not known.any():
+            continue
+        xk = raw_x[known]
+        yk = data[known, j]
+
+        # carry the latest balance forward to today
+        pos = np.searchsorted(xk, now)
+        if pos < len(xk) and xk[pos] == now:
+            yk = yk.copy()
+            yk[pos] = yk[-1]
+        else:
+            xk = np.insert(xk, pos, now)
+            yk = np.insert(yk, pos, yk[-1])
+
+        col = np.interp(x, xk, yk)
+        col[x < xk[0]] = np.nan
+        future = x > now
+        col[future & ~np.isin(x, xk)] = np.nan
+        values[:, j] = col
+
+    return values
+
+
+def convert_series(values, columns, prices, rates):
+    """Price every column of values (dates x columns) and convert it to CAD in place.
+
+    prices maps a ticker to its price multiplier per date (1 where no price is
+    known) and rates a currency other than CAD to its CAD rate per date (NaN
+    where none is known). Amounts without a rate are moved to a separate
+    passthrough matrix, returned as None when there are none.
+    """
+    passthrough = None
+    for j, (account_name, currency, ticker) in enumerate(columns):
+        if ticker:
+            values[:, j] *= prices[ticker]
+        if currency == "CAD":
+            continue
+
+        rate = rates[currency]
+        missing = np.isnan(rate) & ~np.isnan(values[:, j])
+        if missing.any():
+            if passthrough is None:
+                passthrough = np.zeros_like(values)
+            passthrough[missing, j] = values[missing, j]
+        values[:, j] = np.where(missing, 0.0, values[:, j] * rate)
+    return values, passthrough
+
+
+def sorted_series(rows):
+    """Turn ``(date, value)`` rows into sorted datetime64 and float arrays."""
+    if not rows:
+        return np.array([], dtype="datetime64[ns]"), np.array([], dtype=float)
+    dates, values = zip(*rows)
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce").to_numpy(dtype="datetime64[ns]")
+    values = np.array(values, dtype=float)
+    keep = ~np.isnat(dates)
+    order = np.argsort(dates[keep], kind="stable")
+    return dates[keep][order], values[keep][order]
+
+
+def nearest_values(series_dates, series_values, dates):
+    """Resolve the value on or before each date, else the first one after it.
+
+    ``series_dates`` must be sorted. Returns NaN for every date when the series
+    is empty, mirroring the ``ORDER BY date DESC LIMIT 1`` lookups with their
+    ascending fallback.
+    """
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    if not len(series_dates):
+        return np.full(len(dates), np.nan)
+    positions = np.searchsorted(series_dates, dates, side="right") - 1
+    return np.asarray(series_values, dtype=float)[np.maximum(positions, 0)]
+
+
+def period_ids(axis, level):
+    """An integer per axis date that is the same for every date in one period of the level."""
+    days = np.asarray(axis, dtype="datetime64[D]")
+    if level == "daily":
+        return days.astype(np.int64)
+    if level == "weekly":
+        # weeks run Monday to Sunday; day 0, 1970-01-01, was a Thursday
+        return (days.astype(np.int64) + 3) // 7
+    months = days.astype("datetime64[M]").astype(np.int64)
+    return months if level == "monthly" else months // 3
+
+
+def resample_last(axis, matrix, level):
+    """Return the (dates, matrix) of the last present value of every column in each period.
+
+    The date of a period is the last axis date in it, so the current period
+    ends today rather than at its calendar end. A column without a value in
+    a period is NaN there.
+    """
+    if not len(axis):
+        return axis, matrix
+    ids = period_ids(axis, level)
+    ends = np.append(np.flatnonzero(ids[1:] != ids[:-1]), len(axis) - 1)
+    starts = np.insert(ends[:-1] + 1, 0, 0)
+
+    # the row of each column's last present value up to every period end
+    present = ~np.isnan(matrix)
+    rows = np.arange(len(axis), dtype=np.int32)[:, None]
+    previous = np.maximum.accumulate(np.where(present, rows, -1), axis=0)[ends]
+    columns = np.arange(matrix.shape[1])
+    values = np.where(previous >= starts[:, None], matrix[np.maximum(previous, 0), columns], np.nan)
+    return axis[ends], values
+
+
+def choose_level(start, end, max_points):
+    """The finest level that shows start..end with at most max_points points per line."""
+    days = max((pd.Timestamp(end) - pd.Timestamp(start)).days, 1)
+    for name, period_days in LEVELS.items():
+        if days / period_days <= max_points:
+            return name
+    return name
+
+
+def merge_accounts(values, columns, axis):
+    """Sum the currency/ticker series of each account into one column per account.
+
+    A date is present for an account when at least one of its series has a
+    value on that date.
+    """
+    frame = pd.DataFrame(values, index=axis, columns=columns)
+    return frame.T.groupby(level=0, sort=False).sum(min_count=1).T
+
+
+def membership_matrix(accounts, groups):
+    """Return the account x group 0/1 matrix of groups, a list of (name, members).
+
+    A member that names an earlier group stands for that group's accounts, so
+    a custom group can be built from categories. Members that are neither
+    accounts nor earlier groups are ignored.
+    """
+    positions = {account: i for i, account in enumerate(accounts)}
+    membership = np.zeros((len(accounts), len(groups)))
+    rows = {}
+    for j, (name, members) in enumerate(groups):
+        for member in members:
+            if member in positions:
+                membership[positions[member], j] = 1.0
+            elif member in rows:
+                np.maximum(membership[:, j], membership[:, rows[member]], out=membership[:, j])
+        rows.setdefault(name, j)
+    return membership
+
+
+def group_totals(values, membership):
+    """Every group total as one matrix multiply: (dates x accounts) @ (accounts x groups).
+
+    A total is NaN on the dates none of its members has a value, like a pandas
+    sum with min_count=1. Returns the totals and a per-group flag of whether
+    anything contributes at all.
+    """
+    present = ~np.isnan(values)
+    totals = np.where(present, values, 0.0) @ membership
+    counts = present.astype(membership.dtype) @ membership
+    totals[counts == 0] = np.nan
+    return totals, (counts > 0).any(axis=0)
+
+
+class AccountSeries(Mapping):
+    """Read-only ``{account: {date: balance}}`` view over a date x account matrix.
+
+    The per-account dicts are only built, and then kept, when an account is
+    looked up, so swapping in a new matrix costs nothing until it is drawn.
+    """
+
+    def __init__(self, axis, values, names):
+        self.axis = axis
+        self.matrix = values
+        self._positions = {name: j for j, name in enumerate(names)}
+        self._dicts = {}
+        self._arrays = {}
+        self._stamps = None
+        self._index = None
+        self._levels = {}
+
+    def __getitem__(self, name):
+        if name not in self._dicts:
+            if self._stamps is None:
+                self._stamps = list(self.axis)
+            dates, values = self._present(self._positions[name])
+            self._dicts[name] = dict(zip(compress(self._stamps, dates), values.tolist()))
+        return self._dicts[name]
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def _present(self, j):
+        column = self.matrix[:, j]
+        mask = ~np.isnan(column)
+        return mask, column[mask]
+
+    def arrays(self, name):
+        """Return the sorted datetime64 dates and balances of one account, without gaps."""
+        if name not in self._arrays:
+            mask, values = self._present(self._positions[name])
+            self._arrays[name] = (self.axis.values[mask], values)
+        return self._arrays[name]
+
+    def between(self, names, start=None, end=None):
+        """Return [(name, dates, balances)] of the named accounts with data between start and end.
+
+        Each account's sorted arrays are sliced with a binary search; start and
+        end are inclusive and None leaves that side open. Accounts without
+        data in the window are left out.
+        """
+        start = np.datetime64(start) if start is not None else None
+        end = np.datetime64(end) if end is not None else None
+        series = []
+        for name in names:
+            if name not in self._positions:
+                continue
+            dates, balances = self.arrays(name)
+            lo = np.searchsorted(dates, start, side="left") if start is not None else 0
+            hi = np.searchsorted(dates, end, side="right") if end is not None else len(dates)
+            if lo < hi:
+                series.append((name, dates[lo:hi], balances[lo:hi]))
+        return series
+
+    def level(self, name):
+        """The view at one level of LEVELS, built on first use and kept.
+
+        "daily" is the view itself, its axis already has a row per day.
+        """
+        if name == "daily":
+            return self
+        if name not in self._levels:
+            axis, values = resample_last(self.axis, self.matrix, name)
+            self._levels[name] = AccountSeries(axis, values, list(self._positions))
+        return self._levels[name]
+
+    def _point_index(self):
+        if self._index is None:
+            self._index = PointInTimeIndex(self.axis, self.matrix)
+        return self._index
+
+    def _columns(self, names):
+        return np.array([self._positions.get(name, -1) for name in names], dtype=int)
+
+    def balances_at(self, date, names):
+        """Return the balance of every named account at date, as one array.
+
+        Balances between two known dates are interpolated linearly, the last
+        known balance is carried forward and accounts that do not exist yet
+        (or at all) are 0.
+        """
+        columns = self._columns(names)
+        balances = np.zeros(len(columns))
+        known = columns >= 0
+        balances[known] = self._point_index().at(date, columns[known])
+        return balances
+
+    def balances_asof(self, date, names):
+        """Return the last known balance on or before date of every named account, NaN if none."""
+        columns = self._columns(names)
+        balances = np.full(len(columns), np.nan)
+        known = columns >= 0
+        balances[known] = self._point_index().asof(date, columns[known])
+        return balances
+
+
+class PointInTimeIndex:
+    """Answers "balance at date D" for many columns of a date x account matrix at once.
+
+    For every axis row it stores, per column, the row of the previous and of
+    the next present value, so a lookup is one searchsorted plus fancy
+    indexing instead of a scan over each account's dates.
+    """
+
+    def __init__(self, axis, matrix):
+        self.x = nanoseconds(axis)
+        self.matrix = matrix
+        present = ~np.isnan(matrix)
+        rows = np.arange(len(self.x))[:, None]
+        self.previous = np.maximum.accumulate(np.where(present, rows, -1), axis=0)
+        following = np.where(present, rows, len(self.x))
+        self.following = np.minimum.accumulate(following[::-1], axis=0)[::-1]
+
+    def asof(self, date, columns):
+        """Values of the given columns at their last present row on or before date, NaN if none."""
+        row = np.searchsorted(self.x, pd.Timestamp(date).value, side="right") - 1
+        if row < 0:
+            return np.full(len(columns), np.nan)
+        prev = self.previous[row, columns]
+        return np.where(prev >= 0, self.matrix[np.maximum(prev, 0), columns], np.nan)
+
+    def at(self, date, columns):
+        """Interpolated values of the given columns at date; 0 before a column's first value."""
+        t = pd.Timestamp(date).value
+        n = len(self.x)
+        result = np.zeros(len(columns))
+        row = np.searchsorted(self.x, t, side="right") - 1
+        if row < 0 or not n:
+            return result
+
+        prev = self.previous[row, columns]
+        nxt = self.following[row + 1, columns] if row + 1 < n else np.full(len(columns), n)
+
+        has_prev = prev >= 0
+        carry = has_prev & (nxt >= n)
+        result[carry] = self.matrix[prev[carry], columns[carry]]
+
+        between = has_prev & (nxt < n)
+        p, q, c = prev[between], nxt[between], columns[between]
+        weight = (t - self.x[p]) / (self.x[q] - self.x[p])
+        result[between] = self.matrix[p, c] + (self.matrix[q, c] - self.matrix[p, c]) * weight
+        return result
@@ -0,0 +1,186 @@
+"""Run the per-series part of load_data on several cores.
+
+Every (account, currency, ticker) column is interpolated, priced and
+converted to CAD on its own: it only needs its raw balances, the price of
+its ticker and the rate of its currency. A SeriesPool splits the columns
+into blocks and runs them on one of three executors:
+
+* ``serial``: in the calling thread, the default;
+* ``thread``: a thread pool. It only helps where numpy does the work with
+  the GIL released, i.e. long series;
+* ``process``: a process pool, for portfolios with thousands of series. The
+  model resolves the prices and rates on the axis once; they are copied into
+  one shared memory block, and the result matrices are shared memory as
+  well. A task only carries its raw block and the names of the blocks, and
+  the worker writes its columns in place, so no matrix is pickled.
+
+The result is the same whatever the executor. Below
+MIN_BLOCK_COLUMNS columns per worker the pool runs serially, as starting
+the tasks would cost more than it saves. NET_WORTH_EXECUTOR and
+NET_WORTH_WORKERS set the defaults without code changes.
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import series_engine
+from instrumentation import recorder
+
+
+EXECUTORS = ("serial", "thread", "process")
+
+# fewer columns than this per worker are processed serially
+MIN_BLOCK_COLUMNS = 64
+
+# blocks per worker, so a worker that drew short series picks up more
+BLOCKS_PER_WORKER = 4
+
+# started pools by (executor, workers), shared by every SeriesPool as starting one is slow
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def default_executor():
+    return os.environ.get("NET_WORTH_EXECUTOR", "serial")
+
+
+def default_workers():
+    return int(os.environ.get("NET_WORTH_WORKERS", 0)) or os.cpu_count() or 1
+
+
+def _get_pool(executor, workers):
+    # spawned rather than forked, the app has Qt and database threads running
+    with _pools_lock:
+        pool = _pools.get((executor, workers))
+        if pool is None:
+            if executor == "thread":
+                pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="series")
+            else:
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[executor, workers] = pool
+        return pool
+
+
+def shutdown():
+    """Stop every pool a SeriesPool started; the next run starts new ones."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def process_block(raw, dates, time_now, prices, rates):
+    """Interpolate, price and convert one block of raw columns; returns (values, passthrough).
+
+    The interpolate and convert spans are recorded in the process running the
+    block, so a process pool's are not in the caller's trace.
+    """
+    with recorder.span("interpolate"):
+        values = series_engine.fill_series(raw, dates, time_now)
+    with recorder.span("convert"):
+        return series_engine.convert_series(values, raw.columns, prices, rates)
+
+
+def _write(name, shape, start, data):
+    # spawned workers share the parent's resource tracker, the parent alone unlinks the blocks
+    block = shared_memory.SharedMemory(name=name)
+    out = np.ndarray(shape, dtype=float, buffer=block.buf)
+    out[:, start:start + data.shape[1]] = data
+    del out
+    block.close()
+
+
+def _shared_block(raw, dates, time_now, start, factors, keys, values, passthrough):
+    """Process worker: run process_block on raw and write it into the shared results at column start."""
+    block = shared_memory.SharedMemory(name=factors[0])
+    table = np.ndarray(factors[1], dtype=float, buffer=block.buf)
+    row = {key: i for i, key in enumerate(keys)}
+    prices = {ticker: table[row["price", ticker]] for ticker in {t for _, _, t in raw.columns if t}}
+    rates = {currency: table[row["rate", currency]] for currency in {c for _, c, _ in raw.columns if c != "CAD"}}
+    try:
+        block_values, block_passthrough = process_block(raw, dates, time_now, prices, rates)
+    finally:
+        # the views must go before the block can be closed
+        del table, prices, rates
+        block.close()
+
+    _write(*values, start, block_values)
+    if block_passthrough is None:
+        return False
+    _write(*passthrough, start, block_passthrough)
+    return True
+
+
+class SeriesPool:
+    def __init__(self, executor=None, workers=None):
+        self.executor = executor or default_executor()
+        if self.executor not in EXECUTORS:
+            raise ValueError(f"executor must be one of {', '.join(EXECUTORS)}, not {self.executor!r}")
+        self.workers = workers or default_workers()
+
+    def _blocks(self, count):
+        """Column ranges (start, stop) of the blocks, or None when the columns are too few to split."""
+        if self.executor == "serial" or self.workers < 2 or count < 2 * MIN_BLOCK_COLUMNS:
+            return None
+        number = min(self.workers * BLOCKS_PER_WORKER, count // MIN_BLOCK_COLUMNS)
+        bounds = np.linspace(0, count, number + 1).astype(int)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def run(self, raw, dates, time_now, prices, rates):
+        """process_block over every column of raw, split across the pool; returns (values, passthrough)."""
+        blocks = self._blocks(raw.shape[1])
+        if blocks is None:
+            return process_block(raw, dates, time_now, prices, rates)
+
+        recorder.count(f"series_pool.{self.executor}_blocks", len(blocks))
+        if self.executor == "thread":
+            return self._run_threads(raw, dates, time_now, prices, rates, blocks)
+        return self._run_processes(raw, dates, time_now, prices, rates, blocks)
+
+    def _run_threads(self, raw, dates, time_now, prices, rates, blocks):
+        pool = _get_pool(self.executor, self.workers)
+        futures = [pool.submit(process_block, raw.iloc[:, start:stop], dates, time_now, prices, rates) for start, stop in blocks]
+        results = [future.result() for future in futures]
+        values = np.hstack([block_values for block_values, _ in results])
+        if all(block_passthrough is None for _, block_passthrough in results):
+            return values, None
+        passthrough = np.hstack([
+            np.zeros_like(block_values) if block_passthrough is None else block_passthrough
+            for block_values, block_passthrough in results
+        ])
+        return values, passthrough
+
+    def _run_processes(self, raw, dates, time_now, prices, rates, blocks):
+        keys = [("price", ticker) for ticker in prices] + [("rate", currency) for currency in rates]
+        shapes = {"factors": (len(keys), len(dates)), "values": (len(dates), raw.shape[1]), "passthrough": (len(dates), raw.shape[1])}
+        shared = {}
+        arrays = {}
+        try:
+            for name, shape in shapes.items():
+                shared[name] = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)), 1) * 8)
+                arrays[name] = np.ndarray(shape, dtype=float, buffer=shared[name].buf)
+                arrays[name].fill(0.0)
+            for i, (kind, key) in enumerate(keys):
+                arrays["factors"][i] = prices[key] if kind == "price" else rates[key]
+
+            pool = _get_pool(self.executor, self.workers)
+            futures = [
+                pool.submit(
+                    _shared_block, raw.iloc[:, start:stop], dates, time_now, start,
+                    (shared["factors"].name, shapes["factors"]), keys,
+                    (shared["values"].name, shapes["values"]), (shared["passthrough"].name, shapes["passthrough"]),
+                )
+                for start, stop in blocks
+            ]
+            has_passthrough = any([future.result() for future in futures])
+            return arrays["values"].copy(), arrays["passthrough"].copy() if has_passthrough else None
+        finally:
+            arrays.clear()
+            for block in shared.values():
+                block.close()
+                block.unlink()
@@ -1,7 +1,10 @@
-import sqlite3
-from datetime import datetime
-import yfinance as yf
+from datetime import datetime, timedelta
 import os
+import math
+from db_connection import connection_manager
+import db_schema
+import backfill
+from instrumentation import recorder
 
 class stockTicker:
     def __init__(self, db_file="db/stock.db"):
@@ -10,59 +13,86 @@ class stockTicker:
 
         self.stockList = self.loadStockList()
 
+    def get_db_connection(self):
+        """Context manager yielding the shared, long-lived connection for this database."""
+        return connection_manager.connection(self.db_file)
+
     def _initialize_db(self):
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS stock_prices (
-                date TEXT,
-                symbol TEXT,
-                currency TEXT,
-                price REAL,
-                PRIMARY KEY (date, symbol)
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        with self.get_db_connection() as conn:
+            db_schema.migrate_stock_prices(conn)
 
     def add_price(self, date, symbol, currency, price):
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO stock_prices (date, symbol, currency, price)
-            VALUES (?, ?, ?, ?)
-        ''', (date, symbol, currency, price))
-        conn.commit()
-        conn.close()
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO stock_prices (date, symbol, currency, price)
+                VALUES (?, ?, ?, ?)
+            ''', (date, symbol, currency, price))
+            conn.commit()
+
+    def add_prices(self, rows):
+        """Upsert many (date, symbol, currency, price) rows in one transaction."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        with self.get_db_connection() as conn:
+            with conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO stock_prices (date, symbol, currency, price)
+                    VALUES (?, ?, ?, ?)
+                ''', rows)
+        return len(rows)
+
+    def get_last_dates(self):
+        """Return {symbol: last stored date} for every symbol."""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT symbol, MAX(date) FROM stock_prices
+                GROUP BY symbol
+            ''')
+            return dict(cursor.fetchall())
+
+    def get_coverage(self):
+        """Return ({symbol: stored dates, oldest first}, {symbol: currency}) for every symbol."""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT symbol, date, currency FROM stock_prices
+                ORDER BY symbol, date
+            ''')
+            rows = cursor.fetchall()
+        coverage = {}
+        currencies = {}
+        for symbol, date, currency in rows:
+            coverage.setdefault(symbol, []).append(date)
+            currencies[symbol] = currency
+        return coverage, currencies
 
     def get_price(self, date, symbol):
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT price FROM stock_prices
-            WHERE date=? AND symbol=?
-        ''', (date, symbol))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT price FROM stock_prices
+                WHERE date=? AND symbol=?
+            ''', (date, symbol))
+            row = cursor.fetchone()
         if row:
             return row[0]
         return None
 
     def get_nearest_price(self, date, symbol):
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT price FROM stock_prices
-            WHERE date <= ? AND symbol=?
-            ORDER BY date DESC
-            LIMIT 1
-        ''', (date, symbol))
-        row = cursor.fetchone()
-        if row:
-            conn.close()
-            return row[0]
-        else:
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT price FROM stock_prices
+                WHERE date <= ? AND symbol=?
+                ORDER BY date DESC
+                LIMIT 1
+            ''', (date, symbol))
+            row = cursor.fetchone()
+            if row:
+                return row[0]
             # If no price found try searching for the next available date
             cursor.execute('''
                 SELECT price FROM stock_prices
@@ -71,29 +101,69 @@ class stockTicker:
                 LIMIT 1
             ''', (date, symbol))
             row = cursor.fetchone()
-            conn.close()
             if row:
                 return row[0]
         #if no price found return None
-        print(f"No stock price found for {symbol} on or around {date}.")
+        recorder.warn("missing_price", f"No stock price found for {symbol} on or around {date}.")
         return None
 
-    def populate_stock_data(self, symbol, startDate):
+    def get_price_history(self, symbol):
+        """Return every stored (date, price) row for a symbol, oldest first."""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT date, price FROM stock_prices
+                WHERE symbol=?
+                ORDER BY date
+            ''', (symbol,))
+            return cursor.fetchall()
+
+    def populate_stock_data(self, symbol, startDate, endDate=None):
+        """Fetch and store the prices of symbol that are missing between startDate and endDate (default today)."""
+        return self.populate_stocks_data([symbol], startDate, endDate)[symbol]
+
+    def populate_stocks_data(self, symbols, startDate, endDate=None):
+        """populate_stock_data for several symbols, planned together from one scan of the stored prices.
+
+        Returns {symbol: number of prices added}.
+        """
+        endDate = endDate or datetime.now().strftime('%Y-%m-%d')
+        coverage, currencies = self.get_coverage()
+        plans = backfill.plan(coverage, symbols, startDate, endDate, groups=currencies)
+
+        added = {}
+        for symbol in symbols:
+            ranges = plans.get(symbol, [])
+            if not ranges:
+                print(f"No missing stock prices for {symbol} since {startDate}")
+                added[symbol] = 0
+            else:
+                added[symbol] = self._fetch_missing_prices(symbol, ranges, set(coverage.get(symbol, ())))
+        return added
+
+    def _fetch_missing_prices(self, symbol, ranges, stored):
+        """Fetch the (first, last) date ranges of symbol with yfinance and store the prices not in stored."""
+        # yfinance is only needed to fetch prices, keep it out of the app's startup
+        import yfinance as yf
         ticker = yf.Ticker(symbol)
         info = ticker.info
         currency = info.get('currency', 'USD')
-        hist = ticker.history(start=startDate)
-        for date, row in hist.iterrows():
-            date_str = date.strftime('%Y-%m-%d')
-            price = row['Close']
-            if price is not None:
-                #stock_db.add_price(date_str, symbol, 'USD', price)
-                self.add_price(date_str, symbol, currency, price)
-                print(f"Added stock price for {symbol} in {currency} on {date_str}: {price}")
-                
-            else:
-                print(f"No price data for {symbol} on {date_str}")
+        rows = []
+        for first, last in ranges:
+            # history's end date is exclusive
+            end = (datetime.strptime(last, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+            hist = ticker.history(start=first, end=end)
+            for date, row in hist.iterrows():
+                date_str = date.strftime('%Y-%m-%d')
+                price = row['Close']
+                if price is None or math.isnan(price):
+                    print(f"No price data for {symbol} on {date_str}")
+                elif date_str not in stored:
+                    rows.append((date_str, symbol, currency, float(price)))
 
+        self.add_prices(rows)
+        print(f"Added {len(rows)} stock prices for {symbol} in {currency} from {len(ranges)} missing ranges")
+        return len(rows)
 
     def loadStockList(self):
         fpath = "config/stock.txt"
@@ -113,6 +183,7 @@ class stockTicker:
 
 
 def fetch_stock_price(symbol, date):
+    import yfinance as yf
     ticker = yf.Ticker(symbol)
     hist = ticker.history(start=date)
 
@@ -151,6 +222,7 @@ def fetch_stock_price(symbol, date):
 
 
 def test(symbol, date):
+    import yfinance as yf
     ticker = yf.Ticker(symbol)
     hist = ticker.history(start=date)
 
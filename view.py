@@ -1,10 +1,13 @@
-from PyQt6.QtWidgets import (QSplitter, QTextEdit, QDateEdit, QWidget, QVBoxLayout, QHBoxLayout, QFrame, QScrollArea, QCheckBox, QLabel, QPushButton, QComboBox)
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from PyQt6.QtWidgets import (QSplitter, QTextEdit, QDateEdit, QWidget, QVBoxLayout, QHBoxLayout, QFrame, QScrollArea, QCheckBox, QLabel, QPushButton, QComboBox, QProgressBar)
 from PyQt6.QtCore import Qt
 
 from datetime import datetime, timedelta
 
 
+# date edits emit a change per keystroke or wheel step; redraw once they pause
+DATE_DEBOUNCE_MS = 250
+
+
 class FinanceView(QWidget):
     def __init__(self, controller, parent=None):
         super().__init__(parent)
@@ -56,7 +59,7 @@ class FinanceView(QWidget):
         self.timeframe_layout.addWidget(self.time_filter_label)
         self.time_filter_var = QComboBox(self.topleft)
         self.time_filter_var.addItems(["All Data", "Last Year", "Last 6 Months", "Last 3 Months", "Last Month", "Custom"])
-        self.time_filter_var.currentIndexChanged.connect(self.controller.plot_net_worth)
+        self.time_filter_var.currentIndexChanged.connect(self.controller.schedule_net_worth)
         self.timeframe_layout.addWidget(self.time_filter_var)
 
         # Custom date input
@@ -73,7 +76,7 @@ class FinanceView(QWidget):
         
         self.start_date_var.setVisible(False)
 
-        self.start_date_var.dateChanged.connect(self.controller.plot_net_worth)
+        self.start_date_var.dateChanged.connect(lambda date: self.controller.schedule_net_worth(delay_ms=DATE_DEBOUNCE_MS))
         #self.start_date_var.clicked.connect(lambda: self.date_picker(0))
 
         self.end_date_var = QDateEdit()
@@ -84,7 +87,7 @@ class FinanceView(QWidget):
 
         self.end_date_var.setVisible(False)
 
-        self.end_date_var.dateChanged.connect(self.controller.plot_net_worth)
+        self.end_date_var.dateChanged.connect(lambda date: self.controller.schedule_net_worth(delay_ms=DATE_DEBOUNCE_MS))
 
         # Create a horizontal layout to hold the start and end date buttons
         hbox = QHBoxLayout()
@@ -153,6 +156,22 @@ class FinanceView(QWidget):
 
         self.account_layout.addWidget(self.import_frame)
 
+        # Progress of background imports and reloads
+        self.progress_frame = QFrame()
+        self.progress_frame.setFrameShape(QFrame.Shape.StyledPanel)
+        self.progress_layout = QHBoxLayout(self.progress_frame)
+
+        self.progress_bar = QProgressBar(self.topleft)
+        self.progress_bar.setRange(0, 100)
+        self.progress_layout.addWidget(self.progress_bar)
+
+        self.cancel_button = QPushButton("Cancel", self.topleft)
+        self.cancel_button.clicked.connect(self.controller.cancel_background_work)
+        self.progress_layout.addWidget(self.cancel_button)
+
+        self.account_layout.addWidget(self.progress_frame)
+        self.progress_frame.setVisible(False)
+
 
         # Right panel for graph
         self.graph_frame = QFrame(self.splitter1)
@@ -186,6 +205,43 @@ class FinanceView(QWidget):
         self.equity_layout = QVBoxLayout(self.equity_frame)
         self.bottomLayout.addWidget(self.equity_frame)
 
+        # One long-lived figure and canvas per chart, redrawn in place by the controller.
+        # They are created on first use, so matplotlib is only loaded after the window is shown.
+        self.charts = {}
+        self.chart_labels = {}
+        self._chart_slots = {}
+        self._add_chart("graph", self.graph_layout, figsize=(8, 5))
+        self._add_chart("summary", self.summary_layout)
+        self._add_chart("operating", self.operating_layout)
+        self._add_chart("investing", self.investing_layout)
+        self._add_chart("crypto", self.crypto_layout)
+        self._add_chart("equity", self.equity_layout)
+
+    def _add_chart(self, name, layout, figsize=None):
+        """Reserve a chart slot with its empty-state label."""
+        label = QLabel()
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        if name != "graph":
+            label.setStyleSheet("color: white; background-color: transparent;")
+        label.setVisible(False)
+        layout.addWidget(label)
+        self.chart_labels[name] = label
+        self._chart_slots[name] = (layout, figsize)
+
+    def chart_figure(self, name):
+        """Return the long-lived figure of a chart slot, creating it and its canvas on first use."""
+        if name not in self.charts:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+
+            layout, figsize = self._chart_slots[name]
+            fig = Figure(figsize=figsize)
+            canvas = FigureCanvas(fig)
+            canvas.setVisible(False)
+            layout.insertWidget(0, canvas)
+            self.charts[name] = (fig, canvas)
+        return self.charts[name][0]
+
     def show_custom_input(self, state):
     
         if state == "Custom":
@@ -209,23 +265,42 @@ class FinanceView(QWidget):
             self.custom_label.setVisible(False)
 
     def update_account_checkboxes(self, accounts):
-        """Updates the account checkboxes dynamically."""
+        """Updates the account checkboxes dynamically.
+
+        Nothing changes when the accounts are the same, e.g. after a currency
+        switch; otherwise the checkboxes are rebuilt and keep their checked state.
+        """
+        accounts = list(accounts)
+        if accounts == list(self.account_check_vars):
+            return
+        checked = {account for account, var in self.account_check_vars.items() if var.isChecked()}
+
         for i in reversed(range(self.account_subframe_layout.count())):
             widget = self.account_subframe_layout.itemAt(i).widget()
             if widget is not None:
                 widget.deleteLater()
+        self.account_check_vars = {}
 
         for account in accounts:
             var = QCheckBox(account, self.account_subframe)
-            var.setChecked(False)
-            var.stateChanged.connect(self.controller.plot_net_worth)
+            var.setChecked(account in checked)
+            var.stateChanged.connect(self.controller.schedule_net_worth)
             self.account_check_vars[account] = var
             self.account_subframe_layout.addWidget(var)
 
-    def display_graph(self, fig):
-        """Displays the Matplotlib graph inside the PyQt GUI."""
-        # Clear existing widgets more efficiently
-        self._clear_layout(self.graph_layout)
+    def show_progress(self, stage, percent):
+        """Show the progress of the running background job."""
+        self.progress_bar.setValue(percent)
+        self.progress_bar.setFormat(f"{stage} (%p%)")
+        self.progress_frame.setVisible(True)
+
+    def hide_progress(self):
+        self.progress_frame.setVisible(False)
+
+    def display_graph(self):
+        """Show the net worth canvas and style its figure."""
+        fig, canvas = self.charts["graph"]
+        label = self.chart_labels["graph"]
 
         # Set the figure and axes background to transparent
         fig.patch.set_facecolor('black')
@@ -241,16 +316,9 @@ class FinanceView(QWidget):
             ax.patch.set_alpha(0.1)
             ax.patch.set_edgecolor('none')
             ax.grid(color='black', linestyle='-', linewidth=0.5, alpha=0.25)
-        
-        canvas = FigureCanvas(fig)
-        self.graph_layout.addWidget(canvas)
 
-    def _clear_layout(self, layout):
-        """Efficiently clear all widgets from a layout."""
-        while layout.count():
-            child = layout.takeAt(0)
-            if child.widget():
-                child.widget().deleteLater()
+        label.setVisible(False)
+        canvas.setVisible(True)
 
     def _setup_figure_style(self, fig):
         """Common figure styling to reduce code duplication."""
@@ -267,88 +335,21 @@ class FinanceView(QWidget):
                 text.set_color(self.txtColor)
                 text.set_alpha(self.txtAlpha)
 
-    def display_investing_graph(self, fig):
-        """Displays the Matplotlib graph inside the PyQt GUI."""
-        self._clear_layout(self.investing_layout)
-        self._setup_figure_style(fig)
-        canvas = FigureCanvas(fig)
-        self.investing_layout.addWidget(canvas)
-
-    def display_crypto_graph(self, fig):
-        """Displays the Matplotlib graph inside the PyQt GUI."""
-        self._clear_layout(self.crypto_layout)
-        self._setup_figure_style(fig)
-        canvas = FigureCanvas(fig)
-        self.crypto_layout.addWidget(canvas)
-
-    def display_operating_graph(self, fig):
-        """Displays the Matplotlib graph inside the PyQt GUI."""
-        self._clear_layout(self.operating_layout)
+    def display_pie(self, name):
+        """Show the canvas of a pie chart slot and style its figure."""
+        fig, canvas = self.charts[name]
+        label = self.chart_labels[name]
         self._setup_figure_style(fig)
-        canvas = FigureCanvas(fig)
-        self.operating_layout.addWidget(canvas)
+        label.setVisible(False)
+        canvas.setVisible(True)
 
-    def display_equity_graph(self, fig):
-        """Displays the Matplotlib graph inside the PyQt GUI."""
-        self._clear_layout(self.equity_layout)
-        self._setup_figure_style(fig)
-        canvas = FigureCanvas(fig)
-        self.equity_layout.addWidget(canvas)
-
-    def display_summary_graph(self, fig):
-        """Displays the Matplotlib graph inside the PyQt GUI."""
-        self._clear_layout(self.summary_layout)
-        self._setup_figure_style(fig)
-        canvas = FigureCanvas(fig)
-        self.summary_layout.addWidget(canvas)
+    def display_chart_empty(self, name, message):
+        """Hide the canvas of a chart slot and show a message instead."""
+        if name in self.charts:
+            self.charts[name][1].setVisible(False)
+        label = self.chart_labels[name]
+        label.setText(message)
+        label.setVisible(True)
 
     def display_graph_empty(self, message):
-        # Remove any existing graph
-        for i in reversed(range(self.graph_layout.count())):
-            widget = self.graph_layout.itemAt(i).widget()
-            if widget is not None:
-                widget.deleteLater()
-        # Show a label with the message
-        label = QLabel(message)
-        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.graph_layout.addWidget(label)
-
-    def display_crypto_empty(self, message):
-        """Display empty state for crypto graph area."""
-        self._clear_layout(self.crypto_layout)
-        label = QLabel(message)
-        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        label.setStyleSheet("color: white; background-color: transparent;")
-        self.crypto_layout.addWidget(label)
-
-    def display_operating_empty(self, message):
-        """Display empty state for operating graph area."""
-        self._clear_layout(self.operating_layout)
-        label = QLabel(message)
-        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        label.setStyleSheet("color: white; background-color: transparent;")
-        self.operating_layout.addWidget(label)
-
-    def display_investing_empty(self, message):
-        """Display empty state for investing graph area."""
-        self._clear_layout(self.investing_layout)
-        label = QLabel(message)
-        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        label.setStyleSheet("color: white; background-color: transparent;")
-        self.investing_layout.addWidget(label)
-
-    def display_equity_empty(self, message):
-        """Display empty state for equity graph area."""
-        self._clear_layout(self.equity_layout)
-        label = QLabel(message)
-        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        label.setStyleSheet("color: white; background-color: transparent;")
-        self.equity_layout.addWidget(label)
-
-    def display_summary_empty(self, message):
-        """Display empty state for summary graph area."""
-        self._clear_layout(self.summary_layout)
-        label = QLabel(message)
-        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        label.setStyleSheet("color: white; background-color: transparent;")
-        self.summary_layout.addWidget(label)
\ No newline at end of file
+        self.display_chart_empty("graph", message)
@@ -0,0 +1,50 @@
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from model import LoadCancelled
+from db_connection import connection_manager
+
+
+class WorkerSignals(QObject):
+    """Signals emitted by a Worker; they are delivered on the GUI thread."""
+    progress = pyqtSignal(str, int)
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """Runs fn(*args, progress=..., is_cancelled=..., **kwargs) on a QThreadPool thread.
+
+    fn reports stages through the progress callback and polls is_cancelled;
+    raising model.LoadCancelled ends the run with the cancelled signal.
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, progress=self.signals.progress.emit, is_cancelled=self.is_cancelled, **self.kwargs)
+        except LoadCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            if self._cancelled:
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(result)
+        finally:
+            # pool threads expire and are replaced, their connections would never be used again
+            connection_manager.close_all()